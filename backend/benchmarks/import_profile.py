@@ -0,0 +1,115 @@
+# ============================================================
+# StyleAdvisor AI - Startup Import Profile
+# ============================================================
+# Reports where a worker's import time goes: `import server`
+# runs in a fresh interpreter under `python -X importtime`,
+# and the per-module timings are grouped by top-level package
+# and by router module. Running it with and without lazy
+# routers shows what LAZY_ROUTERS_ENABLED saves at spawn.
+#
+# Run from backend/:
+#   python -m benchmarks.import_profile
+#   python -m benchmarks.import_profile --compare-lazy --runs 5
+# ============================================================
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# "import time: self [us] | cumulative | imported package"
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)$')
+
+
+def profile_once(env: Dict[str, str]) -> List[Tuple[str, int]]:
+    """(module, self time in us) for each module of one cold `import server`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import server'],
+        cwd=BACKEND_DIR,
+        env={
+            # server.py needs these to build its Mongo client; nothing connects at import
+            'MONGO_URL': 'mongodb://127.0.0.1:27017',
+            'DB_NAME': 'styleadvisor_profile',
+            **os.environ,
+            **env,
+        },
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            modules.append((match.group(2), int(match.group(1))))
+    return modules
+
+
+def summarize(modules: List[Tuple[str, int]], top: int) -> Dict[str, Any]:
+    total_us = sum(self_us for _, self_us in modules)
+    packages: Dict[str, int] = {}
+    for name, self_us in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    routers = {name: self_us for name, self_us in modules if name.startswith('routers.')}
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(modules),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "routers_ms": {
+            name: round(us / 1000, 2)
+            for name, us in sorted(routers.items(), key=lambda item: item[1], reverse=True)
+        },
+        "slowest_modules_ms": {name: round(self_us / 1000, 2) for name, self_us in slowest},
+    }
+
+
+def _print_section(title: str, values: Dict[str, float]) -> None:
+    print(f"\n{title}")
+    for name, ms in values.items():
+        print(f"  {name:<40}{ms:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Break down the import time of server.py.")
+    parser.add_argument('--runs', type=int, default=3, help="Cold imports to take the median of")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--compare-lazy', action='store_true', help="Also profile with LAZY_ROUTERS_ENABLED")
+    args = parser.parse_args()
+
+    modes = [('eager', {'LAZY_ROUTERS_ENABLED': 'false'})]
+    if args.compare_lazy:
+        modes.append(('lazy', {'LAZY_ROUTERS_ENABLED': 'true'}))
+
+    totals: Dict[str, float] = {}
+    for mode, env in modes:
+        # The first run also warms the OS file cache, so it is not measured
+        profile_once(env)
+        runs = [summarize(profile_once(env), args.top) for _ in range(args.runs)]
+        median = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+        totals[mode] = statistics.median(r["total_ms"] for r in runs)
+        print(f"=== {mode}: {median['total_ms']} ms total over {median['modules']} modules (median of {args.runs})")
+        _print_section("By top-level package (self time, ms)", median["packages_ms"])
+        _print_section("Router modules (self time, ms)", median["routers_ms"])
+        _print_section("Slowest modules (self time, ms)", median["slowest_modules_ms"])
+        print()
+
+    if len(totals) == 2:
+        saved = totals['eager'] - totals['lazy']
+        print(f"Lazy routers save {round(saved, 1)} ms ({round(100 * saved / totals['eager'], 1)}%) of import time")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
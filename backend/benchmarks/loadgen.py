@@ -0,0 +1,88 @@
+# ============================================================
+# StyleAdvisor AI - Benchmark Load Generator
+# ============================================================
+# Closed-loop load: `concurrency` workers each send their next
+# request as soon as the previous one returns, for a fixed
+# duration. Latencies are kept per request, so percentiles are
+# exact rather than bucketed.
+# ============================================================
+
+import asyncio
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# Builds the next request of a scenario: (method, path, kwargs for httpx)
+RequestFactory = Callable[[int], Tuple[str, str, Dict[str, Any]]]
+
+
+class Scenario:
+    """One endpoint group under load."""
+
+    def __init__(self, name: str, make_request: RequestFactory, concurrency: int = 32):
+        self.name = name
+        self.make_request = make_request
+        self.concurrency = concurrency
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    duration: float,
+    warmup: float = 1.0,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Drive one scenario and summarise throughput, latency and errors."""
+    concurrency = concurrency or scenario.concurrency
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = {"next": 0}
+
+    async def worker(until: float, record: bool) -> None:
+        while time.perf_counter() < until:
+            counter["next"] += 1
+            method, path, kwargs = scenario.make_request(counter["next"])
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            if record:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    if warmup > 0:
+        until = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(until, False) for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    until = started + duration
+    await asyncio.gather(*(worker(until, True) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith('2'))
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "error_rate": round(1 - ok / len(latencies), 4) if latencies else 0.0,
+        "statuses": statuses,
+    }
@@ -0,0 +1,249 @@
+# ============================================================
+# StyleAdvisor AI - Gateway Benchmarks
+# ============================================================
+# Starts the stub upstream and the gateway (server:app) as
+# separate uvicorn processes, drives each endpoint group with
+# the load generator and reports throughput, p50/p95/p99 and
+# gateway memory. Results can be saved as a baseline and later
+# runs compared against it to catch regressions.
+#
+# Run from backend/:
+#   python -m benchmarks.run                       # report only
+#   python -m benchmarks.run --save-baseline       # store baselines/<name>.json
+#   python -m benchmarks.run --compare             # exit 1 on regression
+#   python -m benchmarks.run --groups auth_me,health --duration 5
+# ============================================================
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import jwt
+
+from benchmarks.loadgen import Scenario, run_scenario
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+
+JWT_SECRET = 'benchmark-secret'
+USERS = 50
+
+
+def _token(user: int) -> str:
+    claims = {"sub": f"bench-user-{user}", "exp": int(time.time()) + 24 * 3600}
+    return 'Bearer ' + jwt.encode(claims, JWT_SECRET, algorithm='HS256')
+
+
+TOKENS = [_token(user) for user in range(USERS)]
+
+
+def _auth(i: int) -> Dict[str, str]:
+    return {"Authorization": TOKENS[i % USERS]}
+
+
+# ============ Endpoint groups ============
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario('health', lambda i: ("GET", "/api/health", {})),
+        Scenario('auth_me', lambda i: ("GET", "/api/v1/auth/me", {"headers": _auth(i)})),
+        Scenario('premium_status', lambda i: ("GET", "/api/v1/premium/status", {"headers": _auth(i)})),
+        Scenario('google_status', lambda i: ("GET", f"/api/v1/auth/google/status/auth-{i % 20}", {})),
+        Scenario('notifications_send', lambda i: ("POST", "/api/v1/notifications/send", {
+            "headers": _auth(i),
+            "json": {"user_id": f"bench-user-{i % USERS}", "title": "Benchmark", "body": "Hello"},
+        })),
+        Scenario('webhook', lambda i: ("POST", "/api/v1/webhooks/revenuecat", {
+            "json": {"event": {"id": f"evt-{time.time_ns()}-{i}", "type": "RENEWAL", "app_user_id": f"bench-user-{i % USERS}"}},
+        })),
+    )
+}
+
+
+# ============ Processes ============
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start(app: str, port: int, env: Dict[str, str], log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', app, '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def _wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process from /proc (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+# ============ Baselines ============
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (a fraction) in p95, p99 or throughput."""
+    regressions = []
+    for group, current in results["groups"].items():
+        previous = baseline.get("groups", {}).get(group)
+        if previous is None:
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{group}: {metric} {previous[metric]} -> {current[metric]}")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{group}: throughput_rps {previous['throughput_rps']} -> {current['throughput_rps']}")
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append(f"{group}: error_rate {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def _print_table(results: Dict[str, Any]) -> None:
+    header = f"{'group':<20}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}{'rss MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for group, r in results["groups"].items():
+        print(
+            f"{group:<20}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+            f"{r['p99_ms']:>10}{r['error_rate']:>9}{str(r.get('rss_mb_after')):>9}"
+        )
+
+
+# ============ Main ============
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    upstream_port, gateway_port = _free_port(), _free_port()
+    # Server output goes to a file so console logging does not skew results
+    log = tempfile.NamedTemporaryFile('w', prefix='styleadvisor-bench-', suffix='.log', delete=False)
+    print(f"Server logs: {log.name}")
+    upstream = _start('benchmarks.stub_upstream:app', upstream_port, {
+        'BENCH_UPSTREAM_LATENCY_MS': str(args.upstream_latency_ms),
+        'BENCH_UPSTREAM_ERROR_RATE': str(args.upstream_error_rate),
+        'BENCH_UPSTREAM_PAYLOAD_BYTES': str(args.payload_bytes),
+    }, log)
+    gateway = _start('server:app', gateway_port, {
+        'EXTERNAL_API_BASE_URL': f'http://127.0.0.1:{upstream_port}',
+        # Proxy routes do not need Mongo; fail its startup hooks fast when absent
+        'MONGO_URL': os.environ.get('MONGO_URL', 'mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=1000'),
+        'DB_NAME': os.environ.get('DB_NAME', 'styleadvisor_benchmark'),
+        'JWT_SECRET': JWT_SECRET,
+        'WEBHOOK_QUEUE_ENABLED': 'false',
+    }, log)
+    try:
+        await _wait_ready(f'http://127.0.0.1:{upstream_port}/')
+        await _wait_ready(f'http://127.0.0.1:{gateway_port}/api/')
+
+        results: Dict[str, Any] = {
+            "settings": {
+                "duration": args.duration,
+                "concurrency": args.concurrency,
+                "upstream_latency_ms": args.upstream_latency_ms,
+                "upstream_error_rate": args.upstream_error_rate,
+                "payload_bytes": args.payload_bytes,
+            },
+            # Numbers are only comparable on the same kind of machine
+            "machine": {
+                "cpus": os.cpu_count(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "groups": {},
+        }
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{gateway_port}', limits=limits, timeout=30.0) as client:
+            for name in args.groups:
+                rss_before = rss_mb(gateway.pid)
+                summary = await run_scenario(client, SCENARIOS[name], args.duration, args.warmup, args.concurrency)
+                summary["rss_mb_before"] = rss_before
+                summary["rss_mb_after"] = rss_mb(gateway.pid)
+                results["groups"][name] = summary
+        return results
+    finally:
+        for process in (gateway, upstream):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the gateway against a stub upstream.")
+    parser.add_argument('--groups', default=','.join(SCENARIOS), help="Comma-separated endpoint groups")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of measured load per group")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Unmeasured seconds before each group")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--upstream-latency-ms', type=float, default=20.0)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-bytes', type=int, default=512)
+    parser.add_argument('--baseline', default='default', help="Baseline name under benchmarks/baselines/")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help="Fail on regression against the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed regression as a fraction")
+    parser.add_argument('--output', help="Also write the results JSON here")
+    args = parser.parse_args()
+    args.groups = [g.strip() for g in args.groups.split(',') if g.strip()]
+    unknown = [g for g in args.groups if g not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)} (known: {', '.join(SCENARIOS)})")
+
+    results = asyncio.run(run(args))
+    _print_table(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    baseline_path = BASELINE_DIR / f'{args.baseline}.json'
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+        print(f"Baseline saved to {baseline_path}")
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}")
+            return 1
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get("machine") != results["machine"]:
+            print(f"Warning: baseline was recorded on {baseline.get('machine')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# ============================================================
+# StyleAdvisor AI - JSON Serialization Microbenchmark
+# ============================================================
+# Compares the standard library and orjson on representative
+# payloads: rendering responses (AuthResponse,
+# PremiumStatusResponse, a bulk notification job status) and
+# parsing request bodies (login, a bulk notification send).
+# Pydantic's model_dump, which runs either way, is reported
+# alongside for scale.
+#
+# Run from backend/:
+#   python -m benchmarks.serialization
+#   python -m benchmarks.serialization --bulk-users 5000
+# ============================================================
+
+import argparse
+import json
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from starlette.responses import JSONResponse
+
+from routers.auth import AuthResponse, LoginRequest, TokenResponse, UserResponse
+from routers.notifications import BulkNotificationJobStatus, BulkNotificationRequest
+from routers.premium import PremiumStatusResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _payloads(bulk_users: int) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """Response models to render and request bodies to parse."""
+    user_ids = [f"user-{i:06d}" for i in range(bulk_users)]
+    responses = {
+        "AuthResponse": AuthResponse(
+            user=UserResponse(
+                id="6650f0c2a1b2c3d4e5f60718", email="ayse@example.com", full_name="Ayşe Yılmaz",
+                is_premium=True, created_at="2026-03-01T09:30:00Z",
+            ),
+            tokens=TokenResponse(access_token="e" * 240, refresh_token="r" * 64, expires_in=3600),
+        ),
+        "PremiumStatusResponse": PremiumStatusResponse(
+            is_premium=True, subscription_type="yearly", expires_at="2027-03-01T09:30:00Z", auto_renew=True,
+            features={"unlimited_outfits": True, "wardrobe_sync": True, "style_reports": True, "ads": False},
+        ),
+        "BulkNotificationJobStatus": BulkNotificationJobStatus(
+            job_id="9f1c2b7e0d4a4c3f8e6b5a4d3c2b1a09", status="completed",
+            progress={
+                "total_users": bulk_users, "total_batches": -(-bulk_users // 500),
+                "sent": bulk_users - 3, "failed": 3,
+                "failed_user_ids": user_ids[:3], "batch_errors": ["Upstream timeout"],
+            },
+            created_at="2026-10-17T09:30:00", updated_at="2026-10-17T09:30:04",
+        ),
+    }
+    requests = {
+        "LoginRequest": LoginRequest(email="ayse@example.com", password="correct horse battery"),
+        "BulkNotificationRequest": BulkNotificationRequest(
+            user_ids=user_ids, title="Yeni koleksiyon", body="Sonbahar kombinlerin hazır ✨",
+            data={"screen": "collections", "campaign": "autumn"},
+        ),
+    }
+    bodies = {name: model.model_dump_json().encode('utf-8') for name, model in requests.items()}
+    return responses, bodies
+
+
+def _per_call_us(fn: Callable[[], Any], repeat: int) -> float:
+    """Best of `repeat` runs, each long enough (>= 0.2s) to time reliably."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run(bulk_users: int, repeat: int) -> List[Dict[str, Any]]:
+    responses, bodies = _payloads(bulk_users)
+    stdlib = JSONResponse(None)
+    rows = []
+    for name, model in responses.items():
+        content = model.model_dump(mode='json')
+        row = {
+            "payload": f"render {name}",
+            "bytes": len(stdlib.render(content)),
+            "model_dump_us": _per_call_us(lambda: model.model_dump(mode='json'), repeat),
+            "stdlib_us": _per_call_us(lambda: stdlib.render(content), repeat),
+        }
+        if orjson is not None:
+            row["orjson_us"] = _per_call_us(lambda: orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS), repeat)
+        rows.append(row)
+    for name, body in bodies.items():
+        row = {
+            "payload": f"parse {name}",
+            "bytes": len(body),
+            "stdlib_us": _per_call_us(lambda: json.loads(body), repeat),
+        }
+        if orjson is not None:
+            row["orjson_us"] = _per_call_us(lambda: orjson.loads(body), repeat)
+        rows.append(row)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare stdlib json and orjson on API payloads.")
+    parser.add_argument('--bulk-users', type=int, default=500, help="user_ids in the bulk notification payloads")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing runs per case; the best is kept")
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; only the standard library is measured")
+    rows = run(args.bulk_users, args.repeat)
+    header = f"{'payload':<38}{'bytes':>9}{'dump us':>10}{'stdlib us':>11}{'orjson us':>11}{'speedup':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        orjson_us = row.get("orjson_us")
+        dump = f"{row['model_dump_us']:.2f}" if "model_dump_us" in row else '-'
+        fast = f"{orjson_us:.2f}" if orjson_us else '-'
+        speedup = f"{row['stdlib_us'] / orjson_us:.1f}x" if orjson_us else '-'
+        print(f"{row['payload']:<38}{row['bytes']:>9}{dump:>10}{row['stdlib_us']:>11.2f}{fast:>11}{speedup:>9}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# ============================================================
+# StyleAdvisor AI - State Backend Benchmarks
+# ============================================================
+# Measures what each state backend costs per operation (rate
+# limit token, webhook dedup add, get/set) under concurrent
+# load, so the price of sharing state across workers through
+# Mongo is known before switching STATE_BACKEND. The Mongo
+# backend is skipped when MONGO_URL is unreachable.
+#
+# Run from backend/:
+#   python -m benchmarks.state_backends
+#   MONGO_URL=mongodb://db:27017 python -m benchmarks.state_backends --duration 5
+# ============================================================
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.loadgen import percentile
+from routers.state import MemoryStateBackend, MongoStateBackend, StateBackend
+
+Operation = Callable[[StateBackend, int], Awaitable[Any]]
+
+OPERATIONS: Dict[str, Operation] = {
+    'take_token': lambda backend, i: backend.take_token('bench_rate_limit', f"ip:{i % 1000}", 30, 0.5),
+    'add': lambda backend, i: backend.add('bench_dedup', f"evt-{time.time_ns()}-{i}", 3600),
+    'set': lambda backend, i: backend.set('bench_kv', f"key-{i % 1000}", {"n": i}, 60),
+    'get': lambda backend, i: backend.get('bench_kv', f"key-{i % 1000}"),
+}
+
+
+async def run_operation(backend: StateBackend, operation: Operation, duration: float, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    until = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            try:
+                await operation(backend, random.randrange(1_000_000))
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops_per_second": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    backends: Dict[str, StateBackend] = {"memory": MemoryStateBackend()}
+    client = AsyncIOMotorClient(args.mongo_url, serverSelectionTimeoutMS=2000)
+    db = client[args.db_name]
+    try:
+        await db.command('ping')
+        backends["mongo"] = MongoStateBackend(db)
+    except Exception as e:
+        print(f"Skipping mongo backend, {args.mongo_url} unreachable ({type(e).__name__})")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name, backend in backends.items():
+            await backend.start()
+            for op_name in args.operations:
+                results[f"{name}.{op_name}"] = await run_operation(
+                    backend, OPERATIONS[op_name], args.duration, args.concurrency
+                )
+    finally:
+        if "mongo" in backends:
+            await db.state.delete_many({"_id": {"$regex": "^bench_"}})
+        client.close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the memory and Mongo state backends.")
+    parser.add_argument('--operations', default=','.join(OPERATIONS))
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per operation and backend")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL', 'mongodb://127.0.0.1:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'styleadvisor_benchmark'))
+    args = parser.parse_args()
+    args.operations = [op.strip() for op in args.operations.split(',') if op.strip()]
+    unknown = [op for op in args.operations if op not in OPERATIONS]
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(unknown)} (known: {', '.join(OPERATIONS)})")
+
+    results = asyncio.run(run(args))
+    header = f"{'backend.operation':<24}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<24}{r['ops_per_second']:>12}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
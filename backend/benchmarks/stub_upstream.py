@@ -0,0 +1,62 @@
+# ============================================================
+# StyleAdvisor AI - Benchmark Stub Upstream
+# ============================================================
+# Stands in for EXTERNAL_API_BASE_URL during benchmarks. Every
+# path answers with a JSON body after a configurable latency,
+# failing a configurable fraction of calls with 503.
+#
+#   BENCH_UPSTREAM_LATENCY_MS    mean latency (default 20)
+#   BENCH_UPSTREAM_JITTER_MS     +/- uniform jitter (default 5)
+#   BENCH_UPSTREAM_ERROR_RATE    fraction answered 503 (default 0)
+#   BENCH_UPSTREAM_PAYLOAD_BYTES padding added to bodies (default 512)
+# ============================================================
+
+import asyncio
+import os
+import random
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LATENCY_MS = float(os.getenv('BENCH_UPSTREAM_LATENCY_MS', '20'))
+JITTER_MS = float(os.getenv('BENCH_UPSTREAM_JITTER_MS', '5'))
+ERROR_RATE = float(os.getenv('BENCH_UPSTREAM_ERROR_RATE', '0'))
+PAYLOAD_BYTES = int(os.getenv('BENCH_UPSTREAM_PAYLOAD_BYTES', '512'))
+
+PADDING = 'x' * PAYLOAD_BYTES
+
+# Bodies shaped like the real endpoints' responses, keyed on path suffix
+RESPONSES = {
+    '/auth/me': {
+        "id": "bench-user", "email": "bench@example.com", "full_name": "Bench User",
+        "created_at": "2024-01-01T00:00:00Z", "is_premium": False,
+    },
+    '/premium/status': {"is_premium": True, "entitlements": ["premium"], "expires_at": None},
+    '/notifications/send': {"success": True, "message": "sent", "notification_id": "n-1"},
+    '/notifications/stats': {"total_sent": 10, "total_delivered": 9, "total_failed": 1, "delivery_rate": 0.9},
+}
+
+
+def _body_for(path: str) -> dict:
+    for suffix, body in RESPONSES.items():
+        if path.endswith(suffix):
+            return {**body, "padding": PADDING}
+    if '/status/' in path:
+        return {"status": "pending", "padding": PADDING}
+    return {"success": True, "message": "ok", "padding": PADDING}
+
+
+async def handle(request: Request) -> JSONResponse:
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    if delay:
+        await asyncio.sleep(delay)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"detail": "Stub upstream error"}, status_code=503)
+    return JSONResponse(_body_for(request.url.path))
+
+
+app = Starlette(routes=[
+    Route("/{path:path}", handle, methods=["GET", "POST", "PUT", "DELETE"]),
+])
@@ -1,26 +1,30 @@
 # StyleAdvisor AI - Backend Server Module
 # All API endpoints are organized in separate files for maintainability
+#
+# Router attributes are resolved on first access, so importing one
+# submodule (e.g. routers.config) does not import every router.
 
-from .auth import router as auth_router
-from .email_otp import router as email_otp_router
-from .google_auth import router as google_auth_router
-from .apple_auth import router as apple_auth_router
-from .password_reset import router as password_reset_router
-from .pdf_read import router as pdf_read_router
-from .notifications import router as notifications_router
-from .delete_account import router as delete_account_router
-from .premium import router as premium_router
-from .webhooks import router as webhooks_router
+import importlib
 
-__all__ = [
-    'auth_router',
-    'email_otp_router',
-    'google_auth_router',
-    'apple_auth_router',
-    'password_reset_router',
-    'pdf_read_router',
-    'notifications_router',
-    'delete_account_router',
-    'premium_router',
-    'webhooks_router',
-]
+_ROUTER_MODULES = {
+    'auth_router': 'auth',
+    'email_otp_router': 'email_otp',
+    'google_auth_router': 'google_auth',
+    'apple_auth_router': 'apple_auth',
+    'password_reset_router': 'password_reset',
+    'pdf_read_router': 'pdf_read',
+    'notifications_router': 'notifications',
+    'delete_account_router': 'delete_account',
+    'premium_router': 'premium',
+    'webhooks_router': 'webhooks',
+}
+
+
+def __getattr__(name):
+    module = _ROUTER_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f".{module}", __name__).router
+
+
+__all__ = list(_ROUTER_MODULES)
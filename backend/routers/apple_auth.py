@@ -4,15 +4,20 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/auth/apple
 # ============================================================
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Query
+from starlette.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.auth_status import AuthStatusWatcher
+from routers.config import AUTH_STATUS_MAX_WAIT_SECONDS, AUTH_STATUS_WATCH_MAX_SECONDS
+from routers.policies import POLL
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/auth/apple", tags=["Apple Auth"])
+router = APIRouter(prefix="/auth/apple", tags=["Apple Auth"], route_class=FastJSONRoute)
 
-EXTERNAL_APPLE_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/auth/apple"
+apple_upstream = UpstreamService("apple_auth", "/api/v1/auth/apple")
+apple_status_watcher = AuthStatusWatcher(apple_upstream, 'Failed to get auth status')
 
 # ============ Models ============
 
@@ -53,23 +58,11 @@ async def start_apple_auth(request: AppleAuthStartRequest = None):
     Returns an ID to track the auth status and the URL for Apple Sign-In.
     The ID should be used to poll the /status endpoint.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            body = request.dict() if request else {}
-            response = await client.post(
-                f"{EXTERNAL_APPLE_URL}/start",
-                json=body,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to start Apple auth')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await apple_upstream.relay(
+        "POST", "/start",
+        json=request.dict() if request else {},
+        error_message='Failed to start Apple auth'
+    )
 
 
 @router.get("/status/{auth_id}", response_model=AppleAuthStatusResponse, summary="Check Apple auth status")
@@ -86,21 +79,51 @@ async def check_apple_auth_status(auth_id: str):
     - 'expired': Auth session expired
     - 'error': Auth failed
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_APPLE_URL}/status/{auth_id}",
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get auth status')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await apple_upstream.relay(
+        "GET", "/status/{auth_id}",
+        path_params={"auth_id": auth_id},
+        policy=POLL,
+        error_message='Failed to get auth status'
+    )
+
+
+@router.get("/status/{auth_id}/wait", response_model=AppleAuthStatusResponse, summary="Wait for Apple auth status (long-poll)")
+async def wait_apple_auth_status(
+    auth_id: str,
+    timeout: float = Query(25.0, gt=0, le=AUTH_STATUS_MAX_WAIT_SECONDS)
+):
+    """
+    Long-poll variant of /status/{auth_id}.
+    
+    - **auth_id**: The ID returned from /start endpoint
+    - **timeout**: Maximum seconds to hold the request open
+    
+    Returns as soon as the Apple Sign-In flow reaches a terminal status
+    ('completed', 'expired', 'error'), or the latest status when the
+    timeout passes first. All clients waiting on the same auth_id share
+    a single upstream poller.
+    """
+    latest = await apple_status_watcher.wait(auth_id, timeout)
+    return latest.to_response()
+
+
+@router.get("/status/{auth_id}/events", summary="Stream Apple auth status (Server-Sent Events)")
+async def stream_apple_auth_status(
+    auth_id: str,
+    timeout: float = Query(300.0, gt=0, le=AUTH_STATUS_WATCH_MAX_SECONDS)
+):
+    """
+    Server-Sent Events variant of /status/{auth_id}.
+    
+    Emits a 'status' event with the status payload on every change and
+    closes the stream after a terminal status. Comment lines are sent as
+    keep-alives while nothing changes.
+    """
+    return StreamingResponse(
+        apple_status_watcher.events(auth_id, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("/callback", response_model=AppleCallbackResponse, summary="Apple Sign-In callback")
@@ -116,19 +139,8 @@ async def apple_callback(request: AppleCallbackRequest):
     - **state**: State parameter for CSRF protection
     - **user**: User info (only sent on first sign-in)
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_APPLE_URL}/callback",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Apple callback failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await apple_upstream.relay(
+        "POST", "/callback",
+        json=request.dict(),
+        error_message='Apple callback failed'
+    )
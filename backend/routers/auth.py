@@ -4,15 +4,21 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/auth
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, Depends, Header, Request
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.cache import user_cache, invalidate_token, link_user_token
+from routers.security import AuthContext, access_token_dependency
+from routers.rate_limit import rate_limiter
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=FastJSONRoute)
 
-EXTERNAL_AUTH_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/auth"
+auth_upstream = UpstreamService("auth", "/api/v1/auth")
+
+# /me has always answered a missing header with this message
+require_user_token = access_token_dependency("Authorization header required")
 
 # ============ Models ============
 
@@ -49,7 +55,7 @@ class AuthResponse(BaseModel):
 # ============ Endpoints ============
 
 @router.post("/register", response_model=AuthResponse, summary="Register new user")
-async def register(request: RegisterRequest):
+async def register(request: RegisterRequest, http_request: Request):
     """
     Register a new user with email and password.
     
@@ -58,47 +64,27 @@ async def register(request: RegisterRequest):
     - **full_name**: User's full name
     - **language**: Preferred language (default: tr)
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_AUTH_URL}/register",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Registration failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    await rate_limiter.check(http_request, 'register', email=request.email)
+    return await auth_upstream.relay(
+        "POST", "/register",
+        json=request.dict(),
+        error_message='Registration failed'
+    )
 
 
 @router.post("/login", response_model=AuthResponse, summary="Login user")
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, http_request: Request):
     """
     Authenticate user with email and password.
     
     Returns access token and refresh token on success.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_AUTH_URL}/login",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Login failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    await rate_limiter.check(http_request, 'login', email=request.email)
+    return await auth_upstream.relay(
+        "POST", "/login",
+        json=request.dict(),
+        error_message='Login failed'
+    )
 
 
 @router.post("/refresh", response_model=TokenResponse, summary="Refresh access token")
@@ -106,22 +92,11 @@ async def refresh_token(request: RefreshTokenRequest):
     """
     Refresh the access token using a valid refresh token.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_AUTH_URL}/refresh",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Token refresh failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await auth_upstream.relay(
+        "POST", "/refresh",
+        json=request.dict(),
+        error_message='Token refresh failed'
+    )
 
 
 @router.post("/logout", summary="Logout user")
@@ -129,23 +104,13 @@ async def logout(authorization: Optional[str] = Header(None)):
     """
     Logout the current user and invalidate their token.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.post(
-                f"{EXTERNAL_AUTH_URL}/logout",
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return {"message": "Logged out successfully"}
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Logout failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    invalidate_token(authorization)
+    await auth_upstream.forward(
+        "POST", "/logout",
+        authorization=authorization,
+        error_message='Logout failed'
+    )
+    return {"message": "Logged out successfully"}
 
 
 @router.post("/logout-all", summary="Logout from all devices")
@@ -153,46 +118,26 @@ async def logout_all(authorization: Optional[str] = Header(None)):
     """
     Logout from all devices and invalidate all tokens.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.post(
-                f"{EXTERNAL_AUTH_URL}/logout-all",
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return {"message": "Logged out from all devices"}
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Logout all failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    invalidate_token(authorization)
+    await auth_upstream.forward(
+        "POST", "/logout-all",
+        authorization=authorization,
+        error_message='Logout all failed'
+    )
+    return {"message": "Logged out from all devices"}
 
 
 @router.get("/me", response_model=UserResponse, summary="Get current user")
-async def get_current_user(authorization: Optional[str] = Header(None)):
+async def get_current_user(auth: AuthContext = Depends(require_user_token)):
     """
     Get the currently authenticated user's profile.
-    """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization header required")
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_AUTH_URL}/me",
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get user')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    Served from a short-lived per-token cache when possible.
+    """
+    link_user_token(auth.user_id, auth.authorization)
+    return await auth_upstream.relay_cached(
+        user_cache,
+        "GET", "/me",
+        authorization=auth.authorization,
+        error_message='Failed to get user'
+    )
@@ -0,0 +1,180 @@
+# ============================================================
+# StyleAdvisor AI - Shared Auth Status Watchers
+# ============================================================
+# Backs the long-poll and Server-Sent-Events variants of the
+# Google/Apple auth status endpoints. However many clients wait
+# on an auth_id, one background task polls upstream for it and
+# pushes every status change to all of them.
+# ============================================================
+
+import asyncio
+import logging
+import re
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+from routers.config import (
+    AUTH_STATUS_POLL_INTERVAL,
+    AUTH_STATUS_WATCH_MAX_SECONDS,
+    AUTH_STATUS_SSE_HEARTBEAT_SECONDS,
+)
+from routers.cache import CachedResponse
+from routers.policies import POLL
+from routers.proxy import UpstreamService, UpstreamUnavailableError
+from routers.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which an auth flow can no longer change
+TERMINAL_STATUSES = frozenset({'completed', 'expired', 'error'})
+
+_SSE_LINE_BREAK = re.compile(r'\r\n|\r|\n')
+
+
+class _Watch:
+    """Latest known status of one auth flow plus its waiting clients."""
+
+    def __init__(self):
+        self.latest: Optional[CachedResponse] = None
+        self.status: Optional[str] = None
+        self.error: Optional[HTTPException] = None
+        self.version = 0
+        self.waiters = 0
+        self.finished = False
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, latest: Optional[CachedResponse] = None, error: Optional[HTTPException] = None) -> None:
+        if latest is not None:
+            self.latest = latest
+            try:
+                self.status = loads(latest.body).get('status')
+            except (ValueError, AttributeError):
+                self.status = None
+        self.error = error
+        self.finished = self.finished or error is not None or self.status in TERMINAL_STATUSES
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, version: int, timeout: float) -> None:
+        if self.version != version:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _sse_data(body: bytes) -> str:
+    """Frame a body as SSE `data:` lines; a bare newline in the body would end the event early."""
+    lines = _SSE_LINE_BREAK.split(body.decode('utf-8').rstrip('\r\n'))
+    return ''.join(f"data: {line}\n" for line in lines)
+
+
+class AuthStatusWatcher:
+    """Runs at most one upstream status poller per auth_id."""
+
+    def __init__(self, upstream: UpstreamService, error_message: str):
+        self.upstream = upstream
+        self.error_message = error_message
+        self._watches: Dict[str, _Watch] = {}
+        self.upstream_polls = 0
+
+    def _subscribe(self, auth_id: str) -> _Watch:
+        watch = self._watches.get(auth_id)
+        if watch is None:
+            watch = self._watches[auth_id] = _Watch()
+            watch.task = asyncio.ensure_future(self._poll(auth_id, watch))
+        watch.waiters += 1
+        return watch
+
+    def _unsubscribe(self, watch: _Watch) -> None:
+        watch.waiters -= 1
+
+    async def _poll(self, auth_id: str, watch: _Watch) -> None:
+        deadline = time.monotonic() + AUTH_STATUS_WATCH_MAX_SECONDS
+        try:
+            while watch.waiters > 0 and time.monotonic() < deadline:
+                self.upstream_polls += 1
+                try:
+                    latest = await self.upstream.fetch(
+                        "GET", "/status/{auth_id}",
+                        path_params={"auth_id": auth_id},
+                        policy=POLL,
+                        error_message=self.error_message
+                    )
+                except UpstreamUnavailableError as e:
+                    # Transient; keep polling until the watch deadline
+                    logger.warning(f"Auth status poll failed for {self.upstream.name}: {e.reason}")
+                except HTTPException as e:
+                    watch.publish(error=e)
+                    return
+                else:
+                    if watch.latest is None or latest.body != watch.latest.body:
+                        watch.publish(latest)
+                    if watch.finished:
+                        return
+                await asyncio.sleep(AUTH_STATUS_POLL_INTERVAL)
+        finally:
+            if self._watches.get(auth_id) is watch:
+                del self._watches[auth_id]
+            if not watch.finished:
+                watch.finished = True
+                watch.publish()
+
+    async def wait(self, auth_id: str, timeout: float) -> CachedResponse:
+        """
+        Long-poll: return once the flow reaches a terminal status, or the
+        latest known status when `timeout` seconds pass first.
+        """
+        watch = self._subscribe(auth_id)
+        try:
+            deadline = time.monotonic() + timeout
+            while not watch.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await watch.wait_for_change(watch.version, remaining)
+            if watch.error is not None:
+                raise watch.error
+            if watch.latest is None:
+                # Upstream unreachable for the whole wait
+                raise HTTPException(status_code=503, detail="External service unavailable")
+            return watch.latest
+        finally:
+            self._unsubscribe(watch)
+
+    async def events(self, auth_id: str, timeout: float) -> AsyncIterator[str]:
+        """Server-Sent-Events stream of status changes, ending on a terminal status."""
+        watch = self._subscribe(auth_id)
+        try:
+            deadline = time.monotonic() + timeout
+            seen = 0
+            while True:
+                if watch.version != seen:
+                    seen = watch.version
+                    if watch.error is not None:
+                        detail = dumps({"detail": watch.error.detail})
+                        yield f"event: error\ndata: {detail}\n\n"
+                        return
+                    if watch.latest is not None:
+                        yield f"event: status\n{_sse_data(watch.latest.body)}\n"
+                if watch.finished:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                await watch.wait_for_change(seen, min(remaining, AUTH_STATUS_SSE_HEARTBEAT_SECONDS))
+                if watch.version == seen:
+                    yield ": keep-alive\n\n"
+        finally:
+            self._unsubscribe(watch)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_watches": len(self._watches),
+            "waiting_clients": sum(w.waiters for w in self._watches.values()),
+            "upstream_polls": self.upstream_polls,
+        }
@@ -0,0 +1,358 @@
+# ============================================================
+# StyleAdvisor AI - In-Process Response Cache
+# ============================================================
+# Short-TTL, size-bounded LRU cache for per-user upstream reads
+# (GET /auth/me, GET /premium/status). Entries are tagged with
+# the caller's token hash so writes for that user can drop them.
+# With several workers, invalidations and the links from users
+# to their tokens are broadcast through the state backend so no
+# worker keeps serving a dropped entry.
+# ============================================================
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette.responses import Response
+from routers.state import StateBackend
+from routers.compression import compress, compression_stats, is_compressible, preferred_encoding
+from routers.config import (
+    USER_CACHE_TTL_SECONDS,
+    USER_CACHE_MAX_ENTRIES,
+    STATE_SYNC_INTERVAL_SECONDS,
+    COMPRESSION_MIN_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(authorization: str) -> str:
+    """Stable, non-reversible key for an Authorization header value."""
+    return hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+
+
+def token_tag(token_hash: str) -> str:
+    return f"token:{token_hash}"
+
+
+def user_tag(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+class CachedResponse:
+    """
+    A fully-read upstream 200 response that can be replayed to clients.
+    Compressed variants are made on first use and kept with the entry, so
+    a cached body is compressed at most once per encoding.
+    """
+
+    __slots__ = ('status_code', 'body', 'headers', '_encoded')
+
+    def __init__(self, status_code: int, body: bytes, headers: Dict[str, str]):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+        self._encoded: Dict[str, bytes] = {}
+
+    def to_response(self) -> Response:
+        encoding = preferred_encoding()
+        if (
+            encoding is None
+            or len(self.body) < COMPRESSION_MIN_SIZE
+            or not is_compressible(self.headers.get('content-type'))
+        ):
+            return Response(content=self.body, status_code=self.status_code, headers=self.headers)
+
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+            compression_stats.cached_compressions += 1
+        else:
+            compression_stats.cached_reuses += 1
+        response = Response(content=body, status_code=self.status_code, headers=self.headers)
+        response.headers['content-encoding'] = encoding
+        response.headers.add_vary_header('Accept-Encoding')
+        return response
+
+
+class CacheFill:
+    """
+    A read in flight that will be stored under `tags`. An invalidation of
+    any of those tags before it is stored marks it stale.
+    """
+
+    __slots__ = ('tags', 'stale')
+
+    def __init__(self, tags: Tuple[str, ...]):
+        self.tags = tags
+        self.stale = False
+
+
+class TTLCache:
+    """
+    LRU cache with a per-entry TTL and tag-based invalidation.
+
+    Memory is bounded by max_entries; the least recently used entry is
+    evicted first. Tags let one write (e.g. a premium sync) drop every
+    entry belonging to a token or user, and link() lets a user tag
+    (e.g. a RevenueCat app_user_id) reach the token tags seen for it.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._links: "OrderedDict[str, Set[str]]" = OrderedDict()
+        # In-flight fills by tag, so an invalidation only voids the reads it races with
+        self._fills: Dict[str, Set[CacheFill]] = {}
+        # Invalidated tags and new links not yet broadcast to other workers; None while not shared
+        self._outbox: Optional[List[str]] = None
+        self._link_outbox: Optional[List[Tuple[str, str]]] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def begin_fill(self, tags: Iterable[str]) -> CacheFill:
+        """Register a read about to be cached; pass it to set() or end_fill()."""
+        fill = CacheFill(tuple(tags))
+        for tag in fill.tags:
+            self._fills.setdefault(tag, set()).add(fill)
+        return fill
+
+    def end_fill(self, fill: CacheFill) -> None:
+        for tag in fill.tags:
+            fills = self._fills.get(tag)
+            if fills is not None:
+                fills.discard(fill)
+                if not fills:
+                    del self._fills[tag]
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), fill: Optional[CacheFill] = None) -> None:
+        """
+        Store a value. When fill is given and one of its tags was
+        invalidated while it was being read, the value may be stale and is
+        not stored.
+        """
+        if fill is not None:
+            self.end_fill(fill)
+            if fill.stale:
+                return
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def link(self, alias: str, tag: str, broadcast: bool = True) -> None:
+        """Make invalidate_tag(alias) also invalidate tag."""
+        linked = self._links.setdefault(alias, set())
+        if tag not in linked and broadcast and self._link_outbox is not None:
+            self._link_outbox.append((alias, tag))
+        linked.add(tag)
+        self._links.move_to_end(alias)
+        while len(self._links) > self.max_entries:
+            self._links.popitem(last=False)
+
+    def invalidate_tag(self, tag: str, broadcast: bool = True) -> int:
+        """Drop every entry carrying the tag (or a tag linked to it)."""
+        if broadcast and self._outbox is not None:
+            self._outbox.append(tag)
+        tags = {tag} | self._links.get(tag, set())
+        removed = 0
+        for t in tags:
+            for fill in self._fills.get(t, ()):
+                fill.stale = True
+            for key in list(self._tags.get(t, ())):
+                self._remove(key)
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def share_invalidations(self) -> None:
+        """Start collecting invalidated tags and new links for drain_invalidations()/drain_links()."""
+        if self._outbox is None:
+            self._outbox = []
+            self._link_outbox = []
+
+    def drain_invalidations(self) -> List[str]:
+        if not self._outbox:
+            return []
+        tags, self._outbox = self._outbox, []
+        return tags
+
+    def requeue_invalidations(self, tags: List[str]) -> None:
+        """Put back tags whose broadcast failed, ahead of newer ones."""
+        if self._outbox is not None:
+            self._outbox[:0] = tags
+
+    def drain_links(self) -> List[Tuple[str, str]]:
+        if not self._link_outbox:
+            return []
+        links, self._link_outbox = self._link_outbox, []
+        return links
+
+    def requeue_links(self, links: List[Tuple[str, str]]) -> None:
+        if self._link_outbox is not None:
+            self._link_outbox[:0] = links
+
+    def clear(self) -> None:
+        for fills in self._fills.values():
+            for fill in fills:
+                fill.stale = True
+        self._entries.clear()
+        self._tags.clear()
+        self._links.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class CacheInvalidationSync:
+    """
+    Every STATE_SYNC_INTERVAL_SECONDS, publishes the tags this worker
+    invalidated and the user-to-token links it learned, and applies the
+    ones other workers did, so a user invalidation reaches a token
+    whichever worker linked or cached it. A worker may serve a dropped
+    entry for at most one interval.
+    """
+
+    CHANNEL = 'user_cache'
+
+    def __init__(self, cache: TTLCache, interval: float = STATE_SYNC_INTERVAL_SECONDS):
+        self.cache = cache
+        self.interval = interval
+        self.backend: Optional[StateBackend] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.published = 0
+        self.applied = 0
+        self.errors = 0
+
+    async def start(self, backend: StateBackend) -> None:
+        if not backend.shared or self._task is not None:
+            return
+        self.backend = backend
+        self.cache.share_invalidations()
+        await backend.poll(self.CHANNEL)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.sync()
+
+    async def sync(self) -> None:
+        tags = self.cache.drain_invalidations()
+        links = self.cache.drain_links()
+        try:
+            if tags or links:
+                await self.backend.publish(self.CHANNEL, {"tags": tags, "links": [list(link) for link in links]})
+                self.published += len(tags)
+        except Exception as e:
+            # Retry with the next sync
+            self.cache.requeue_invalidations(tags)
+            self.cache.requeue_links(links)
+            self.errors += 1
+            logger.warning(f"Cache invalidation publish failed: {str(e)}")
+        try:
+            for message in await self.backend.poll(self.CHANNEL):
+                # Links first, so a user invalidation in the same message reaches them
+                for alias, tag in message.get("links", ()):
+                    self.cache.link(alias, tag, broadcast=False)
+                for tag in message.get("tags", ()):
+                    self.cache.invalidate_tag(tag, broadcast=False)
+                    self.applied += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache invalidation poll failed: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.sync()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "published": self.published,
+            "applied": self.applied,
+            "errors": self.errors,
+        }
+
+
+# Shared cache for per-user reads (GET /auth/me, GET /premium/status)
+user_cache = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+user_cache_sync = CacheInvalidationSync(user_cache)
+
+
+def invalidate_token(authorization: Optional[str]) -> None:
+    """Drop cached reads for the caller after a write that changes their state."""
+    if authorization:
+        user_cache.invalidate_tag(token_tag(hash_token(authorization)))
+
+
+def link_user_token(user_id: Optional[str], authorization: Optional[str]) -> None:
+    """
+    Remember that a token belongs to a user, for user-level invalidation.
+    Links are shared with the other workers through user_cache_sync. A token
+    is only linked once its user is known (a verified JWT, or the
+    app_user_id sent to /premium/customer-info); until then a webhook for
+    the user cannot reach it and its cached reads last until the TTL.
+    """
+    if user_id and authorization:
+        user_cache.link(user_tag(user_id), token_tag(hash_token(authorization)))
+
+
+def invalidate_user(user_id: Optional[str]) -> None:
+    """Drop cached reads for every token seen for a user (e.g. RevenueCat webhook)."""
+    if user_id:
+        user_cache.invalidate_tag(user_tag(user_id))
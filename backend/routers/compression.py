@@ -0,0 +1,255 @@
+# ============================================================
+# StyleAdvisor AI - Response Compression
+# ============================================================
+# Negotiated brotli/gzip compression for mobile clients on
+# cellular networks. Bodies under COMPRESSION_MIN_SIZE, event
+# streams and non-text types go out as-is, and so do bodies that
+# already carry a Content-Encoding: upstream bytes relayed still
+# compressed, and cached responses that were compressed once and
+# are replayed from the cache.
+# ============================================================
+
+import zlib
+from contextvars import ContextVar
+from typing import Any, Dict, FrozenSet, Optional
+
+from starlette.datastructures import MutableHeaders
+from routers.config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Server preference, best ratio first
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/problem+json',
+    'application/javascript', 'application/xml', 'text/',
+)
+# Streamed event by event; buffering towards the size threshold would delay them
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+# Encodings the current request's client accepts; empty outside a request
+_accepted_encodings: ContextVar[FrozenSet[str]] = ContextVar('accepted_encodings', default=frozenset())
+
+
+def parse_accept_encoding(value: str) -> FrozenSet[str]:
+    """Codings listed in an Accept-Encoding header with a non-zero q-value."""
+    accepted = set()
+    refused = set()
+    for item in value.lower().split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, number = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(coding.strip())
+    if '*' in accepted:
+        # The wildcard covers codings not listed explicitly
+        accepted.update(set(SUPPORTED_ENCODINGS) - refused)
+    return frozenset(accepted)
+
+
+def choose_encoding(accepted: FrozenSet[str]) -> Optional[str]:
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def accepts_encoding(encoding: str) -> bool:
+    """True if the current request's client accepts the content coding."""
+    return encoding.lower() in _accepted_encodings.get()
+
+
+def preferred_encoding() -> Optional[str]:
+    """The encoding to compress the current request's response with, if any."""
+    if not COMPRESSION_ENABLED:
+        return None
+    return choose_encoding(_accepted_encodings.get())
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    if content_type.startswith(UNCOMPRESSED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return StreamCompressor('gzip').finish(body)
+
+
+class StreamCompressor:
+    """Incremental compressor flushing each chunk, so streamed lines arrive promptly."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits=31: gzip container
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(chunk) + self._brotli.finish()
+        return self._zlib.compress(chunk) + self._zlib.flush()
+
+
+class CompressionStats:
+    def __init__(self):
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.below_threshold = 0
+        self.already_encoded = 0
+        self.cached_compressions = 0
+        self.cached_reuses = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "encodings": list(SUPPORTED_ENCODINGS),
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "below_threshold": self.below_threshold,
+            "already_encoded": self.already_encoded,
+            "cached_compressions": self.cached_compressions,
+            "cached_reuses": self.cached_reuses,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class _CompressingSend:
+    """
+    Wraps one response's send(). The start message is held until enough
+    body has been seen to decide: below minimum_size the response goes
+    out untouched, otherwise it is compressed in one piece (complete
+    bodies) or chunk by chunk (streams).
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Dict[str, Any]] = None
+        self.headers: Optional[MutableHeaders] = None
+        self.buffer = bytearray()
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=list(message.get("headers", [])))
+            if "content-encoding" in headers:
+                compression_stats.already_encoded += 1
+                self.passthrough = True
+            elif message["status"] in (204, 304) or not is_compressible(headers.get("content-type")):
+                self.passthrough = True
+            if self.passthrough:
+                await self.send(message)
+                return
+            self.start = {**message, "headers": headers.raw}
+            self.headers = headers
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size:
+                if more_body:
+                    return
+                compression_stats.below_threshold += 1
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": bytes(self.buffer), "more_body": False})
+                return
+            body, self.buffer = bytes(self.buffer), bytearray()
+            self.headers["content-encoding"] = self.encoding
+            self.headers.add_vary_header("Accept-Encoding")
+            if "content-length" in self.headers:
+                del self.headers["content-length"]
+            self.compressor = StreamCompressor(self.encoding)
+            if not more_body:
+                data = self.compressor.finish(body)
+                self.headers["content-length"] = str(len(data))
+                self._record(len(body), len(data))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data, "more_body": False})
+                return
+            await self.send(self.start)
+
+        data = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        self._record(len(body), len(data), finished=not more_body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    @staticmethod
+    def _record(bytes_in: int, bytes_out: int, finished: bool = True) -> None:
+        compression_stats.bytes_in += bytes_in
+        compression_stats.bytes_out += bytes_out
+        if finished:
+            compression_stats.compressed += 1
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware negotiating Accept-Encoding. It also publishes the
+    client's accepted encodings for the request, so cached and relayed
+    responses can be served already compressed.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ''
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode('latin-1')
+                break
+        accepted = parse_accept_encoding(accept_encoding) if accept_encoding else frozenset()
+        encoding = choose_encoding(accepted)
+        token = _accepted_encodings.set(accepted)
+        try:
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+        finally:
+            _accepted_encodings.reset(token)
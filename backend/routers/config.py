@@ -24,3 +24,161 @@ JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+
+# Local access-token checks before any upstream call.
+# Off unless the upstream signing secret is configured via JWT_SECRET; when
+# enabled, JWT expiry and format are checked and the signature is verified
+# if JWT_VERIFY_SIGNATURE. Opaque (non-JWT) tokens are left to the upstream.
+JWT_LOCAL_VERIFICATION = os.getenv(
+    'JWT_LOCAL_VERIFICATION', 'true' if 'JWT_SECRET' in os.environ else 'false'
+).lower() == 'true'
+JWT_VERIFY_SIGNATURE = os.getenv(
+    'JWT_VERIFY_SIGNATURE', 'true' if 'JWT_SECRET' in os.environ else 'false'
+).lower() == 'true'
+JWT_LEEWAY_SECONDS = int(os.getenv('JWT_LEEWAY_SECONDS', '10'))
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv('JWT_CLAIMS_CACHE_SIZE', '10000'))
+JWT_CLAIMS_CACHE_TTL_SECONDS = float(os.getenv('JWT_CLAIMS_CACHE_TTL_SECONDS', '300'))
+
+# Upstream HTTP client (shared, app-lifetime connection pool)
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', '100'))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_KEEPALIVE_CONNECTIONS', '20'))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv('UPSTREAM_KEEPALIVE_EXPIRY', '30.0'))
+UPSTREAM_HTTP2 = os.getenv('UPSTREAM_HTTP2', 'true').lower() == 'true'
+
+# Proxy responses
+# When enabled, pass-through endpoints decode upstream bodies and validate
+# them against their response_model instead of streaming raw bytes (debug).
+PROXY_VALIDATE_RESPONSES = os.getenv('PROXY_VALIDATE_RESPONSES', 'false').lower() == 'true'
+
+# Per-user read cache (GET /auth/me, GET /premium/status)
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '15'))
+USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000'))
+
+# Upstream circuit breakers (per upstream route)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT_SECONDS = float(os.getenv('CIRCUIT_RESET_TIMEOUT_SECONDS', '30'))
+CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv('CIRCUIT_HALF_OPEN_MAX_CALLS', '1'))
+
+# Upstream timeouts & retries per route class (seconds)
+UPSTREAM_READ_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_READ_CONNECT_TIMEOUT', '2.0'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '5.0'))
+UPSTREAM_READ_RETRIES = int(os.getenv('UPSTREAM_READ_RETRIES', '2'))
+UPSTREAM_POLL_TIMEOUT = float(os.getenv('UPSTREAM_POLL_TIMEOUT', '3.0'))
+UPSTREAM_WRITE_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_WRITE_CONNECT_TIMEOUT', '5.0'))
+UPSTREAM_WRITE_TIMEOUT = float(os.getenv('UPSTREAM_WRITE_TIMEOUT', '30.0'))
+UPSTREAM_EXPORT_TIMEOUT = float(os.getenv('UPSTREAM_EXPORT_TIMEOUT', '60.0'))
+UPSTREAM_RETRY_BACKOFF_BASE = float(os.getenv('UPSTREAM_RETRY_BACKOFF_BASE', '0.1'))
+UPSTREAM_RETRY_BACKOFF_MAX = float(os.getenv('UPSTREAM_RETRY_BACKOFF_MAX', '1.0'))
+UPSTREAM_RETRY_BUDGET_RATIO = float(os.getenv('UPSTREAM_RETRY_BUDGET_RATIO', '0.1'))
+UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv('UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND', '1.0'))
+
+# Google/Apple auth status long-poll & SSE
+AUTH_STATUS_POLL_INTERVAL = float(os.getenv('AUTH_STATUS_POLL_INTERVAL', '1.0'))
+AUTH_STATUS_WATCH_MAX_SECONDS = float(os.getenv('AUTH_STATUS_WATCH_MAX_SECONDS', '600'))
+AUTH_STATUS_SSE_HEARTBEAT_SECONDS = float(os.getenv('AUTH_STATUS_SSE_HEARTBEAT_SECONDS', '15'))
+AUTH_STATUS_MAX_WAIT_SECONDS = float(os.getenv('AUTH_STATUS_MAX_WAIT_SECONDS', '55'))
+
+# RevenueCat webhook ingestion queue (Mongo-backed)
+WEBHOOK_QUEUE_ENABLED = os.getenv('WEBHOOK_QUEUE_ENABLED', 'true').lower() == 'true'
+WEBHOOK_QUEUE_WORKERS = int(os.getenv('WEBHOOK_QUEUE_WORKERS', '4'))
+WEBHOOK_QUEUE_BATCH_SIZE = int(os.getenv('WEBHOOK_QUEUE_BATCH_SIZE', '50'))
+WEBHOOK_QUEUE_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_QUEUE_MAX_ATTEMPTS', '8'))
+WEBHOOK_QUEUE_POLL_INTERVAL = float(os.getenv('WEBHOOK_QUEUE_POLL_INTERVAL', '1.0'))
+WEBHOOK_QUEUE_LEASE_SECONDS = float(os.getenv('WEBHOOK_QUEUE_LEASE_SECONDS', '120'))
+WEBHOOK_QUEUE_RETENTION_DAYS = float(os.getenv('WEBHOOK_QUEUE_RETENTION_DAYS', '7'))
+WEBHOOK_QUEUE_START_RETRY_SECONDS = float(os.getenv('WEBHOOK_QUEUE_START_RETRY_SECONDS', '10'))
+
+# RevenueCat webhook deduplication (by event id)
+WEBHOOK_DEDUP_MEMORY_SIZE = int(os.getenv('WEBHOOK_DEDUP_MEMORY_SIZE', '50000'))
+WEBHOOK_DEDUP_TTL_HOURS = float(os.getenv('WEBHOOK_DEDUP_TTL_HOURS', '72'))
+# Where accepted event ids are shared when STATE_BACKEND keeps state per worker:
+# 'mongo' (default, catches redeliveries reaching another worker) or 'memory'
+WEBHOOK_DEDUP_BACKEND = os.getenv('WEBHOOK_DEDUP_BACKEND', 'mongo')
+
+# Background jobs (bulk notifications, data export)
+JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', '3600'))
+JOB_MAX_RETAINED = int(os.getenv('JOB_MAX_RETAINED', '1000'))
+JOB_SSE_HEARTBEAT_SECONDS = float(os.getenv('JOB_SSE_HEARTBEAT_SECONDS', '15'))
+# Jobs of one kind waiting for a slot before new submissions get 503
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '100'))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv('JOB_RETRY_AFTER_SECONDS', '30'))
+
+# Bulk notification fan-out
+NOTIFICATION_BULK_BATCH_SIZE = int(os.getenv('NOTIFICATION_BULK_BATCH_SIZE', '500'))
+NOTIFICATION_BULK_CONCURRENCY = int(os.getenv('NOTIFICATION_BULK_CONCURRENCY', '4'))
+NOTIFICATION_BULK_MAX_JOBS = int(os.getenv('NOTIFICATION_BULK_MAX_JOBS', '2'))
+NOTIFICATION_BULK_BATCH_ATTEMPTS = int(os.getenv('NOTIFICATION_BULK_BATCH_ATTEMPTS', '3'))
+
+# Background data export jobs
+UPSTREAM_EXPORT_JOB_TIMEOUT = float(os.getenv('UPSTREAM_EXPORT_JOB_TIMEOUT', '300.0'))
+EXPORT_JOB_MAX_CONCURRENT = int(os.getenv('EXPORT_JOB_MAX_CONCURRENT', '4'))
+EXPORT_JOB_EVENTS_MAX_SECONDS = float(os.getenv('EXPORT_JOB_EVENTS_MAX_SECONDS', '600'))
+
+# Prometheus metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Request tracing (W3C traceparent); off unless spans have somewhere to go
+TRACING_EXPORT_PATH = os.getenv('TRACING_EXPORT_PATH', '')
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true' if TRACING_EXPORT_PATH else 'false').lower() == 'true'
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+TRACING_EXPORT_INTERVAL_SECONDS = float(os.getenv('TRACING_EXPORT_INTERVAL_SECONDS', '5'))
+TRACING_BUFFER_SIZE = int(os.getenv('TRACING_BUFFER_SIZE', '10000'))
+
+# GET /api/status paging
+STATUS_PAGE_MAX_LIMIT = int(os.getenv('STATUS_PAGE_MAX_LIMIT', '1000'))
+STATUS_STREAM_BATCH_SIZE = int(os.getenv('STATUS_STREAM_BATCH_SIZE', '500'))
+
+# Write-behind buffer for POST /api/status
+STATUS_WRITE_BUFFER_ENABLED = os.getenv('STATUS_WRITE_BUFFER_ENABLED', 'false').lower() == 'true'
+STATUS_WRITE_BATCH_SIZE = int(os.getenv('STATUS_WRITE_BATCH_SIZE', '500'))
+STATUS_WRITE_FLUSH_INTERVAL = float(os.getenv('STATUS_WRITE_FLUSH_INTERVAL', '0.5'))
+STATUS_WRITE_MAX_PENDING = int(os.getenv('STATUS_WRITE_MAX_PENDING', '10000'))
+
+# MongoDB connection pool
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '20000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')  # e.g. 'zstd,zlib'
+MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+MONGO_WARMUP_CONNECTIONS = int(os.getenv('MONGO_WARMUP_CONNECTIONS', '10'))
+
+# Readiness: background dependency probes
+READINESS_PROBE_INTERVAL = float(os.getenv('READINESS_PROBE_INTERVAL', '10'))
+READINESS_PROBE_TIMEOUT = float(os.getenv('READINESS_PROBE_TIMEOUT', '3'))
+READINESS_POOL_SATURATION = float(os.getenv('READINESS_POOL_SATURATION', '0.9'))
+
+# Rate limiting for auth/OTP endpoints (token buckets)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+# Proxies in front of the app appending to X-Forwarded-For (the ingress by
+# default); 0 when clients connect directly and the socket peer is the client
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '1'))
+RATE_LIMIT_IP_CAPACITY = float(os.getenv('RATE_LIMIT_IP_CAPACITY', '30'))
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv('RATE_LIMIT_IP_PER_MINUTE', '30'))
+RATE_LIMIT_EMAIL_CAPACITY = float(os.getenv('RATE_LIMIT_EMAIL_CAPACITY', '5'))
+RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv('RATE_LIMIT_EMAIL_PER_MINUTE', '3'))
+RATE_LIMIT_TOKEN_CAPACITY = float(os.getenv('RATE_LIMIT_TOKEN_CAPACITY', '20'))
+RATE_LIMIT_TOKEN_PER_MINUTE = float(os.getenv('RATE_LIMIT_TOKEN_PER_MINUTE', '20'))
+
+# Shared state across worker processes (rate limits, webhook dedup, cache invalidation)
+# 'memory' (per worker, no I/O) or 'mongo' (shared; a round trip per rate limit check and webhook)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+STATE_MEMORY_MAX_KEYS = int(os.getenv('STATE_MEMORY_MAX_KEYS', '100000'))
+STATE_SYNC_INTERVAL_SECONDS = float(os.getenv('STATE_SYNC_INTERVAL_SECONDS', '0.5'))
+STATE_EVENTS_TTL_SECONDS = int(os.getenv('STATE_EVENTS_TTL_SECONDS', '300'))
+
+# Startup: mount rarely used routers (pdf_read, delete_account, webhooks) on first use
+LAZY_ROUTERS_ENABLED = os.getenv('LAZY_ROUTERS_ENABLED', 'false').lower() == 'true'
+
+# JSON encoding/decoding with orjson (falls back to the standard library if not installed)
+JSON_ORJSON_ENABLED = os.getenv('JSON_ORJSON_ENABLED', 'true').lower() == 'true'
+
+# Response compression (brotli when installed, else gzip)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
@@ -0,0 +1,110 @@
+# ============================================================
+# StyleAdvisor AI - MongoDB Client & Warmup
+# ============================================================
+# Builds the Motor client from the MONGO_* settings and warms
+# it up on startup: server selection, a set of pre-opened pool
+# connections and the indexes the app relies on. The app only
+# reports ready once warmup has succeeded, so the first
+# requests after a deploy do not pay those costs.
+# ============================================================
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from routers.config import (
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_READ_PREFERENCE,
+    MONGO_WARMUP_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, options) created during warmup
+INDEXES: List[Tuple[str, List[Tuple[str, int]], Dict[str, Any]]] = [
+    # Supports the (timestamp, id) cursor order of GET /api/status
+    ("status_checks", [("timestamp", 1), ("id", 1)], {}),
+]
+
+
+def create_mongo_client(url: str) -> AsyncIOMotorClient:
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+    if MONGO_COMPRESSORS:
+        # pymongo warns about and skips compressors whose library is missing
+        options["compressors"] = MONGO_COMPRESSORS
+    return AsyncIOMotorClient(url, **options)
+
+
+class MongoWarmup:
+    """Warms up the client in the background, retrying until it succeeds."""
+
+    def __init__(self, connections: int = MONGO_WARMUP_CONNECTIONS):
+        self.connections = connections
+        self.ready = False
+        self.attempts = 0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, db) -> None:
+        delay = 1.0
+        while not self.ready:
+            self.attempts += 1
+            started = time.monotonic()
+            try:
+                await self.warm_up(db)
+            except Exception as e:
+                self.error = str(e)
+                logger.warning(f"MongoDB warmup attempt {self.attempts} failed: {self.error}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            else:
+                self.ready = True
+                self.error = None
+                self.duration = round(time.monotonic() - started, 3)
+                logger.info(f"MongoDB warm in {self.duration}s")
+
+    async def warm_up(self, db) -> None:
+        # Concurrent pings check out separate connections, pre-opening the pool
+        await asyncio.gather(*(db.command("ping") for _ in range(max(1, self.connections))))
+        for collection, keys, options in INDEXES:
+            await db[collection].create_index(keys, **options)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "warmup_seconds": self.duration,
+            "error": self.error,
+        }
+
+
+mongo_warmup = MongoWarmup()
@@ -4,15 +4,22 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/delete-account
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from typing import Optional, Dict, Any
+from routers.proxy import UpstreamService
+from routers.security import AuthContext, require_access_token
+from routers.policies import EXPORT, EXPORT_JOB
+from routers.jobs import Job, JobManager
+from routers.config import EXPORT_JOB_MAX_CONCURRENT, EXPORT_JOB_EVENTS_MAX_SECONDS
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/delete-account", tags=["Delete Account"])
+router = APIRouter(prefix="/delete-account", tags=["Delete Account"], route_class=FastJSONRoute)
 
-EXTERNAL_DELETE_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/delete-account"
+delete_upstream = UpstreamService("delete_account", "/api/v1/delete-account")
+
+export_jobs = JobManager("data_export", max_concurrent=EXPORT_JOB_MAX_CONCURRENT)
 
 # ============ Models ============
 
@@ -32,6 +39,16 @@ class ExportDataResponse(BaseModel):
     message: str
     download_url: Optional[str] = None
     expires_at: Optional[str] = None
+    job_id: Optional[str] = None
+
+class ExportJobStatus(BaseModel):
+    job_id: str
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    download_url: Optional[str] = None
+    expires_at: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
 
 class RestoreAccountRequest(BaseModel):
     job_id: str
@@ -47,12 +64,59 @@ class DeletionJobStatus(BaseModel):
     scheduled_date: Optional[str] = None
     completed_at: Optional[str] = None
 
+# ============ Export jobs ============
+
+def _job_owner(auth: AuthContext) -> str:
+    """Jobs follow the user across token refreshes when the token is verified."""
+    if auth.verified and auth.user_id:
+        return f"user:{auth.user_id}"
+    return f"token:{auth.token_hash}"
+
+
+async def _run_export(job: Job, authorization: str) -> Dict[str, Any]:
+    job.update(stage='exporting')
+    result = await delete_upstream.forward(
+        "POST", "/export",
+        authorization=authorization,
+        policy=EXPORT_JOB,
+        error_message='Failed to export data'
+    )
+    if not isinstance(result, dict):
+        result = {}
+    job.update(stage='ready')
+    return {
+        "message": result.get('message'),
+        "download_url": result.get('download_url'),
+        "expires_at": result.get('expires_at'),
+    }
+
+
+def _export_job_status(job: Job) -> Dict[str, Any]:
+    result = job.result or {}
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "download_url": result.get('download_url'),
+        "expires_at": result.get('expires_at'),
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+
+
+def _get_export_job(job_id: str, auth: AuthContext) -> Job:
+    job = export_jobs.get(job_id, _job_owner(auth))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
 # ============ Endpoints ============
 
 @router.post("", response_model=DeleteAccountResponse, summary="Initiate account deletion")
 async def initiate_account_deletion(
     request: DeleteAccountRequest,
-    authorization: Optional[str] = Header(None)
+    auth: AuthContext = Depends(require_access_token)
 ):
     """
     Initiate the account deletion process.
@@ -64,36 +128,30 @@ async def initiate_account_deletion(
     Account deletion is typically delayed (e.g., 30 days) to allow for recovery.
     During this period, the account is deactivated but can be restored.
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                EXTERNAL_DELETE_URL,
-                json=request.dict(),
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to initiate deletion')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await delete_upstream.relay(
+        "POST",
+        json=request.dict(),
+        authorization=auth.authorization,
+        error_message='Failed to initiate deletion'
+    )
 
 
 @router.post("/export", response_model=ExportDataResponse, summary="Export user data (GDPR)")
-async def export_user_data(authorization: Optional[str] = Header(None)):
+async def export_user_data(
+    background: bool = Query(False),
+    auth: AuthContext = Depends(require_access_token)
+):
     """
     Export all user data in compliance with GDPR/KVKK.
     
     Returns a download URL for a file containing all user data.
     The download link is temporary and expires after a set time.
     
+    - **background**: Return a **job_id** immediately and run the export
+      in the background; follow it with `GET /export/jobs/{job_id}` or
+      `GET /export/jobs/{job_id}/events`. A user's export already in
+      progress is returned instead of starting another.
+    
     Data includes:
     - Profile information
     - Wardrobe items
@@ -101,31 +159,58 @@ async def export_user_data(authorization: Optional[str] = Header(None)):
     - Favorites
     - Settings and preferences
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
+    if background:
+        owner = _job_owner(auth)
+        job = export_jobs.find_active(owner)
+        if job is None:
+            authorization = auth.authorization
+            job = export_jobs.submit(lambda job: _run_export(job, authorization), owner=owner)
+        return ExportDataResponse(success=True, message="Data export started", job_id=job.id)
+
+    return await delete_upstream.relay(
+        "POST", "/export",
+        authorization=auth.authorization,
+        policy=EXPORT,  # Longer timeout for data export, never retried
+        error_message='Failed to export data'
+    )
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobStatus, summary="Get data export job status")
+async def get_export_job(job_id: str, auth: AuthContext = Depends(require_access_token)):
+    """
+    Get the status of a background data export.
+    
+    - **job_id**: The job ID returned by `POST /export?background=true`
+    
+    Once completed, **download_url** and **expires_at** are set.
+    """
+    return _export_job_status(_get_export_job(job_id, auth))
+
+
+@router.get("/export/jobs/{job_id}/events", summary="Stream data export job status (Server-Sent Events)")
+async def stream_export_job(
+    job_id: str,
+    timeout: float = Query(300.0, gt=0, le=EXPORT_JOB_EVENTS_MAX_SECONDS),
+    auth: AuthContext = Depends(require_access_token)
+):
+    """
+    Server-Sent Events variant of /export/jobs/{job_id}.
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_DELETE_URL}/export",
-                headers={"Authorization": authorization},
-                timeout=60.0  # Longer timeout for data export
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to export data')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    Emits a 'progress' event on every change and a final 'completed' or
+    'failed' event, then closes the stream.
+    """
+    job = _get_export_job(job_id, auth)
+    return StreamingResponse(
+        export_jobs.events(job, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("/restore", response_model=RestoreAccountResponse, summary="Restore deleted account")
 async def restore_account(
     request: RestoreAccountRequest,
-    authorization: Optional[str] = Header(None)
+    auth: AuthContext = Depends(require_access_token)
 ):
     """
     Restore a deleted account before the grace period ends.
@@ -135,32 +220,35 @@ async def restore_account(
     This can only be done during the grace period (typically 30 days).
     After the grace period, the account and all data are permanently deleted.
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
+    return await delete_upstream.relay(
+        "POST", "/restore",
+        json=request.dict(),
+        authorization=auth.authorization,
+        error_message='Failed to restore account'
+    )
+
+
+@router.get("/jobs/latest", response_model=DeletionJobStatus, summary="Get latest deletion job for user")
+async def get_latest_deletion_job(auth: AuthContext = Depends(require_access_token)):
+    """
+    Get the most recent deletion job for the authenticated user.
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_DELETE_URL}/restore",
-                json=request.dict(),
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to restore account')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    Useful to check if there's an active deletion request.
+    Concurrent identical calls share a single upstream request.
+    """
+    return await delete_upstream.relay(
+        "GET", "/jobs/latest",
+        authorization=auth.authorization,
+        error_message='Failed to get latest job',
+        status_messages={404: "No deletion job found"},
+        coalesce=True
+    )
 
 
 @router.get("/jobs/{job_id}", response_model=DeletionJobStatus, summary="Get deletion job status")
 async def get_deletion_job_status(
     job_id: str,
-    authorization: Optional[str] = Header(None)
+    auth: AuthContext = Depends(require_access_token)
 ):
     """
     Get the status of a specific deletion job.
@@ -173,52 +261,10 @@ async def get_deletion_job_status(
     - 'completed': Deletion finished
     - 'cancelled': Deletion was cancelled (account restored)
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_DELETE_URL}/jobs/{job_id}",
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get job status')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
-
-
-@router.get("/jobs/latest", response_model=DeletionJobStatus, summary="Get latest deletion job for user")
-async def get_latest_deletion_job(authorization: Optional[str] = Header(None)):
-    """
-    Get the most recent deletion job for the authenticated user.
-    
-    Useful to check if there's an active deletion request.
-    """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_DELETE_URL}/jobs/latest",
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                raise HTTPException(status_code=404, detail="No deletion job found")
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get latest job')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await delete_upstream.relay(
+        "GET", "/jobs/{job_id}",
+        path_params={"job_id": job_id},
+        authorization=auth.authorization,
+        error_message='Failed to get job status',
+        coalesce=True
+    )
@@ -4,14 +4,15 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/auth/email
 # ============================================================
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Request
 from pydantic import BaseModel, EmailStr
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.rate_limit import rate_limiter
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/auth/email", tags=["Email OTP"])
+router = APIRouter(prefix="/auth/email", tags=["Email OTP"], route_class=FastJSONRoute)
 
-EXTERNAL_EMAIL_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/auth/email"
+email_upstream = UpstreamService("email_otp", "/api/v1/auth/email")
 
 # ============ Models ============
 
@@ -35,7 +36,7 @@ class OTPVerifyResponse(BaseModel):
 # ============ Endpoints ============
 
 @router.post("/start", response_model=OTPStartResponse, summary="Request OTP code")
-async def start_email_otp(request: EmailOTPStartRequest):
+async def start_email_otp(request: EmailOTPStartRequest, http_request: Request):
     """
     Request an OTP code to be sent to the provided email address.
     
@@ -43,22 +44,12 @@ async def start_email_otp(request: EmailOTPStartRequest):
     
     The OTP will be valid for a limited time (usually 5 minutes).
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_EMAIL_URL}/start",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to send OTP')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    await rate_limiter.check(http_request, 'email_otp_start', email=request.email)
+    return await email_upstream.relay(
+        "POST", "/start",
+        json=request.dict(),
+        error_message='Failed to send OTP'
+    )
 
 
 @router.post("/verify", response_model=OTPVerifyResponse, summary="Verify OTP and login")
@@ -71,19 +62,8 @@ async def verify_email_otp(request: EmailOTPVerifyRequest):
     
     Returns access token and user info on success.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_EMAIL_URL}/verify",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'OTP verification failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await email_upstream.relay(
+        "POST", "/verify",
+        json=request.dict(),
+        error_message='OTP verification failed'
+    )
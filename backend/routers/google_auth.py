@@ -4,15 +4,20 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/auth/google
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Query
+from starlette.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.auth_status import AuthStatusWatcher
+from routers.config import AUTH_STATUS_MAX_WAIT_SECONDS, AUTH_STATUS_WATCH_MAX_SECONDS
+from routers.policies import POLL, WRITE
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/auth/google", tags=["Google Auth"])
+router = APIRouter(prefix="/auth/google", tags=["Google Auth"], route_class=FastJSONRoute)
 
-EXTERNAL_GOOGLE_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/auth/google"
+google_upstream = UpstreamService("google_auth", "/api/v1/auth/google")
+google_status_watcher = AuthStatusWatcher(google_upstream, 'Failed to get auth status')
 
 # ============ Models ============
 
@@ -44,23 +49,11 @@ async def start_google_auth(request: GoogleAuthStartRequest = None):
     Returns an ID to track the auth status and the URL to redirect the user to.
     The ID should be used to poll the /status endpoint.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            body = request.dict() if request else {}
-            response = await client.post(
-                f"{EXTERNAL_GOOGLE_URL}/start",
-                json=body,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to start Google auth')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await google_upstream.relay(
+        "POST", "/start",
+        json=request.dict() if request else {},
+        error_message='Failed to start Google auth'
+    )
 
 
 @router.get("/status/{auth_id}", response_model=GoogleAuthStatusResponse, summary="Check Google auth status")
@@ -77,21 +70,51 @@ async def check_google_auth_status(auth_id: str):
     - 'expired': Auth session expired
     - 'error': Auth failed
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_GOOGLE_URL}/status/{auth_id}",
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get auth status')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await google_upstream.relay(
+        "GET", "/status/{auth_id}",
+        path_params={"auth_id": auth_id},
+        policy=POLL,
+        error_message='Failed to get auth status'
+    )
+
+
+@router.get("/status/{auth_id}/wait", response_model=GoogleAuthStatusResponse, summary="Wait for Google auth status (long-poll)")
+async def wait_google_auth_status(
+    auth_id: str,
+    timeout: float = Query(25.0, gt=0, le=AUTH_STATUS_MAX_WAIT_SECONDS)
+):
+    """
+    Long-poll variant of /status/{auth_id}.
+    
+    - **auth_id**: The ID returned from /start endpoint
+    - **timeout**: Maximum seconds to hold the request open
+    
+    Returns as soon as the Google OAuth flow reaches a terminal status
+    ('completed', 'expired', 'error'), or the latest status when the
+    timeout passes first. All clients waiting on the same auth_id share
+    a single upstream poller.
+    """
+    latest = await google_status_watcher.wait(auth_id, timeout)
+    return latest.to_response()
+
+
+@router.get("/status/{auth_id}/events", summary="Stream Google auth status (Server-Sent Events)")
+async def stream_google_auth_status(
+    auth_id: str,
+    timeout: float = Query(300.0, gt=0, le=AUTH_STATUS_WATCH_MAX_SECONDS)
+):
+    """
+    Server-Sent Events variant of /status/{auth_id}.
+    
+    Emits a 'status' event with the status payload on every change and
+    closes the stream after a terminal status. Comment lines are sent as
+    keep-alives while nothing changes.
+    """
+    return StreamingResponse(
+        google_status_watcher.events(auth_id, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/callback", response_model=GoogleCallbackResponse, summary="Google OAuth callback")
@@ -106,27 +129,17 @@ async def google_callback(
     This endpoint is called by Google after the user authorizes the application.
     It should not be called directly by clients.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            params = {}
-            if code:
-                params['code'] = code
-            if state:
-                params['state'] = state
-            if error:
-                params['error'] = error
-                
-            response = await client.get(
-                f"{EXTERNAL_GOOGLE_URL}/callback",
-                params=params,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Google callback failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    params = {}
+    if code:
+        params['code'] = code
+    if state:
+        params['state'] = state
+    if error:
+        params['error'] = error
+
+    return await google_upstream.relay(
+        "GET", "/callback",
+        params=params,
+        policy=WRITE,  # Exchanges a one-time code; must not be retried
+        error_message='Google callback failed'
+    )
@@ -0,0 +1,244 @@
+# ============================================================
+# StyleAdvisor AI - Background Jobs
+# ============================================================
+# Long-running work (bulk notification fan-out, data export)
+# runs as an in-process background job instead of holding the
+# client connection. The POST returns a job id; clients read
+# progress from a status endpoint or a Server-Sent-Events
+# stream. Jobs live in memory of the worker that created them.
+# ============================================================
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from routers.serialization import dumps
+from routers.config import (
+    JOB_RETENTION_SECONDS,
+    JOB_MAX_RETAINED,
+    JOB_SSE_HEARTBEAT_SECONDS,
+    JOB_MAX_PENDING,
+    JOB_RETRY_AFTER_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+FINISHED_STATUSES = frozenset({COMPLETED, FAILED})
+
+
+class JobQueueFullError(HTTPException):
+    """Raised when too many jobs of a kind are already waiting (503)."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Too many jobs queued, please try again later",
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+
+
+class Job:
+    """State and progress of one background job."""
+
+    def __init__(self, kind: str, owner: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = PENDING
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.updated_at = self.created_at
+        self.finished_monotonic: Optional[float] = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def update(self, **progress: Any) -> None:
+        """Merge progress fields and wake status/SSE readers."""
+        self.progress.update(progress)
+        self._touch()
+
+    def _finish(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_monotonic = time.monotonic()
+        self._touch()
+
+    def _touch(self) -> None:
+        self.updated_at = datetime.utcnow()
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, version: int, timeout: float) -> None:
+        if self.version != version:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class JobManager:
+    """
+    Runs jobs of one kind with at most `max_concurrent` executing at once;
+    the rest wait as pending, up to `max_pending` of them. Pending jobs
+    hold their inputs in memory, so once the queue is full submissions
+    are rejected with JobQueueFullError instead. Finished jobs are kept for
+    JOB_RETENTION_SECONDS (at most JOB_MAX_RETAINED) so clients can
+    collect the result.
+    """
+
+    def __init__(self, kind: str, max_concurrent: int, max_pending: int = JOB_MAX_PENDING):
+        self.kind = kind
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == PENDING)
+
+    def ensure_capacity(self) -> None:
+        """Raise JobQueueFullError (503) while `max_pending` jobs are already waiting."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise JobQueueFullError()
+
+    def submit(
+        self,
+        run: Callable[[Job], Awaitable[Optional[Dict[str, Any]]]],
+        owner: Optional[str] = None,
+        check_capacity: bool = True,
+    ) -> Job:
+        """
+        Start `run(job)` in the background. Its return value becomes the
+        job result; an exception marks the job failed.
+
+        Raises JobQueueFullError when the pending queue is full. Callers
+        that do work before submitting check ensure_capacity() first and
+        pass check_capacity=False, so an accepted request is not rejected
+        halfway.
+        """
+        if check_capacity:
+            self.ensure_capacity()
+        self._evict()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        job = Job(self.kind, owner)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.ensure_future(self._execute(job, run))
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """Look up a job; jobs belonging to another owner are reported as missing."""
+        job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def find_active(self, owner: Optional[str]) -> Optional[Job]:
+        """The owner's pending or running job, if any."""
+        for job in self._jobs.values():
+            if job.owner == owner and not job.finished:
+                return job
+        return None
+
+    async def _execute(self, job: Job, run: Callable[[Job], Awaitable[Optional[Dict[str, Any]]]]) -> None:
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job._touch()
+                result = await run(job)
+            job._finish(COMPLETED, result=result)
+            self.completed += 1
+        except asyncio.CancelledError:
+            job._finish(FAILED, error="Job cancelled")
+            self.failed += 1
+            raise
+        except Exception as e:
+            logger.error(f"{self.kind} job {job.id} failed: {str(e)}")
+            job._finish(FAILED, error=getattr(e, 'detail', None) or str(e))
+            self.failed += 1
+        finally:
+            self._tasks.pop(job.id, None)
+
+    async def events(self, job: Job, timeout: float) -> AsyncIterator[str]:
+        """Server-Sent-Events stream of job updates, ending when the job finishes."""
+        deadline = time.monotonic() + timeout
+        seen = -1
+        while True:
+            if job.version != seen:
+                seen = job.version
+                event = job.status if job.finished else 'progress'
+                yield f"event: {event}\ndata: {dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await job.wait_for_change(seen, min(remaining, JOB_SSE_HEARTBEAT_SECONDS))
+            if job.version == seen:
+                yield ": keep-alive\n\n"
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.finished and (
+                now - job.finished_monotonic > JOB_RETENTION_SECONDS
+                or len(self._jobs) > JOB_MAX_RETAINED
+            ):
+                del self._jobs[job_id]
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": sum(1 for j in self._jobs.values() if j.status == RUNNING),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "retained": len(self._jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
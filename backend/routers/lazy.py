@@ -0,0 +1,84 @@
+# ============================================================
+# StyleAdvisor AI - Lazy Router Loading
+# ============================================================
+# Rarely used routers need not be imported while a new worker
+# is spawning. With LAZY_ROUTERS_ENABLED, they are registered
+# here by module name and path prefix only, and imported and
+# mounted on the first request under their prefix (or the
+# first request for the OpenAPI schema).
+# ============================================================
+
+import importlib
+import logging
+import sys
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = 'routers'
+
+
+def loaded(module: str) -> Optional[ModuleType]:
+    """The router module if it has been imported, without importing it."""
+    return sys.modules.get(f"{PACKAGE}.{module}")
+
+
+class LazyRouters:
+    """
+    Router modules waiting to be mounted. `mount(module)` is called with
+    the imported module and must include its router into the app.
+    """
+
+    def __init__(self, mount: Callable[[ModuleType], None]):
+        self.mount = mount
+        self._pending: Dict[str, str] = {}
+        self.load_times: Dict[str, float] = {}
+
+    def add(self, module: str, path_prefix: str) -> None:
+        self._pending[module] = path_prefix
+
+    def load(self, module: str) -> ModuleType:
+        started = time.perf_counter()
+        imported = importlib.import_module(f"{PACKAGE}.{module}")
+        self.mount(imported)
+        self._pending.pop(module, None)
+        self.load_times[module] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Mounted lazy router {module} in {self.load_times[module]}ms")
+        return imported
+
+    def require(self, module: str) -> ModuleType:
+        """The router module, mounting it now if it is still pending."""
+        if module in self._pending:
+            return self.load(module)
+        return importlib.import_module(f"{PACKAGE}.{module}")
+
+    def load_for_path(self, path: str, load_all: bool = False) -> None:
+        modules = [
+            module for module, prefix in self._pending.items()
+            if load_all or path == prefix or path.startswith(prefix + '/')
+        ]
+        # Importing does not yield to the event loop, so no request can
+        # observe a half-mounted router
+        for module in modules:
+            if module in self._pending:
+                self.load(module)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": sorted(self._pending), "load_ms": dict(self.load_times)}
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware mounting a pending router before its first request is routed."""
+
+    def __init__(self, app, routers: LazyRouters, schema_paths: List[str] = ()):
+        self.app = app
+        self.routers = routers
+        self.schema_paths = set(schema_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            self.routers.load_for_path(path, load_all=path in self.schema_paths)
+        await self.app(scope, receive, send)
@@ -0,0 +1,227 @@
+# ============================================================
+# StyleAdvisor AI - Prometheus Metrics
+# ============================================================
+# Request counts, in-flight gauges and latency histograms for
+# every route and every upstream call, rendered in the
+# Prometheus text exposition format. Each request's latency is
+# split into time spent waiting on upstream and local time
+# (everything else), which shows which proxied endpoints drive
+# the tail.
+# ============================================================
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from routers.config import METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Route label for requests that matched no route, so stray paths
+# cannot blow up label cardinality
+UNMATCHED_ROUTE = 'unmatched'
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        if not self._values and not self.label_names:
+            lines.append(f"{self.name} 0")
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                label_str = _format_labels(self.label_names + ('le',), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+# ============ Metrics ============
+
+http_requests = Counter(
+    'styleadvisor_http_requests_total', 'HTTP requests handled.', ('method', 'route', 'status'))
+http_in_flight = Gauge(
+    'styleadvisor_http_requests_in_flight', 'HTTP requests currently being handled.')
+http_duration = Histogram(
+    'styleadvisor_http_request_duration_seconds', 'Total time to handle a request.', ('method', 'route'))
+http_upstream_duration = Histogram(
+    'styleadvisor_http_request_upstream_seconds', 'Part of a request spent waiting on upstream.', ('method', 'route'))
+http_local_duration = Histogram(
+    'styleadvisor_http_request_local_seconds', 'Part of a request spent outside upstream calls.', ('method', 'route'))
+
+upstream_requests = Counter(
+    'styleadvisor_upstream_requests_total', 'Upstream calls, including retries.', ('service', 'route', 'status'))
+upstream_in_flight = Gauge(
+    'styleadvisor_upstream_requests_in_flight', 'Upstream calls currently waiting on a response.', ('service',))
+upstream_duration = Histogram(
+    'styleadvisor_upstream_request_duration_seconds',
+    'Upstream call time until the response (headers only for streamed relays).',
+    ('service', 'route'))
+
+REQUEST_METRICS = (
+    http_requests, http_in_flight, http_duration, http_upstream_duration, http_local_duration,
+    upstream_requests, upstream_in_flight, upstream_duration,
+)
+
+
+class _RequestTiming:
+    __slots__ = ('upstream_seconds',)
+
+    def __init__(self):
+        self.upstream_seconds = 0.0
+
+
+_request_timing: ContextVar[Optional[_RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def observe_upstream(service: str, route: str, status: str, seconds: float) -> None:
+    """Record one upstream call and charge its time to the current request."""
+    upstream_requests.inc(service, route, status)
+    upstream_duration.observe(seconds, service, route)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.upstream_seconds += seconds
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timing = _RequestTiming()
+        token = _request_timing.set(timing)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            _request_timing.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            upstream = min(timing.upstream_seconds, elapsed)
+            http_requests.inc(method, route, str(status["code"]))
+            http_duration.observe(elapsed, method, route)
+            http_upstream_duration.observe(upstream, method, route)
+            http_local_duration.observe(elapsed - upstream, method, route)
+
+
+# ============ Rendering ============
+
+def render_stats(name: str, help_text: str, series: Iterable[Tuple[Dict[str, str], Dict[str, Any]]]) -> List[str]:
+    """
+    Render the numeric fields of stats() dicts as one gauge family, one
+    sample per (labels, field); non-numeric fields are skipped.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, stats in series:
+        label_names = tuple(labels) + ('field',)
+        for field, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                label_str = _format_labels(label_names, tuple(labels.values()) + (field,))
+                lines.append(f"{name}{label_str} {_format_value(value)}")
+    return lines
+
+
+def render_metrics(extra: Iterable[List[str]] = ()) -> str:
+    lines: List[str] = []
+    for metric in REQUEST_METRICS:
+        lines.extend(metric.render())
+    for block in extra:
+        lines.extend(block)
+    return '\n'.join(lines) + '\n'
@@ -4,15 +4,30 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/notifications
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Header
+import asyncio
+import logging
+from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.config import (
+    NOTIFICATION_BULK_BATCH_SIZE,
+    NOTIFICATION_BULK_CONCURRENCY,
+    NOTIFICATION_BULK_MAX_JOBS,
+    NOTIFICATION_BULK_BATCH_ATTEMPTS,
+)
+from routers.proxy import UpstreamService, CircuitOpenError
+from routers.policies import WRITE
+from routers.cache import hash_token
+from routers.jobs import Job, JobManager
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/notifications", tags=["Notifications"])
+logger = logging.getLogger(__name__)
 
-EXTERNAL_NOTIF_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/notifications"
+router = APIRouter(prefix="/notifications", tags=["Notifications"], route_class=FastJSONRoute)
+
+notifications_upstream = UpstreamService("notifications", "/api/v1/notifications")
+
+bulk_notification_jobs = JobManager("bulk_notification", max_concurrent=NOTIFICATION_BULK_MAX_JOBS)
 
 # ============ Models ============
 
@@ -42,6 +57,15 @@ class NotificationResponse(BaseModel):
     success: bool
     message: str
     notification_id: Optional[str] = None
+    job_id: Optional[str] = None
+
+class BulkNotificationJobStatus(BaseModel):
+    job_id: str
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    progress: Dict[str, Any]
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
 
 class NotificationStatsResponse(BaseModel):
     total_sent: int
@@ -64,24 +88,12 @@ async def save_push_token(
     - **platform**: 'ios' or 'android'
     - **device_name**: Optional human-readable device name
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.post(
-                f"{EXTERNAL_NOTIF_URL}/tokens",
-                json=request.dict(),
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to save token')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await notifications_upstream.relay(
+        "POST", "/tokens",
+        json=request.dict(),
+        authorization=authorization,
+        error_message='Failed to save token'
+    )
 
 
 @router.delete("/tokens/{device_id}", response_model=PushTokenResponse, summary="Remove push notification token")
@@ -94,23 +106,12 @@ async def remove_push_token(
     
     - **device_id**: The device ID whose token should be removed
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.delete(
-                f"{EXTERNAL_NOTIF_URL}/tokens/{device_id}",
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to remove token')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await notifications_upstream.relay(
+        "DELETE", "/tokens/{device_id}",
+        path_params={"device_id": device_id},
+        authorization=authorization,
+        error_message='Failed to remove token'
+    )
 
 
 @router.post("/send", response_model=NotificationResponse, summary="Send notification")
@@ -126,24 +127,109 @@ async def send_notification(
     - **body**: Notification body text
     - **data**: Optional additional data payload
     """
-    async with httpx.AsyncClient() as client:
+    return await notifications_upstream.relay(
+        "POST", "/send",
+        json=request.dict(),
+        authorization=authorization,
+        error_message='Failed to send notification'
+    )
+
+
+# ============ Bulk fan-out ============
+
+def _batches(user_ids: List[str], size: int) -> List[List[str]]:
+    return [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+
+async def _send_batch(
+    request: BulkNotificationRequest,
+    user_ids: List[str],
+    authorization: Optional[str]
+) -> Any:
+    """
+    Send one batch. Batches rejected by an open circuit never reached
+    upstream, so only those are retried; other failures are not, since a
+    send that timed out may already have been delivered.
+    """
+    payload = request.dict()
+    payload['user_ids'] = user_ids
+    for attempt in range(1, NOTIFICATION_BULK_BATCH_ATTEMPTS + 1):
         try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.post(
-                f"{EXTERNAL_NOTIF_URL}/send",
-                json=request.dict(),
-                headers=headers,
-                timeout=30.0
+            return await notifications_upstream.forward(
+                "POST", "/send/bulk",
+                json=payload,
+                authorization=authorization,
+                policy=WRITE,
+                error_message='Failed to send bulk notification'
             )
-            if response.status_code == 200:
-                return response.json()
+        except CircuitOpenError as e:
+            if attempt == NOTIFICATION_BULK_BATCH_ATTEMPTS:
+                raise
+            await asyncio.sleep(int(e.headers["Retry-After"]))
+
+
+async def _fan_out(
+    job: Job,
+    request: BulkNotificationRequest,
+    authorization: Optional[str],
+    first_result: Any
+) -> Dict[str, Any]:
+    """
+    Dispatch the remaining batches through NOTIFICATION_BULK_CONCURRENCY
+    workers pulling from a shared queue, so no more than that many batch
+    requests are ever in flight for one job. The first batch was already
+    sent by the endpoint.
+
+    A 4xx from upstream (expired token, forbidden, bad payload) would be
+    returned for every batch, so it stops the whole job; any other
+    unexpected error cancels the remaining workers as well.
+    """
+    batches = _batches(request.user_ids, NOTIFICATION_BULK_BATCH_SIZE)
+    pending: "asyncio.Queue[int]" = asyncio.Queue()
+    for index in range(1, len(batches)):
+        pending.put_nowait(index)
+
+    failed_batches: List[Dict[str, Any]] = []
+    notification_ids: List[str] = []
+    counts = {"batches_sent": 1, "batches_failed": 0, "users_sent": len(batches[0]), "users_failed": 0}
+    if isinstance(first_result, dict) and first_result.get('notification_id'):
+        notification_ids.append(first_result['notification_id'])
+    job.update(total_users=len(request.user_ids), total_batches=len(batches), **counts)
+
+    async def worker() -> None:
+        while not pending.empty():
+            index = pending.get_nowait()
+            batch = batches[index]
+            try:
+                result = await _send_batch(request, batch, authorization)
+            except HTTPException as e:
+                counts["batches_failed"] += 1
+                counts["users_failed"] += len(batch)
+                failed_batches.append({"batch": index, "users": len(batch), "error": e.detail})
+                logger.warning(f"Bulk notification job {job.id} batch {index} failed: {e.detail}")
+                job.update(**counts)
+                if 400 <= e.status_code < 500:
+                    raise
             else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to send notification')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+                counts["batches_sent"] += 1
+                counts["users_sent"] += len(batch)
+                if isinstance(result, dict) and result.get('notification_id'):
+                    notification_ids.append(result['notification_id'])
+                job.update(**counts)
+
+    workers = [
+        asyncio.ensure_future(worker())
+        for _ in range(min(NOTIFICATION_BULK_CONCURRENCY, pending.qsize()))
+    ]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+
+    return {"failed_batches": failed_batches, "notification_ids": notification_ids}
 
 
 @router.post("/send/bulk", response_model=NotificationResponse, summary="Send bulk notification")
@@ -158,25 +244,63 @@ async def send_bulk_notification(
     - **title**: Notification title
     - **body**: Notification body text
     - **data**: Optional additional data payload
+    
+    Up to one batch of users is sent directly. Larger campaigns are split
+    into batches: the first is sent before responding, so an upstream
+    rejection (e.g. 401) is returned as-is, and the rest are fanned out in
+    the background; the response carries a **job_id** for
+    `GET /send/bulk/{job_id}`. While JOB_MAX_PENDING campaigns are already
+    waiting, new ones get 503 with Retry-After before anything is sent.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.post(
-                f"{EXTERNAL_NOTIF_URL}/send/bulk",
-                json=request.dict(),
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to send bulk notification')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    if len(request.user_ids) <= NOTIFICATION_BULK_BATCH_SIZE:
+        return await notifications_upstream.relay(
+            "POST", "/send/bulk",
+            json=request.dict(),
+            authorization=authorization,
+            error_message='Failed to send bulk notification'
+        )
+
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+    # Refuse before the first batch goes out rather than after
+    bulk_notification_jobs.ensure_capacity()
+
+    first_batch = request.user_ids[:NOTIFICATION_BULK_BATCH_SIZE]
+    first_result = await _send_batch(request, first_batch, authorization)
+
+    job = bulk_notification_jobs.submit(
+        lambda job: _fan_out(job, request, authorization, first_result),
+        owner=hash_token(authorization),
+        check_capacity=False
+    )
+    return NotificationResponse(
+        success=True,
+        message=f"Bulk notification queued for {len(request.user_ids)} users",
+        job_id=job.id
+    )
+
+
+@router.get("/send/bulk/{job_id}", response_model=BulkNotificationJobStatus, summary="Get bulk notification progress")
+async def get_bulk_notification_status(
+    job_id: str,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Get the progress of a bulk notification job.
+    
+    - **job_id**: The job ID returned by `POST /send/bulk`
+    
+    Progress counts sent and failed batches and users; once finished the
+    failed batches are listed so they can be resent.
+    """
+    owner = hash_token(authorization) if authorization else None
+    job = bulk_notification_jobs.get(job_id, owner)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    status = job.to_dict()
+    if job.result:
+        status["progress"] = {**job.progress, **job.result}
+    return status
 
 
 @router.get("/stats", response_model=NotificationStatsResponse, summary="Get notification statistics")
@@ -186,20 +310,8 @@ async def get_notification_stats(authorization: Optional[str] = Header(None)):
     
     Returns metrics like total sent, delivered, failed, and delivery rate.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": authorization} if authorization else {}
-            response = await client.get(
-                f"{EXTERNAL_NOTIF_URL}/stats",
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get stats')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await notifications_upstream.relay(
+        "GET", "/stats",
+        authorization=authorization,
+        error_message='Failed to get stats'
+    )
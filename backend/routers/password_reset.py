@@ -4,14 +4,15 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/auth/password-reset
 # ============================================================
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Request
 from pydantic import BaseModel, EmailStr, Field
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.rate_limit import rate_limiter
+from routers.serialization import FastJSONRoute, loads
 
-router = APIRouter(prefix="/auth/password-reset", tags=["Password Reset"])
+router = APIRouter(prefix="/auth/password-reset", tags=["Password Reset"], route_class=FastJSONRoute)
 
-EXTERNAL_PASSWORD_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/auth/password-reset"
+password_upstream = UpstreamService("password_reset", "/api/v1/auth/password-reset")
 
 # ============ Models ============
 
@@ -29,7 +30,7 @@ class PasswordResetResponse(BaseModel):
 # ============ Endpoints ============
 
 @router.post("/request", response_model=PasswordResetResponse, summary="Request password reset")
-async def request_password_reset(request: PasswordResetRequestModel):
+async def request_password_reset(request: PasswordResetRequestModel, http_request: Request):
     """
     Request a password reset email.
     
@@ -38,20 +39,15 @@ async def request_password_reset(request: PasswordResetRequestModel):
     If the email exists, a password reset link will be sent.
     For security, this endpoint returns success even if the email doesn't exist.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_PASSWORD_URL}/request",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                # For security, don't reveal if email exists
-                return {"message": "If the email exists, a reset link has been sent", "success": True}
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    await rate_limiter.check(http_request, 'password_reset_request', email=request.email)
+    response = await password_upstream.send(
+        "POST", "/request",
+        json=request.dict()
+    )
+    if response.status_code == 200:
+        return loads(response.content)
+    # For security, don't reveal if email exists
+    return {"message": "If the email exists, a reset link has been sent", "success": True}
 
 
 @router.post("/confirm", response_model=PasswordResetResponse, summary="Confirm password reset")
@@ -64,19 +60,8 @@ async def confirm_password_reset(request: PasswordResetConfirmModel):
     
     The token is single-use and expires after a set time (usually 1 hour).
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_PASSWORD_URL}/confirm",
-                json=request.dict(),
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Password reset failed')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    return await password_upstream.relay(
+        "POST", "/confirm",
+        json=request.dict(),
+        error_message='Password reset failed'
+    )
@@ -4,13 +4,46 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/pdfread
 # ============================================================
 
-from fastapi import APIRouter, HTTPException
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from fastapi import APIRouter
+from typing import Any, Tuple
+from routers.proxy import UpstreamService, UpstreamUnavailableError
+from routers.policies import PROBE
+from routers.readiness import dependency_prober
+from routers.serialization import FastJSONRoute, loads
 
-router = APIRouter(prefix="/pdfread", tags=["PDF Read"])
+router = APIRouter(prefix="/pdfread", tags=["PDF Read"], route_class=FastJSONRoute)
+
+pdf_upstream = UpstreamService("pdfread", "/api/v1/pdfread")
+
+# ============ Health ============
+
+async def _query_pdf_health() -> Tuple[bool, Any]:
+    """Query the PDF service's own health endpoint; any 2xx counts as healthy."""
+    try:
+        response = await pdf_upstream.send("GET", "/health", policy=PROBE)
+    except UpstreamUnavailableError as e:
+        return False, {
+            "status": "unavailable",
+            "message": f"Cannot reach PDF service: {e.reason}"
+        }
+    if 200 <= response.status_code < 300:
+        # The service's own body, passed through whether or not it has a "status"
+        return True, loads(response.content)
+    return False, {
+        "status": "unhealthy",
+        "message": "PDF service returned non-200 status"
+    }
+
+
+async def check_pdf_health() -> Any:
+    _, health = await _query_pdf_health()
+    return health
+
+
+async def pdf_health_probe() -> Tuple[bool, Any]:
+    """Dependency probe for the readiness prober."""
+    return await _query_pdf_health()
 
-EXTERNAL_PDF_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/pdfread"
 
 # ============ Endpoints ============
 
@@ -19,23 +52,17 @@ async def pdf_read_health():
     """
     Check the health status of the PDF Read service.
     
-    Returns the service status and any relevant metrics.
+    Returns the service status and any relevant metrics. Served from the
+    readiness prober's latest result when it is running.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_PDF_URL}/health",
-                timeout=10.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "status": "unhealthy",
-                    "message": "PDF service returned non-200 status"
-                }
-        except httpx.RequestError as e:
-            return {
-                "status": "unavailable",
-                "message": f"Cannot reach PDF service: {str(e)}"
-            }
+    result = dependency_prober.results.get("pdfread")
+    if result is None:
+        return await check_pdf_health()
+    detail = result["detail"]
+    if not result["ok"] and not (isinstance(detail, dict) and "status" in detail):
+        # The probe itself failed (e.g. timed out)
+        return {
+            "status": "unavailable",
+            "message": f"Cannot reach PDF service: {(detail or {}).get('error')}"
+        }
+    return detail
@@ -0,0 +1,140 @@
+# ============================================================
+# StyleAdvisor AI - Upstream Timeout & Retry Policies
+# ============================================================
+# Each upstream call belongs to a route class with its own
+# connect/read timeouts and retry allowance. Only idempotent
+# reads retry, with jittered exponential backoff, and all
+# retries draw from a shared budget so they cannot multiply
+# load on an upstream that is already struggling.
+# ============================================================
+
+import random
+import time
+from typing import Any, Dict
+
+import httpx
+from routers.config import (
+    UPSTREAM_READ_CONNECT_TIMEOUT,
+    UPSTREAM_READ_TIMEOUT,
+    UPSTREAM_READ_RETRIES,
+    UPSTREAM_POLL_TIMEOUT,
+    UPSTREAM_WRITE_CONNECT_TIMEOUT,
+    UPSTREAM_WRITE_TIMEOUT,
+    UPSTREAM_EXPORT_TIMEOUT,
+    UPSTREAM_EXPORT_JOB_TIMEOUT,
+    UPSTREAM_RETRY_BACKOFF_BASE,
+    UPSTREAM_RETRY_BACKOFF_MAX,
+    UPSTREAM_RETRY_BUDGET_RATIO,
+    UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND,
+)
+
+# Upstream statuses worth retrying for idempotent reads
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+
+class RequestPolicy:
+    """Timeouts and retry allowance for one class of upstream route."""
+
+    __slots__ = ('name', 'connect_timeout', 'read_timeout', 'max_retries', 'backoff_base', 'backoff_max')
+
+    def __init__(
+        self,
+        name: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int = 0,
+        backoff_base: float = UPSTREAM_RETRY_BACKOFF_BASE,
+        backoff_max: float = UPSTREAM_RETRY_BACKOFF_MAX,
+    ):
+        self.name = name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.read_timeout,
+            connect=self.connect_timeout,
+            pool=self.connect_timeout,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of recent requests.
+
+    Every request deposits `ratio` tokens, a retry spends one, and a small
+    per-second allowance keeps low-traffic routes able to retry at all.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "budget_exhausted": self.exhausted,
+            "tokens": round(self._tokens, 2),
+        }
+
+
+# ============ Route classes ============
+
+# Idempotent reads (auth /me, premium /status, job lookups, stats)
+READ = RequestPolicy('read', UPSTREAM_READ_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT, max_retries=UPSTREAM_READ_RETRIES)
+
+# Client-driven status polling (google/apple /status); the client polls again anyway
+POLL = RequestPolicy('poll', UPSTREAM_READ_CONNECT_TIMEOUT, UPSTREAM_POLL_TIMEOUT, max_retries=1)
+
+# Non-idempotent writes (register, send, delete, callbacks) - never retried
+WRITE = RequestPolicy('write', UPSTREAM_WRITE_CONNECT_TIMEOUT, UPSTREAM_WRITE_TIMEOUT)
+
+# Long-running data export - never retried
+EXPORT = RequestPolicy('export', UPSTREAM_WRITE_CONNECT_TIMEOUT, UPSTREAM_EXPORT_TIMEOUT)
+
+# Export run as a background job: no client waiting, so a longer timeout.
+# Never retried: the upstream export POST is not known to be idempotent, and
+# a timed-out attempt may still be running
+EXPORT_JOB = RequestPolicy('export_job', UPSTREAM_WRITE_CONNECT_TIMEOUT, UPSTREAM_EXPORT_JOB_TIMEOUT)
+
+# Dependency health probes
+PROBE = RequestPolicy('probe', UPSTREAM_READ_CONNECT_TIMEOUT, 10.0)
+
+
+def default_policy(method: str) -> RequestPolicy:
+    """GETs are treated as idempotent reads, everything else as writes."""
+    return READ if method == "GET" else WRITE
+
+
+retry_budget = RetryBudget(
+    ratio=UPSTREAM_RETRY_BUDGET_RATIO,
+    min_per_second=UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND,
+)
@@ -4,15 +4,17 @@
 # Base URL: https://google-auth-e4er.onrender.com/api/v1/premium
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-import httpx
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService
+from routers.security import AuthContext, require_access_token
+from routers.cache import user_cache, invalidate_token, link_user_token
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(prefix="/premium", tags=["Premium"])
+router = APIRouter(prefix="/premium", tags=["Premium"], route_class=FastJSONRoute)
 
-EXTERNAL_PREMIUM_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/premium"
+premium_upstream = UpstreamService("premium", "/api/v1/premium")
 
 # ============ Models ============
 
@@ -50,7 +52,7 @@ class RestorePurchaseResponse(BaseModel):
 @router.post("/customer-info", response_model=PremiumSyncResponse, summary="Sync premium status with customer info")
 async def sync_customer_info(
     request: CustomerInfoRequest,
-    authorization: Optional[str] = Header(None)
+    auth: AuthContext = Depends(require_access_token)
 ):
     """
     Sync premium subscription status with RevenueCat customer info.
@@ -63,30 +65,20 @@ async def sync_customer_info(
     - After a successful purchase
     - When customer info is updated
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_PREMIUM_URL}/customer-info",
-                json=request.dict(),
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to sync customer info')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    link_user_token(request.app_user_id, auth.authorization)
+    try:
+        return await premium_upstream.relay(
+            "POST", "/customer-info",
+            json=request.dict(),
+            authorization=auth.authorization,
+            error_message='Failed to sync customer info'
+        )
+    finally:
+        invalidate_token(auth.authorization)
 
 
 @router.post("/restore", response_model=RestorePurchaseResponse, summary="Restore premium purchases")
-async def restore_purchases(authorization: Optional[str] = Header(None)):
+async def restore_purchases(auth: AuthContext = Depends(require_access_token)):
     """
     Restore previous premium purchases.
     
@@ -98,31 +90,20 @@ async def restore_purchases(authorization: Optional[str] = Header(None)):
     - User logs in on a new device
     - User's premium status seems incorrect
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{EXTERNAL_PREMIUM_URL}/restore",
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to restore purchases')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    try:
+        return await premium_upstream.relay(
+            "POST", "/restore",
+            authorization=auth.authorization,
+            error_message='Failed to restore purchases'
+        )
+    finally:
+        invalidate_token(auth.authorization)
 
 
 @router.post("/sync", response_model=PremiumSyncResponse, summary="Manual premium sync")
 async def manual_sync(
     request: PremiumSyncRequest = None,
-    authorization: Optional[str] = Header(None)
+    auth: AuthContext = Depends(require_access_token)
 ):
     """
     Manually sync premium status with the payment provider.
@@ -133,31 +114,19 @@ async def manual_sync(
     
     If no parameters are provided, syncs based on stored customer info.
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            body = request.dict() if request else {}
-            response = await client.post(
-                f"{EXTERNAL_PREMIUM_URL}/sync",
-                json=body,
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to sync premium')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    try:
+        return await premium_upstream.relay(
+            "POST", "/sync",
+            json=request.dict() if request else {},
+            authorization=auth.authorization,
+            error_message='Failed to sync premium'
+        )
+    finally:
+        invalidate_token(auth.authorization)
 
 
 @router.get("/status", response_model=PremiumStatusResponse, summary="Get premium status")
-async def get_premium_status(authorization: Optional[str] = Header(None)):
+async def get_premium_status(auth: AuthContext = Depends(require_access_token)):
     """
     Get the current premium subscription status.
     
@@ -167,23 +136,14 @@ async def get_premium_status(authorization: Optional[str] = Header(None)):
     - **expires_at**: When the subscription expires (null for lifetime)
     - **auto_renew**: Whether auto-renewal is enabled
     - **features**: Dictionary of premium features and their availability
-    """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization required")
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{EXTERNAL_PREMIUM_URL}/status",
-                headers={"Authorization": authorization},
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Failed to get premium status')
-                )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    Served from a short-lived per-token cache; premium writes and
+    RevenueCat webhooks for the user invalidate it.
+    """
+    link_user_token(auth.user_id, auth.authorization)
+    return await premium_upstream.relay_cached(
+        user_cache,
+        "GET", "/status",
+        authorization=auth.authorization,
+        error_message='Failed to get premium status'
+    )
@@ -0,0 +1,361 @@
+# ============================================================
+# StyleAdvisor AI - Upstream Proxy Layer
+# ============================================================
+# Every router forwards to the external API through an
+# UpstreamService, so request forwarding, error mapping and
+# response streaming live in one code path shared by all
+# endpoints.
+# ============================================================
+
+import asyncio
+import time
+from fastapi import HTTPException
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+from typing import Optional, Dict, Any
+import httpx
+from routers.config import EXTERNAL_API_BASE_URL, PROXY_VALIDATE_RESPONSES
+from routers.upstream import get_upstream_client
+from routers.cache import TTLCache, CachedResponse, hash_token, token_tag
+from routers.singleflight import upstream_flights
+from routers.circuit_breaker import CircuitBreaker, circuit_breakers
+from routers.policies import RequestPolicy, RETRYABLE_STATUSES, default_policy, retry_budget
+from routers.metrics import observe_upstream, upstream_in_flight
+from routers.tracing import start_upstream_span
+from routers.serialization import loads
+from routers.compression import accepts_encoding
+
+# Upstream headers relayed to the client on pass-through responses.
+# Bodies are relayed decoded unless the client accepts the upstream's
+# content-encoding, so content-encoding/length are not copied here.
+RELAYED_HEADERS = ('content-type', 'cache-control', 'etag', 'last-modified', 'expires', 'vary')
+
+
+class UpstreamUnavailableError(HTTPException):
+    """Raised when the external service cannot be reached (503)."""
+
+    def __init__(self, reason: str):
+        super().__init__(status_code=503, detail=f"External service unavailable: {reason}")
+        self.reason = reason
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised without calling upstream while the route's circuit is open."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        super().__init__(f"circuit open for {breaker.name}")
+        self.detail = "External service temporarily unavailable"
+        self.headers = {"Retry-After": str(breaker.retry_after() or 1)}
+
+
+def error_detail(response: httpx.Response, default: str) -> Any:
+    """Extract the upstream 'detail' field, falling back to a default message."""
+    try:
+        body = loads(response.content)
+    except ValueError:
+        return default
+    if isinstance(body, dict):
+        return body.get('detail', default)
+    return default
+
+
+def relayed_headers(response: httpx.Response) -> Dict[str, str]:
+    return {
+        name: response.headers[name]
+        for name in RELAYED_HEADERS
+        if name in response.headers
+    }
+
+
+def raise_upstream_error(
+    response: httpx.Response,
+    error_message: str,
+    status_messages: Optional[Dict[int, str]] = None
+) -> None:
+    """Re-raise a non-200 upstream response as an HTTPException with the same status."""
+    if status_messages and response.status_code in status_messages:
+        raise HTTPException(status_code=response.status_code, detail=status_messages[response.status_code])
+    raise HTTPException(
+        status_code=response.status_code,
+        detail=error_detail(response, error_message)
+    )
+
+
+class UpstreamService:
+    """
+    A single upstream service, e.g. /api/v1/auth on EXTERNAL_API_BASE_URL.
+
+    Paths are route templates ("/status/{auth_id}") filled from path_params,
+    so the template can be used as a stable per-route label.
+    """
+
+    def __init__(self, name: str, base_path: str):
+        self.name = name
+        self.base_url = f"{EXTERNAL_API_BASE_URL}{base_path}"
+
+    def url_for(self, path: str = "", path_params: Optional[Dict[str, Any]] = None) -> str:
+        if path_params:
+            path = path.format(**path_params)
+        return f"{self.base_url}{path}"
+
+    async def send(
+        self,
+        method: str,
+        path: str = "",
+        *,
+        path_params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        authorization: Optional[str] = None,
+        policy: Optional[RequestPolicy] = None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """
+        Send a request upstream and return the raw response, whatever its status.
+
+        Timeouts and retries come from the route's policy (by default READ
+        for GET and WRITE otherwise). With stream=True the body is not read;
+        the caller must consume or close the response.
+        """
+        policy = policy or default_policy(method)
+        request_headers = dict(headers) if headers else {}
+        if authorization:
+            request_headers["Authorization"] = authorization
+
+        route = f"{method} {path or '/'}"
+        breaker = circuit_breakers.get(f"{self.name}:{route}")
+        client = get_upstream_client()
+        request = client.build_request(
+            method,
+            self.url_for(path, path_params),
+            json=json,
+            params=params,
+            headers=request_headers,
+            timeout=policy.timeout,
+        )
+
+        retry_budget.record_request()
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                raise CircuitOpenError(breaker)
+            upstream_span = start_upstream_span(self.name, route, request, attempt)
+            upstream_in_flight.inc(self.name)
+            started = time.perf_counter()
+            try:
+                response = await client.send(request, stream=stream)
+            except httpx.RequestError as e:
+                observe_upstream(self.name, route, 'error', time.perf_counter() - started)
+                if upstream_span is not None:
+                    upstream_span.finish(error=type(e).__name__)
+                breaker.record_failure()
+                if attempt < policy.max_retries and retry_budget.try_spend():
+                    attempt += 1
+                    await asyncio.sleep(policy.backoff(attempt))
+                    continue
+                raise UpstreamUnavailableError(str(e))
+            except BaseException as e:
+                breaker.release()
+                if upstream_span is not None:
+                    upstream_span.finish(error=type(e).__name__)
+                raise
+            finally:
+                upstream_in_flight.dec(self.name)
+            observe_upstream(self.name, route, str(response.status_code), time.perf_counter() - started)
+            if upstream_span is not None:
+                upstream_span.finish(status_code=response.status_code)
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if (
+                response.status_code in RETRYABLE_STATUSES
+                and attempt < policy.max_retries
+                and retry_budget.try_spend()
+            ):
+                await response.aclose()
+                attempt += 1
+                await asyncio.sleep(policy.backoff(attempt))
+                continue
+            return response
+
+    async def forward(
+        self,
+        method: str,
+        path: str = "",
+        *,
+        error_message: str,
+        status_messages: Optional[Dict[int, str]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Forward a request and return the decoded upstream body on 200.
+
+        Any other status is re-raised as an HTTPException carrying the
+        upstream 'detail' (or error_message); status_messages overrides
+        the detail for specific status codes.
+        """
+        response = await self.send(method, path, **kwargs)
+        if response.status_code == 200:
+            return loads(response.content)
+        raise_upstream_error(response, error_message, status_messages)
+
+    def request_key(
+        self,
+        method: str,
+        path: str = "",
+        *,
+        path_params: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        authorization: Optional[str] = None,
+    ) -> str:
+        """Identity of a read for caching/coalescing: route, query and token hash."""
+        query = "&".join(f"{k}={v}" for k, v in sorted(params.items())) if params else ""
+        token = hash_token(authorization) if authorization else "-"
+        return f"{self.name}:{method}:{self.url_for(path, path_params)}?{query}:{token}"
+
+    async def fetch(
+        self,
+        method: str,
+        path: str = "",
+        *,
+        error_message: str,
+        status_messages: Optional[Dict[int, str]] = None,
+        **kwargs: Any,
+    ) -> CachedResponse:
+        """Read a 200 response fully into a replayable CachedResponse."""
+        response = await self.send(method, path, **kwargs)
+        if response.status_code != 200:
+            raise_upstream_error(response, error_message, status_messages)
+        return CachedResponse(response.status_code, response.content, relayed_headers(response))
+
+    async def fetch_shared(self, method: str, path: str = "", **kwargs: Any) -> CachedResponse:
+        """fetch(), with identical concurrent calls sharing one upstream request."""
+        key = self.request_key(
+            method, path,
+            path_params=kwargs.get('path_params'),
+            params=kwargs.get('params'),
+            authorization=kwargs.get('authorization'),
+        )
+        return await upstream_flights.do(key, lambda: self.fetch(method, path, **kwargs))
+
+    async def relay(
+        self,
+        method: str,
+        path: str = "",
+        *,
+        error_message: str,
+        status_messages: Optional[Dict[int, str]] = None,
+        coalesce: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Forward a request and stream the upstream body straight back on 200.
+
+        The upstream bytes and content headers are relayed without a JSON
+        decode/re-encode or response_model validation. Errors are mapped
+        exactly like forward(). With PROXY_VALIDATE_RESPONSES enabled this
+        falls back to forward() so FastAPI validates the body.
+
+        coalesce=True (idempotent reads only) buffers the body instead of
+        streaming it so identical concurrent calls can share one upstream
+        request.
+        """
+        if PROXY_VALIDATE_RESPONSES:
+            return await self.forward(
+                method, path,
+                error_message=error_message,
+                status_messages=status_messages,
+                **kwargs
+            )
+
+        if coalesce:
+            entry = await self.fetch_shared(
+                method, path,
+                error_message=error_message,
+                status_messages=status_messages,
+                **kwargs
+            )
+            return entry.to_response()
+
+        response = await self.send(method, path, stream=True, **kwargs)
+        if response.status_code != 200:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            raise_upstream_error(response, error_message, status_messages)
+
+        headers = relayed_headers(response)
+        body = response.aiter_bytes()
+        upstream_encoding = response.headers.get('content-encoding')
+        if upstream_encoding and accepts_encoding(upstream_encoding):
+            # Relay the upstream's compressed bytes as they are, rather than
+            # decompressing here and compressing again on the way out
+            body = response.aiter_raw()
+            headers['content-encoding'] = upstream_encoding
+            vary = headers.get('vary')
+            headers['vary'] = f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'
+        return StreamingResponse(
+            body,
+            status_code=response.status_code,
+            headers=headers,
+            background=BackgroundTask(response.aclose),
+        )
+
+    async def relay_cached(
+        self,
+        cache: TTLCache,
+        method: str,
+        path: str = "",
+        *,
+        authorization: str,
+        error_message: str,
+        status_messages: Optional[Dict[int, str]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Like relay(), but serve 200 responses from a per-token cache.
+
+        Entries are keyed on the route and a hash of the Authorization
+        header and tagged with the token, so invalidate_token() drops them.
+        Misses are coalesced, so a burst of identical reads makes one call.
+        A miss is not cached if the token is invalidated while it is read.
+        """
+        if PROXY_VALIDATE_RESPONSES:
+            return await self.forward(
+                method, path,
+                authorization=authorization,
+                error_message=error_message,
+                status_messages=status_messages,
+                **kwargs
+            )
+
+        key = self.request_key(
+            method, path,
+            path_params=kwargs.get('path_params'),
+            params=kwargs.get('params'),
+            authorization=authorization,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return cached.to_response()
+
+        tags = (token_tag(hash_token(authorization)),)
+        fill = cache.begin_fill(tags)
+        try:
+            entry = await self.fetch_shared(
+                method, path,
+                authorization=authorization,
+                error_message=error_message,
+                status_messages=status_messages,
+                **kwargs
+            )
+        except BaseException:
+            cache.end_fill(fill)
+            raise
+        cache.set(key, entry, tags=tags, fill=fill)
+        return entry.to_response()
@@ -0,0 +1,146 @@
+# ============================================================
+# StyleAdvisor AI - Rate Limiting
+# ============================================================
+# Token buckets keyed by client IP, email hash (per client IP)
+# and access token protect the auth and OTP endpoints. Excess calls get a 429
+# with Retry-After before any upstream I/O. Buckets live in
+# the state backend: in-process by default, or shared with
+# STATE_BACKEND=mongo so every worker enforces the same
+# limits, with a bounded in-process copy taking over while
+# the shared store is unreachable.
+# ============================================================
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from routers.cache import hash_token
+from routers.state import MemoryStateBackend, StateBackend
+from routers.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_TRUSTED_PROXIES,
+    RATE_LIMIT_IP_CAPACITY,
+    RATE_LIMIT_IP_PER_MINUTE,
+    RATE_LIMIT_EMAIL_CAPACITY,
+    RATE_LIMIT_EMAIL_PER_MINUTE,
+    RATE_LIMIT_TOKEN_CAPACITY,
+    RATE_LIMIT_TOKEN_PER_MINUTE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(HTTPException):
+    """Raised when a caller has used up its bucket (429)."""
+
+    def __init__(self, retry_after: float):
+        seconds = max(1, int(retry_after + 0.999))
+        super().__init__(
+            status_code=429,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(seconds)},
+        )
+
+
+class Limit:
+    """Bucket size and refill rate for one key dimension."""
+
+    __slots__ = ('capacity', 'rate')
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+
+IP_LIMIT = Limit(RATE_LIMIT_IP_CAPACITY, RATE_LIMIT_IP_PER_MINUTE)
+EMAIL_LIMIT = Limit(RATE_LIMIT_EMAIL_CAPACITY, RATE_LIMIT_EMAIL_PER_MINUTE)
+TOKEN_LIMIT = Limit(RATE_LIMIT_TOKEN_CAPACITY, RATE_LIMIT_TOKEN_PER_MINUTE)
+
+
+def hash_email(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Caller IP, or None when it cannot be trusted. Behind
+    RATE_LIMIT_TRUSTED_PROXIES proxies, the X-Forwarded-For hop added by
+    the outermost one is the client; hops left of it are whatever the
+    client sent and are ignored. Without the header the socket peer is
+    a proxy, not the client. With no proxies the socket peer is used.
+    """
+    if RATE_LIMIT_TRUSTED_PROXIES <= 0:
+        return request.client.host if request.client else None
+    forwarded = request.headers.get('x-forwarded-for')
+    hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()] if forwarded else []
+    if not hops:
+        return None
+    return hops[max(0, len(hops) - RATE_LIMIT_TRUSTED_PROXIES)]
+
+
+class RateLimiter:
+    """Checks the IP, email and token buckets of a request for one endpoint."""
+
+    NAMESPACE = 'rate_limit'
+
+    def __init__(self):
+        self.local = MemoryStateBackend(max_keys=RATE_LIMIT_MAX_KEYS)
+        self.backend: StateBackend = self.local
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.backend_errors = 0
+
+    def use_backend(self, backend: StateBackend) -> None:
+        self.backend = backend
+
+    async def _take(self, key: str, limit: Limit) -> float:
+        if self.backend is not self.local:
+            try:
+                return await self.backend.take_token(self.NAMESPACE, key, limit.capacity, limit.rate)
+            except Exception as e:
+                # Keep limiting per process while the shared store is unavailable
+                self.backend_errors += 1
+                logger.warning(f"Shared rate limit store unavailable: {str(e)}")
+        return await self.local.take_token(self.NAMESPACE, key, limit.capacity, limit.rate)
+
+    async def check(self, request: Request, endpoint: str, email: Optional[str] = None) -> None:
+        """Raise RateLimitedError if any of the request's buckets is empty."""
+        if not RATE_LIMIT_ENABLED:
+            return
+        ip = client_ip(request)
+        keys: List[Tuple[str, Limit]] = []
+        if ip is not None:
+            # Without a trustworthy IP every caller would share the proxy's bucket
+            keys.append((f"ip:{ip}", IP_LIMIT))
+        if email:
+            # Per source too, so requests naming someone else's email cannot
+            # lock the owner out of login, OTP and password reset
+            keys.append((f"email:{hash_email(email)}:{ip or 'unknown'}", EMAIL_LIMIT))
+        authorization = request.headers.get('authorization')
+        if authorization:
+            keys.append((f"token:{hash_token(authorization)}", TOKEN_LIMIT))
+
+        # One concurrent round trip for all buckets on a shared backend
+        waits = await asyncio.gather(*(self._take(f"{endpoint}:{key}", limit) for key, limit in keys))
+        limited = [(retry_after, key) for (key, _), retry_after in zip(keys, waits) if retry_after > 0]
+        if limited:
+            retry_after, key = max(limited)
+            self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+            logger.info(f"Rate limited {endpoint} on {key.split(':', 1)[0]}")
+            raise RateLimitedError(retry_after)
+        self.allowed[endpoint] = self.allowed.get(endpoint, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "allowed": sum(self.allowed.values()),
+            "rejected": sum(self.rejected.values()),
+            "rejected_by_endpoint": dict(self.rejected),
+            "backend_errors": self.backend_errors,
+        }
+
+
+rate_limiter = RateLimiter()
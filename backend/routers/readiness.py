@@ -0,0 +1,136 @@
+# ============================================================
+# StyleAdvisor AI - Readiness & Dependency Probes
+# ============================================================
+# A background prober checks MongoDB and each upstream service
+# on an interval and keeps the latest results. Readiness and
+# health endpoints are answered from that snapshot, so load
+# balancer probes never reach a dependency themselves.
+# ============================================================
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from routers.config import (
+    READINESS_PROBE_INTERVAL,
+    READINESS_PROBE_TIMEOUT,
+    READINESS_POOL_SATURATION,
+)
+from routers.circuit_breaker import circuit_breakers, CLOSED
+from routers.policies import PROBE
+from routers.proxy import UpstreamService
+from routers.upstream import pool_stats
+
+logger = logging.getLogger(__name__)
+
+# A probe returns (ok, detail)
+Probe = Callable[[], Awaitable[Tuple[bool, Any]]]
+
+
+def mongo_probe(db) -> Probe:
+    async def probe() -> Tuple[bool, Any]:
+        await db.command("ping")
+        return True, None
+    return probe
+
+
+def upstream_probe(service: UpstreamService, path: str = "") -> Probe:
+    """Reachable when upstream answers with anything but a 5xx."""
+    async def probe() -> Tuple[bool, Any]:
+        response = await service.send("GET", path, policy=PROBE)
+        return response.status_code < 500, {"status_code": response.status_code}
+    return probe
+
+
+class DependencyProber:
+    """Runs registered probes every READINESS_PROBE_INTERVAL seconds."""
+
+    def __init__(self, interval: float = READINESS_PROBE_INTERVAL, timeout: float = READINESS_PROBE_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._probes: Dict[str, Tuple[Probe, bool]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.rounds = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def add(self, name: str, probe: Probe, required: bool = False) -> None:
+        """Register a probe; a failing required probe makes the app not ready."""
+        self._probes[name] = (probe, required)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def detail(self, name: str) -> Optional[Any]:
+        """Latest detail returned by a probe, or None if it has not run."""
+        result = self.results.get(name)
+        return result["detail"] if result else None
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self) -> None:
+        names = list(self._probes)
+        outcomes = await asyncio.gather(*(self._probe(name) for name in names))
+        self.results = dict(zip(names, outcomes))
+        self.rounds += 1
+
+    async def _probe(self, name: str) -> Dict[str, Any]:
+        probe, required = self._probes[name]
+        started = time.perf_counter()
+        try:
+            ok, detail = await asyncio.wait_for(probe(), self.timeout)
+        except Exception as e:
+            ok, detail = False, {"error": getattr(e, 'detail', None) or str(e) or type(e).__name__}
+        return {
+            "ok": ok,
+            "required": required,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "checked_at": datetime.utcnow().isoformat(),
+            "detail": detail,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        ready: every required probe passed in the latest round.
+        status: 'ok', or 'degraded' when an optional dependency is down, a
+        circuit is not closed or the upstream pool is saturated.
+        """
+        pool = pool_stats()
+        saturated = (
+            pool["waiting"] > 0
+            or pool["active"] >= pool["max_connections"] * READINESS_POOL_SATURATION
+        )
+        open_circuits = sorted(
+            name for name, snap in circuit_breakers.snapshot().items() if snap["state"] != CLOSED
+        )
+        ready = self.rounds > 0 and all(r["ok"] for r in self.results.values() if r["required"])
+        degraded = (
+            saturated
+            or bool(open_circuits)
+            or any(not r["ok"] for r in self.results.values())
+        )
+        return {
+            "ready": ready,
+            "status": "degraded" if degraded else "ok",
+            "dependencies": self.results,
+            "open_circuits": open_circuits,
+            "upstream_pool": {**pool, "saturated": saturated},
+        }
+
+
+dependency_prober = DependencyProber()
@@ -0,0 +1,141 @@
+# ============================================================
+# StyleAdvisor AI - Access Token Verification
+# ============================================================
+# FastAPI dependency that checks the bearer access token locally
+# (format, expiry and - when JWT_SECRET is configured - signature)
+# so bad tokens get a 401 without any upstream round trip.
+# Opaque tokens and, by default, deployments without JWT_SECRET
+# are passed through for the upstream to decide.
+# ============================================================
+
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import jwt
+from fastapi import Header, HTTPException, Request
+from routers.config import (
+    JWT_SECRET,
+    JWT_ALGORITHM,
+    JWT_LOCAL_VERIFICATION,
+    JWT_VERIFY_SIGNATURE,
+    JWT_LEEWAY_SECONDS,
+    JWT_CLAIMS_CACHE_SIZE,
+    JWT_CLAIMS_CACHE_TTL_SECONDS,
+)
+from routers.cache import TTLCache, hash_token
+
+
+class AuthContext:
+    """The caller's access token and what we know about it locally."""
+
+    __slots__ = ('authorization', 'token_hash', 'claims', 'verified')
+
+    def __init__(self, authorization: str, token_hash: str, claims: Dict[str, Any], verified: bool):
+        self.authorization = authorization
+        self.token_hash = token_hash
+        self.claims = claims
+        self.verified = verified
+
+    @property
+    def user_id(self) -> Optional[str]:
+        """User id from the token claims; None unless the signature was verified."""
+        if not self.verified:
+            return None
+        for claim in ('sub', 'user_id', 'id'):
+            value = self.claims.get(claim)
+            if value:
+                return str(value)
+        return None
+
+
+# Decoded claims keyed on token hash, so repeat requests skip the decode
+claims_cache = TTLCache(max_entries=JWT_CLAIMS_CACHE_SIZE, ttl_seconds=JWT_CLAIMS_CACHE_TTL_SECONDS)
+
+
+def _bearer_token(authorization: str) -> str:
+    scheme, _, token = authorization.partition(' ')
+    if token and scheme.lower() == 'bearer':
+        return token.strip()
+    return authorization.strip()
+
+
+def is_jwt(authorization: str) -> bool:
+    """True for JWT-shaped tokens (three dot-separated segments); others are opaque."""
+    return _bearer_token(authorization).count('.') == 2
+
+
+def decode_access_token(authorization: str) -> Dict[str, Any]:
+    """
+    Decode and check an access token, raising a 401 HTTPException if it is
+    malformed, expired or (when signature checks are on) not signed by us.
+    """
+    token = _bearer_token(authorization)
+    try:
+        if JWT_VERIFY_SIGNATURE:
+            return jwt.decode(
+                token,
+                JWT_SECRET,
+                algorithms=[JWT_ALGORITHM],
+                leeway=JWT_LEEWAY_SECONDS,
+                options={"require": ["exp"]},
+            )
+        return jwt.decode(
+            token,
+            options={"verify_signature": False, "verify_exp": True},
+            leeway=JWT_LEEWAY_SECONDS,
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+def _claims_for(authorization: str, token_hash: str) -> Dict[str, Any]:
+    claims = claims_cache.get(token_hash)
+    if claims is None:
+        claims = decode_access_token(authorization)
+        claims_cache.set(token_hash, claims)
+    exp = claims.get('exp')
+    if exp is not None and exp + JWT_LEEWAY_SECONDS < time.time():
+        raise HTTPException(status_code=401, detail="Token expired")
+    return claims
+
+
+def access_token_dependency(
+    missing_detail: str = "Authorization required"
+) -> Callable[..., Awaitable[AuthContext]]:
+    """
+    Dependency for endpoints that need an authenticated user.
+
+    Rejects a missing header with `missing_detail`, and malformed or
+    expired JWTs locally; opaque tokens go on to the upstream unchecked.
+    The resulting AuthContext is also stored on request.state.auth for
+    other features.
+    """
+
+    async def require(
+        request: Request,
+        authorization: Optional[str] = Header(None)
+    ) -> AuthContext:
+        if not authorization:
+            raise HTTPException(status_code=401, detail=missing_detail)
+
+        token_hash = hash_token(authorization)
+        claims: Dict[str, Any] = {}
+        checked = JWT_LOCAL_VERIFICATION and is_jwt(authorization)
+        if checked:
+            claims = _claims_for(authorization, token_hash)
+
+        auth = AuthContext(
+            authorization=authorization,
+            token_hash=token_hash,
+            claims=claims,
+            verified=checked and JWT_VERIFY_SIGNATURE,
+        )
+        request.state.auth = auth
+        return auth
+
+    return require
+
+
+require_access_token = access_token_dependency()
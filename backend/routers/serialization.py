@@ -0,0 +1,81 @@
+# ============================================================
+# StyleAdvisor AI - JSON Serialization
+# ============================================================
+# One place for JSON encoding and decoding: responses, request
+# bodies, upstream bodies, SSE/NDJSON events and span export.
+# orjson is used when installed and JSON_ORJSON_ENABLED is set;
+# otherwise everything falls back to the standard library with
+# the same compact output.
+# ============================================================
+
+import json
+from typing import Any, Callable, Union
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from routers.config import JSON_ORJSON_ENABLED
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_ACTIVE = JSON_ORJSON_ENABLED and orjson is not None
+
+if ORJSON_ACTIVE:
+    # Non-string dict keys are converted like the standard library does
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(value: Any) -> bytes:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS).decode('utf-8')
+
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+    # (and FastAPI's 422 "json_invalid" handling) catch the same error
+    loads: Callable[[Union[bytes, str]], Any] = orjson.loads
+else:
+    def dumps_bytes(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        if not ORJSON_ACTIVE:
+            return super().render(content)
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+class FastJSONRequest(Request):
+    """Request whose json() decodes the body with orjson when available."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, '_json'):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route class parsing request bodies with FastJSONRequest, for both
+    Pydantic body models and endpoints calling request.json().
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not ORJSON_ACTIVE:
+            return handler
+
+        async def fast_json_handler(request: Request) -> Response:
+            return await handler(FastJSONRequest(request.scope, request.receive))
+
+        return fast_json_handler
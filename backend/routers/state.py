@@ -0,0 +1,305 @@
+# ============================================================
+# StyleAdvisor AI - Shared State Backend
+# ============================================================
+# State that must agree across worker processes (rate limit
+# buckets, webhook dedup ids, cache invalidations) goes through
+# a StateBackend. The memory backend (the default) keeps it
+# in-process for a single worker; the Mongo backend shares it
+# between every worker and node through the existing Motor
+# database, using atomic upserts and TTL indexes so nothing
+# needs cleaning up.
+# ============================================================
+
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from routers.config import STATE_MEMORY_MAX_KEYS, STATE_EVENTS_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# How far back each poll looks, to catch events inserted by other
+# workers slightly out of order; already applied events are skipped
+EVENT_OVERLAP_SECONDS = 5.0
+
+
+class StateBackend(ABC):
+    """
+    Key/value state with TTLs, set-if-absent, token buckets and a
+    broadcast channel. Keys live in namespaces so users cannot collide.
+    """
+
+    name = ''
+    # True if other workers see the same state
+    shared = False
+
+    async def start(self) -> None:
+        pass
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def add(self, namespace: str, key: str, ttl: float) -> bool:
+        """Create the key unless it exists; returns False if it already did."""
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def take_token(self, namespace: str, key: str, capacity: float, rate: float) -> float:
+        """
+        Take one token from a bucket refilled at `rate` tokens per second.
+        Returns 0 if taken, else the seconds until a token is available.
+        """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Send a message to the other workers polling the channel."""
+
+    @abstractmethod
+    async def poll(self, channel: str) -> List[Dict[str, Any]]:
+        """Messages published by other workers since the last poll."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared}
+
+
+class MemoryStateBackend(StateBackend):
+    """Per-process state; each namespace is an LRU of at most max_keys."""
+
+    name = 'memory'
+
+    def __init__(self, max_keys: int = STATE_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        # namespace -> key -> (expires_at monotonic, value)
+        self._namespaces: Dict[str, "OrderedDict[str, Tuple[float, Any]]"] = {}
+
+    def _entries(self, namespace: str) -> "OrderedDict[str, Tuple[float, Any]]":
+        entries = self._namespaces.get(namespace)
+        if entries is None:
+            entries = self._namespaces[namespace] = OrderedDict()
+        return entries
+
+    def _lookup(self, namespace: str, key: str, now: float) -> Optional[Any]:
+        entries = self._entries(namespace)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, namespace: str, key: str, value: Any, expires_at: float) -> None:
+        entries = self._entries(namespace)
+        entries[key] = (expires_at, value)
+        entries.move_to_end(key)
+        if len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        return self._lookup(namespace, key, time.monotonic())
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self._store(namespace, key, value, time.monotonic() + ttl)
+
+    async def add(self, namespace: str, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        if self._lookup(namespace, key, now) is not None:
+            return False
+        self._store(namespace, key, True, now + ttl)
+        return True
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._entries(namespace).pop(key, None)
+
+    async def take_token(self, namespace: str, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        bucket = self._lookup(namespace, key, now)
+        if bucket is None:
+            # [tokens, refilled_at]; idle buckets expire once they would be full again
+            bucket = [capacity, now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        self._store(namespace, key, bucket, now + capacity / rate)
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / rate
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        # A single process has nobody else to tell
+        pass
+
+    async def poll(self, channel: str) -> List[Dict[str, Any]]:
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "keys": sum(len(entries) for entries in self._namespaces.values()),
+        }
+
+
+class MongoStateBackend(StateBackend):
+    """
+    State shared through two collections: `state` holds keys as
+    "<namespace>:<key>" documents and `state_events` the broadcast
+    messages. Both expire through TTL indexes on expires_at. Because the
+    TTL monitor only runs about once a minute, reads also treat documents
+    past expires_at as absent.
+    """
+
+    name = 'mongo'
+    shared = True
+
+    def __init__(self, db):
+        self.collection = db.state
+        self.events = db.state_events
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._poll_since: Dict[str, datetime] = {}
+        self._applied: Deque[Any] = deque(maxlen=10000)
+        self._applied_ids: set = set()
+        self.operations = 0
+        self.published = 0
+        self.received = 0
+
+    async def start(self) -> None:
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.events.create_index("expires_at", expireAfterSeconds=0)
+        await self.events.create_index([("channel", ASCENDING), ("created_at", ASCENDING)])
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        self.operations += 1
+        doc = await self.collection.find_one(
+            {"_id": f"{namespace}:{key}", "expires_at": {"$gt": datetime.utcnow()}}, {"value": 1}
+        )
+        return doc.get("value") if doc else None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self.operations += 1
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        await self.collection.update_one(
+            {"_id": f"{namespace}:{key}"},
+            {"$set": {"value": value, "expires_at": expires_at}},
+            upsert=True,
+        )
+
+    async def add(self, namespace: str, key: str, ttl: float) -> bool:
+        now = datetime.utcnow()
+        # An expired document the TTL monitor has not removed yet counts as absent
+        pipeline = [
+            {"$set": {"added": {"$lte": [{"$ifNull": ["$expires_at", now]}, now]}}},
+            {"$set": {"expires_at": {"$cond": [
+                "$added", now + timedelta(seconds=ttl), "$expires_at",
+            ]}}},
+        ]
+        doc = await self._upsert(f"{namespace}:{key}", pipeline)
+        return bool(doc["added"])
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self.operations += 1
+        await self.collection.delete_one({"_id": f"{namespace}:{key}"})
+
+    async def take_token(self, namespace: str, key: str, capacity: float, rate: float) -> float:
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [elapsed, rate]},
+        ]}]}
+        # Refill and take in one atomic update, so workers never double-spend
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated_at": now}},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                "expires_at": now + timedelta(seconds=capacity / rate),
+            }},
+        ]
+        bucket = await self._upsert(f"{namespace}:{key}", pipeline)
+        if bucket["allowed"]:
+            return 0.0
+        return (1.0 - bucket["tokens"]) / rate
+
+    async def _upsert(self, doc_id: str, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.operations += 1
+        try:
+            return await self._find_one_and_update(doc_id, pipeline)
+        except DuplicateKeyError:
+            # Lost a race creating the document; it exists now
+            return await self._find_one_and_update(doc_id, pipeline)
+
+    async def _find_one_and_update(self, doc_id: str, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.collection.find_one_and_update(
+            {"_id": doc_id}, pipeline, upsert=True, return_document=ReturnDocument.AFTER
+        )
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        await self.events.insert_one({
+            "channel": channel,
+            "origin": self.worker_id,
+            "message": message,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=STATE_EVENTS_TTL_SECONDS),
+        })
+        self.published += 1
+
+    async def poll(self, channel: str) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        since = self._poll_since.get(channel)
+        self._poll_since[channel] = now
+        if since is None:
+            # Start listening now; earlier events predate this worker's cache
+            return []
+        cursor = self.events.find({
+            "channel": channel,
+            "origin": {"$ne": self.worker_id},
+            "created_at": {"$gte": since - timedelta(seconds=EVENT_OVERLAP_SECONDS)},
+        }).sort("created_at", ASCENDING)
+        messages = []
+        async for event in cursor:
+            if event["_id"] in self._applied_ids:
+                continue
+            if len(self._applied) == self._applied.maxlen:
+                self._applied_ids.discard(self._applied[0])
+            self._applied.append(event["_id"])
+            self._applied_ids.add(event["_id"])
+            messages.append(event["message"])
+        self.received += len(messages)
+        return messages
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "worker_id": self.worker_id,
+            "operations": self.operations,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+def create_state_backend(kind: str, db) -> StateBackend:
+    if kind == 'mongo':
+        return MongoStateBackend(db)
+    if kind != 'memory':
+        logger.warning(f"Unknown STATE_BACKEND {kind!r}, using memory")
+    return MemoryStateBackend()
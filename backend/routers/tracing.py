@@ -0,0 +1,365 @@
+# ============================================================
+# StyleAdvisor AI - Request Tracing
+# ============================================================
+# Lightweight spans with W3C traceparent propagation, so a slow
+# mobile request can be matched to the upstream call it made.
+# Each request gets a root span with child spans for request
+# parsing/validation, the endpoint, every upstream attempt
+# (connect, time to first byte, body read) and response
+# serialization. Finished spans go to a JSON-lines file for
+# offline analysis; without TRACING_EXPORT_PATH, tracing is off
+# unless TRACING_ENABLED is set explicitly.
+# ============================================================
+
+import asyncio
+import functools
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from starlette.routing import request_response
+from routers.serialization import dumps
+from routers.config import (
+    TRACING_ENABLED,
+    TRACING_SAMPLE_RATE,
+    TRACING_EXPORT_PATH,
+    TRACING_EXPORT_INTERVAL_SECONDS,
+    TRACING_BUFFER_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a traceparent header, or None if invalid."""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'sampled', 'start_ns', 'end_ns', 'attributes')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def child(self, name: str, start_ns: Optional[int] = None) -> "Span":
+        return Span(name, self.trace_id, self.span_id, self.sampled, start_ns)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is None:
+            self.end_ns = end_ns if end_ns is not None else time.time_ns()
+            if self.sampled:
+                span_exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+        }
+
+
+class FileSpanExporter:
+    """
+    Buffers finished spans and appends them as JSON lines to
+    TRACING_EXPORT_PATH from a background task. Spans are dropped (and
+    counted) when the buffer is full, so tracing never blocks requests.
+    """
+
+    def __init__(self, path: str, max_buffer: int = TRACING_BUFFER_SIZE):
+        self.path = path
+        self._buffer: Deque[Span] = deque()
+        self.max_buffer = max_buffer
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, span: Span) -> None:
+        if not self.path:
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        self._buffer.append(span)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        spans, self._buffer = self._buffer, deque()
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for span in spans:
+                    f.write(dumps(span.to_dict()) + '\n')
+            self.exported += len(spans)
+        except OSError as e:
+            self.dropped += len(spans)
+            logger.warning(f"Span export to {self.path} failed: {str(e)}")
+
+    async def start(self) -> None:
+        if self.path and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(TRACING_EXPORT_INTERVAL_SECONDS)
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buffered": len(self._buffer), "exported": self.exported, "dropped": self.dropped}
+
+
+span_exporter = FileSpanExporter(TRACING_EXPORT_PATH)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# ============ Upstream calls ============
+
+# httpcore trace steps opening and closing each upstream phase; time to
+# first byte runs from sending the request headers to receiving the response's
+_PHASE_STARTS = {
+    'connect_tcp': 'upstream.connect',
+    'start_tls': 'upstream.tls',
+    'send_request_headers': 'upstream.ttfb',
+    'receive_response_body': 'upstream.body',
+}
+_PHASE_ENDS = {
+    'connect_tcp': 'upstream.connect',
+    'start_tls': 'upstream.tls',
+    'receive_response_headers': 'upstream.ttfb',
+    'receive_response_body': 'upstream.body',
+}
+
+
+class UpstreamSpan:
+    """
+    Span for one upstream attempt. Its `trace` callback plugs into httpx's
+    "trace" request extension to record connect, time-to-first-byte and
+    body-read child spans from the transport's own events.
+    """
+
+    def __init__(self, parent: Span, name: str):
+        self.span = parent.child(name)
+        self._open: Dict[str, Span] = {}
+
+    def finish(self, status_code: Optional[int] = None, error: Optional[str] = None) -> None:
+        if status_code is not None:
+            self.span.attributes["http.status_code"] = status_code
+        if error is not None:
+            self.span.attributes["error"] = error
+        self.span.end()
+
+    async def trace(self, event: str, info: Dict[str, Any]) -> None:
+        # e.g. "connection.connect_tcp.started", "http11.receive_response_body.complete"
+        step, _, outcome = event.rpartition('.')
+        step = step.split('.', 1)[-1]
+        if outcome == 'started':
+            phase = _PHASE_STARTS.get(step)
+            if phase is not None:
+                self._open[phase] = self.span.child(phase)
+            return
+        phase = _PHASE_ENDS.get(step)
+        if phase is None and outcome == 'failed':
+            phase = _PHASE_STARTS.get(step)
+        span = self._open.pop(phase, None) if phase else None
+        if span is not None:
+            if outcome == 'failed':
+                span.attributes['error'] = True
+            span.end()
+
+
+def start_upstream_span(service: str, route: str, request: Any, attempt: int) -> Optional[UpstreamSpan]:
+    """
+    Open a span for one upstream attempt under the current request and
+    propagate it to upstream in the request's traceparent header.
+    """
+    parent = _current_span.get()
+    if not TRACING_ENABLED or parent is None:
+        return None
+    upstream_span = UpstreamSpan(parent, f"upstream {service} {route}")
+    upstream_span.span.attributes.update({
+        "upstream.service": service,
+        "upstream.route": route,
+        "retry.attempt": attempt,
+    })
+    request.headers["traceparent"] = upstream_span.span.traceparent
+    request.extensions["trace"] = upstream_span.trace
+    return upstream_span
+
+
+# ============ Request handling ============
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of each request, continuing the
+    caller's trace when it sends a valid traceparent and reporting the
+    root span back in a traceresponse header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                incoming = parse_traceparent(value.decode('latin-1'))
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = _new_trace_id(), None, random.random() < TRACING_SAMPLE_RATE
+
+        span = Span(scope["method"], trace_id, parent_id, sampled)
+        span.attributes["http.method"] = scope["method"]
+        span.attributes["http.target"] = scope["path"]
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"traceresponse", span.traceparent.encode('latin-1')))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.attributes["http.route"] = route
+            span.end()
+
+
+def _traced_endpoint(call: Callable, name: str, marks: ContextVar) -> Callable:
+    """Wrap an endpoint in its own span and mark when it starts and returns."""
+
+    def begin() -> Tuple[Optional[Span], Any]:
+        parent = _current_span.get()
+        if parent is None:
+            return None, None
+        mark = marks.get()
+        if mark is not None:
+            mark["endpoint_start"] = time.time_ns()
+        span = parent.child(f"endpoint {name}")
+        return span, _current_span.set(span)
+
+    def finish(span: Optional[Span], token: Any) -> None:
+        if span is None:
+            return
+        _current_span.reset(token)
+        span.end()
+        mark = marks.get()
+        if mark is not None:
+            mark["endpoint_end"] = span.end_ns
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            span, token = begin()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                finish(span, token)
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            span, token = begin()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                finish(span, token)
+    return endpoint
+
+
+def instrument_routes(routes: List[Any]) -> None:
+    """
+    Add request parsing/validation, endpoint and response serialization
+    spans to every FastAPI route. Parsing covers body read, Pydantic
+    validation and dependencies up to the endpoint call; serialization
+    covers response_model validation and rendering after it returns.
+    """
+    from fastapi.routing import APIRoute
+
+    if not TRACING_ENABLED:
+        return
+    marks: ContextVar[Optional[Dict[str, int]]] = ContextVar('endpoint_marks', default=None)
+    for route in routes:
+        if not isinstance(route, APIRoute) or getattr(route, '_traced', False):
+            continue
+        route.dependant.call = _traced_endpoint(route.dependant.call, route.name, marks)
+        handler = route.get_route_handler()
+
+        async def traced_handler(request, handler=handler):
+            root = _current_span.get()
+            if root is None:
+                return await handler(request)
+            mark: Dict[str, int] = {}
+            token = marks.set(mark)
+            started = time.time_ns()
+            try:
+                return await handler(request)
+            finally:
+                marks.reset(token)
+                finished = time.time_ns()
+                parsed = mark.get("endpoint_start", finished)
+                root.child("request.parse_validate", started).end(parsed)
+                if "endpoint_end" in mark:
+                    root.child("response.serialize", mark["endpoint_end"]).end(finished)
+
+        route.app = request_response(traced_handler)
+        route._traced = True
@@ -0,0 +1,101 @@
+# ============================================================
+# StyleAdvisor AI - Shared Upstream HTTP Client
+# ============================================================
+# One pooled httpx.AsyncClient for the lifetime of the app, so
+# calls to EXTERNAL_API_BASE_URL reuse keep-alive connections
+# instead of paying a TCP+TLS handshake per request.
+# ============================================================
+
+import importlib.util
+import logging
+from typing import Dict, Optional
+
+import httpx
+from routers.config import (
+    EXTERNAL_API_BASE_URL,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_HTTP2,
+)
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_upstream_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Build the pooled upstream client.
+
+    All upstream traffic goes to EXTERNAL_API_BASE_URL, so the pool limits
+    below are effectively the per-host connection caps.
+    """
+    http2 = UPSTREAM_HTTP2 and _http2_available()
+    if UPSTREAM_HTTP2 and not http2:
+        logger.warning("UPSTREAM_HTTP2 is enabled but 'h2' is not installed; falling back to HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        base_url=EXTERNAL_API_BASE_URL,
+        limits=limits,
+        http2=http2,
+        transport=transport,
+    )
+
+
+async def startup_upstream_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Create the shared client. Called from the app startup hook."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_upstream_client(transport)
+        logger.info(f"Upstream client started for {EXTERNAL_API_BASE_URL}")
+    return _client
+
+
+async def shutdown_upstream_client() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_upstream_client() -> httpx.AsyncClient:
+    """
+    FastAPI dependency returning the shared upstream client.
+
+    The client is normally created on startup; it is created lazily here
+    as well so the routers keep working when mounted without the app hooks.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_upstream_client()
+    return _client
+
+
+def pool_stats() -> Dict[str, int]:
+    """
+    Connection pool utilization of the shared client. Reads httpcore pool
+    internals, so it degrades to zeros for transports without a pool.
+    """
+    stats = {"max_connections": UPSTREAM_MAX_CONNECTIONS, "connections": 0, "active": 0, "idle": 0, "waiting": 0}
+    pool = getattr(getattr(_client, '_transport', None), '_pool', None)
+    if pool is None:
+        return stats
+    try:
+        for connection in pool.connections:
+            stats["connections"] += 1
+            stats["idle" if connection.is_idle() else "active"] += 1
+        stats["waiting"] = sum(1 for r in getattr(pool, '_requests', []) if getattr(r, 'connection', None) is None)
+    except Exception as e:
+        logger.debug(f"Upstream pool stats unavailable: {str(e)}")
+    return stats
@@ -0,0 +1,91 @@
+# ============================================================
+# StyleAdvisor AI - RevenueCat Webhook Deduplication
+# ============================================================
+# RevenueCat redelivers events it did not see acknowledged in
+# time. Event ids already accepted are remembered in a bounded
+# in-memory LRU (checked first, O(1)) backed by a shared store
+# (the state backend, or WEBHOOK_DEDUP_BACKEND while that keeps
+# state per worker), so a redelivery reaching another worker is
+# still acknowledged without any upstream call.
+# ============================================================
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from routers.state import StateBackend
+from routers.config import WEBHOOK_DEDUP_MEMORY_SIZE, WEBHOOK_DEDUP_TTL_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDeduplicator:
+    """Remembers accepted event ids; mark_seen() reports redeliveries."""
+
+    NAMESPACE = 'webhook_dedup'
+
+    def __init__(self, max_entries: int = WEBHOOK_DEDUP_MEMORY_SIZE):
+        self.max_entries = max_entries
+        self.store: Optional[StateBackend] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.checked = 0
+        self.memory_duplicates = 0
+        self.store_duplicates = 0
+
+    def use_backend(self, store: StateBackend) -> None:
+        self.store = store
+
+    async def mark_seen(self, event_id: str) -> bool:
+        """Record an event id. Returns True if it was already seen (a duplicate)."""
+        self.checked += 1
+        if event_id in self._seen:
+            self._seen.move_to_end(event_id)
+            self.memory_duplicates += 1
+            return True
+
+        # Remember before awaiting the store so concurrent redeliveries see it
+        self._remember(event_id)
+        if self.store is not None:
+            try:
+                if not await self.store.add(self.NAMESPACE, event_id, WEBHOOK_DEDUP_TTL_HOURS * 3600):
+                    self.store_duplicates += 1
+                    return True
+            except Exception as e:
+                # Store unavailable: fall back to the in-memory front only
+                logger.warning(f"Webhook dedup store unavailable: {str(e)}")
+        return False
+
+    async def forget(self, event_id: str) -> None:
+        """Un-mark an event that could not be accepted, so a redelivery is processed."""
+        self._seen.pop(event_id, None)
+        if self.store is not None:
+            try:
+                await self.store.delete(self.NAMESPACE, event_id)
+            except Exception as e:
+                logger.warning(f"Webhook dedup store unavailable: {str(e)}")
+
+    def _remember(self, event_id: str) -> None:
+        self._seen[event_id] = None
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        duplicates = self.memory_duplicates + self.store_duplicates
+        return {
+            "checked": self.checked,
+            "duplicates": duplicates,
+            "duplicate_rate": round(duplicates / self.checked, 4) if self.checked else 0.0,
+            "memory_duplicates": self.memory_duplicates,
+            "store_duplicates": self.store_duplicates,
+            "memory_size": len(self._seen),
+        }
+
+
+def event_id_of(body: Dict[str, Any]) -> Optional[str]:
+    event = body.get('event')
+    if isinstance(event, dict) and event.get('id'):
+        return str(event['id'])
+    return None
+
+
+webhook_dedup = WebhookDeduplicator()
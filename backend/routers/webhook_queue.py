@@ -0,0 +1,301 @@
+# ============================================================
+# StyleAdvisor AI - RevenueCat Webhook Ingestion Queue
+# ============================================================
+# Webhook deliveries are written to a Mongo collection and
+# acknowledged immediately; background workers drain them to
+# the upstream with retries. Events are partitioned by
+# app_user_id and each partition is drained in order by a
+# single worker, so events for one user are never reordered;
+# a user whose event is backing off does not hold up the
+# other users of its partition.
+# ============================================================
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from routers.config import (
+    WEBHOOK_QUEUE_WORKERS,
+    WEBHOOK_QUEUE_BATCH_SIZE,
+    WEBHOOK_QUEUE_MAX_ATTEMPTS,
+    WEBHOOK_QUEUE_POLL_INTERVAL,
+    WEBHOOK_QUEUE_LEASE_SECONDS,
+    WEBHOOK_QUEUE_RETENTION_DAYS,
+    WEBHOOK_QUEUE_START_RETRY_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Delivery outcomes returned by the deliver callback
+DELIVERED = 'delivered'
+RETRY = 'retry'
+REJECTED = 'rejected'
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class RateCounter:
+    """Events per second over a sliding window, in one-second buckets."""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.total = 0
+        self._buckets: Deque[List[int]] = deque()
+
+    def add(self, count: int = 1) -> None:
+        now = int(time.monotonic())
+        self.total += count
+        if self._buckets and self._buckets[-1][0] == now:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([now, count])
+        self._trim(now)
+
+    def rate(self) -> float:
+        self._trim(int(time.monotonic()))
+        return round(sum(c for _, c in self._buckets) / self.window_seconds, 3)
+
+    def _trim(self, now: int) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+
+def partition_for(key: str, partitions: int) -> int:
+    return zlib.crc32(key.encode('utf-8')) % partitions
+
+
+class WebhookQueue:
+    """
+    Durable webhook queue on a Motor collection.
+
+    `deliver` receives a queued document and returns DELIVERED, RETRY or
+    REJECTED; RETRY reschedules it with exponential backoff until
+    WEBHOOK_QUEUE_MAX_ATTEMPTS, after which it is marked failed.
+    """
+
+    def __init__(self, deliver: Callable[[Dict[str, Any]], Awaitable[str]], workers: int = WEBHOOK_QUEUE_WORKERS):
+        self.deliver = deliver
+        self.partitions = workers
+        self.collection = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._starter: Optional["asyncio.Task[None]"] = None
+        self._wakeups = [asyncio.Event() for _ in range(workers)]
+        self._next_lease_recovery = 0.0
+        self.enqueued = RateCounter()
+        self.drained = RateCounter()
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self.collection is not None and bool(self._tasks)
+
+    async def start(self, collection) -> None:
+        """Prepare indexes and start the partition workers, which also recover expired leases."""
+        await collection.create_index([("status", 1), ("partition", 1), ("seq", 1)])
+        await collection.create_index(
+            "completed_at",
+            expireAfterSeconds=int(WEBHOOK_QUEUE_RETENTION_DAYS * 86400)
+        )
+        self.collection = collection
+        self._tasks = [
+            asyncio.ensure_future(self._worker(partition))
+            for partition in range(self.partitions)
+        ]
+        logger.info(f"Webhook queue started with {self.partitions} workers")
+
+    def start_in_background(self, collection) -> None:
+        """
+        Start the queue, retrying every WEBHOOK_QUEUE_START_RETRY_SECONDS
+        while Mongo is unreachable. Webhooks are forwarded synchronously
+        until it is running.
+        """
+        if self._starter is None or self._starter.done():
+            self._starter = asyncio.ensure_future(self._start_with_retry(collection))
+
+    async def _start_with_retry(self, collection) -> None:
+        while True:
+            try:
+                await self.start(collection)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"Webhook queue not started, retrying in {WEBHOOK_QUEUE_START_RETRY_SECONDS:g}s: {str(e)}"
+                )
+            await asyncio.sleep(WEBHOOK_QUEUE_START_RETRY_SECONDS)
+
+    async def stop(self) -> None:
+        if self._starter is not None:
+            self._starter.cancel()
+            await asyncio.gather(self._starter, return_exceptions=True)
+            self._starter = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, target: str, body: Dict[str, Any], signature: Optional[str], ordering_key: str) -> str:
+        partition = partition_for(ordering_key, self.partitions)
+        now = datetime.utcnow()
+        doc_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "_id": doc_id,
+            "target": target,
+            "body": body,
+            "signature": signature,
+            "ordering_key": ordering_key,
+            "partition": partition,
+            "seq": time.time_ns(),
+            "status": PENDING,
+            "attempts": 0,
+            "created_at": now,
+            "available_at": now,
+        })
+        self.enqueued.add()
+        self._wakeups[partition].set()
+        return doc_id
+
+    async def _recover_leases(self) -> None:
+        """Return events whose worker died mid-delivery to the pending state."""
+        await self.collection.update_many(
+            {"status": PROCESSING, "lease_until": {"$lt": datetime.utcnow()}},
+            {"$set": {"status": PENDING}}
+        )
+
+    async def _worker(self, partition: int) -> None:
+        wakeup = self._wakeups[partition]
+        while True:
+            try:
+                await self._maybe_recover_leases()
+                drained = await self._drain_batch(partition)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook queue worker {partition} error: {str(e)}")
+                drained = 0
+            if drained:
+                continue
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), WEBHOOK_QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _maybe_recover_leases(self) -> None:
+        """Reclaim expired leases at most once per lease period, from whichever worker gets here first."""
+        now = time.monotonic()
+        if now < self._next_lease_recovery:
+            return
+        self._next_lease_recovery = now + WEBHOOK_QUEUE_LEASE_SECONDS
+        await self._recover_leases()
+
+    async def _drain_batch(self, partition: int) -> int:
+        """
+        Deliver up to WEBHOOK_QUEUE_BATCH_SIZE due events of a partition in
+        order. An event that is not yet due, is being delivered elsewhere
+        or has to be retried blocks only its own app_user_id: later events
+        for that user are skipped so they never overtake it, while other
+        users in the partition keep draining.
+        """
+        now = datetime.utcnow()
+        blocked: Set[str] = set()
+        delivered = 0
+        last_seq = None
+        while delivered < WEBHOOK_QUEUE_BATCH_SIZE:
+            query: Dict[str, Any] = {"status": {"$in": [PENDING, PROCESSING]}, "partition": partition}
+            if blocked:
+                query["ordering_key"] = {"$nin": list(blocked)}
+            if last_seq is not None:
+                query["seq"] = {"$gt": last_seq}
+            cursor = self.collection.find(query).sort("seq", 1).limit(WEBHOOK_QUEUE_BATCH_SIZE)
+            docs = await cursor.to_list(WEBHOOK_QUEUE_BATCH_SIZE)
+            if not docs:
+                break
+
+            for doc in docs:
+                last_seq = doc["seq"]
+                key = doc.get("ordering_key")
+                if key in blocked:
+                    continue
+                if doc["status"] == PROCESSING or doc["available_at"] > now:
+                    blocked.add(key)
+                    continue
+                claimed = await self.collection.update_one(
+                    {"_id": doc["_id"], "status": PENDING},
+                    {"$set": {
+                        "status": PROCESSING,
+                        "lease_until": datetime.utcnow() + timedelta(seconds=WEBHOOK_QUEUE_LEASE_SECONDS),
+                    }}
+                )
+                if claimed.modified_count == 0:
+                    # Another process took it; leave the rest of this user to it
+                    blocked.add(key)
+                    continue
+
+                try:
+                    outcome = await self.deliver(doc)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Webhook event {doc['_id']} delivery error: {str(e)}")
+                    outcome = RETRY
+                if outcome == DELIVERED:
+                    # Settle each event as soon as it is delivered: a lease that
+                    # ran out behind a long batch would otherwise be reclaimed
+                    # and the event redelivered after the user's later ones
+                    await self.collection.update_one(
+                        {"_id": doc["_id"]},
+                        {"$set": {"status": DONE, "completed_at": datetime.utcnow()}}
+                    )
+                    self.drained.add()
+                    delivered += 1
+                    if delivered >= WEBHOOK_QUEUE_BATCH_SIZE:
+                        break
+                    continue
+                await self._reschedule(doc, outcome)
+                blocked.add(key)
+        return delivered
+
+    async def _reschedule(self, doc: Dict[str, Any], outcome: str) -> None:
+        attempts = doc.get("attempts", 0) + 1
+        if outcome == REJECTED or attempts >= WEBHOOK_QUEUE_MAX_ATTEMPTS:
+            self.failed += 1
+            logger.error(f"Webhook event {doc['_id']} failed after {attempts} attempt(s)")
+            await self.collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"status": FAILED, "attempts": attempts, "completed_at": datetime.utcnow()}}
+            )
+            return
+        self.retried += 1
+        delay = min(300.0, 2 ** attempts) * random.uniform(0.5, 1.0)
+        await self.collection.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {
+                "status": PENDING,
+                "attempts": attempts,
+                "available_at": datetime.utcnow() + timedelta(seconds=delay),
+            }}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": len(self._tasks),
+            "enqueued": self.enqueued.total,
+            "drained": self.drained.total,
+            "enqueue_rate_per_second": self.enqueued.rate(),
+            "drain_rate_per_second": self.drained.rate(),
+            "retried": self.retried,
+            "failed": self.failed,
+        }
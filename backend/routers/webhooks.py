@@ -6,15 +6,19 @@
 
 from fastapi import APIRouter, HTTPException, Request, Header
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-import httpx
+from typing import Optional, Dict, Any, List
 import logging
-from routers.config import EXTERNAL_API_BASE_URL
+from routers.proxy import UpstreamService, UpstreamUnavailableError
+from routers.cache import invalidate_user
+from routers.config import WEBHOOK_QUEUE_ENABLED
+from routers.webhook_queue import WebhookQueue, DELIVERED, RETRY, REJECTED
+from routers.webhook_dedup import webhook_dedup, event_id_of
+from routers.serialization import FastJSONRoute
 
-router = APIRouter(tags=["Webhooks"])
+router = APIRouter(tags=["Webhooks"], route_class=FastJSONRoute)
 
-EXTERNAL_WEBHOOK_URL = f"{EXTERNAL_API_BASE_URL}/api/v1/webhooks"
-EXTERNAL_LEGACY_WEBHOOK_URL = f"{EXTERNAL_API_BASE_URL}/webhooks"
+webhook_upstream = UpstreamService("webhooks", "/api/v1/webhooks")
+legacy_webhook_upstream = UpstreamService("webhooks_legacy", "/webhooks")
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,136 @@ class WebhookResponse(BaseModel):
     success: bool
     message: str
 
+# ============ Helpers ============
+
+def _event_user_ids(body: Dict[str, Any]) -> List[str]:
+    """All RevenueCat app user ids an event refers to."""
+    event = body.get('event', body)
+    if not isinstance(event, dict):
+        return []
+    user_ids = [event.get('app_user_id'), event.get('original_app_user_id')]
+    user_ids.extend(event.get('aliases') or [])
+    return [user_id for user_id in dict.fromkeys(user_ids) if isinstance(user_id, str) and user_id]
+
+
+def _signature_headers(signature: Optional[str]) -> Dict[str, str]:
+    return {"X-RevenueCat-Signature": signature} if signature else {}
+
+
+def _invalidate_event_users(body: Dict[str, Any]) -> None:
+    # Cached premium/user reads for these users are now stale
+    for user_id in _event_user_ids(body):
+        invalidate_user(user_id)
+
+
+async def _forward_revenuecat_event(
+    upstream: UpstreamService,
+    body: Dict[str, Any],
+    signature: Optional[str],
+    label: str
+) -> Any:
+    try:
+        return await upstream.relay(
+            "POST", "/revenuecat",
+            json=body,
+            headers=_signature_headers(signature),
+            error_message='Webhook processing failed'
+        )
+    except HTTPException as e:
+        if e.status_code == 503:
+            logger.error(f"RevenueCat {label} error: {e.detail}")
+        else:
+            logger.error(f"RevenueCat {label} failed: {e.status_code}")
+        raise
+    finally:
+        _invalidate_event_users(body)
+
+
+async def _deliver_queued_event(doc: Dict[str, Any]) -> str:
+    """Deliver one queued event upstream; used by the queue workers."""
+    upstream = legacy_webhook_upstream if doc["target"] == "legacy" else webhook_upstream
+    try:
+        response = await upstream.send(
+            "POST", "/revenuecat",
+            json=doc["body"],
+            headers=_signature_headers(doc.get("signature"))
+        )
+    except UpstreamUnavailableError as e:
+        logger.warning(f"RevenueCat queued delivery deferred: {e.reason}")
+        return RETRY
+
+    if response.status_code == 200:
+        _invalidate_event_users(doc["body"])
+        return DELIVERED
+    if response.status_code >= 500 or response.status_code == 429:
+        return RETRY
+    logger.error(f"RevenueCat queued delivery rejected: {response.status_code}")
+    return REJECTED
+
+
+webhook_queue = WebhookQueue(deliver=_deliver_queued_event)
+
+
+async def _enqueue_revenuecat_event(
+    target: str,
+    upstream: UpstreamService,
+    body: Dict[str, Any],
+    signature: Optional[str],
+    label: str
+) -> Any:
+    """
+    Enqueue the event and acknowledge it immediately. Falls back to
+    forwarding synchronously when the queue is disabled or unavailable.
+    """
+    if WEBHOOK_QUEUE_ENABLED and webhook_queue.running:
+        # Events for the same user are delivered in order
+        user_ids = _event_user_ids(body)
+        event = body.get('event')
+        if user_ids:
+            ordering_key = user_ids[0]
+        elif isinstance(event, dict):
+            ordering_key = str(event.get('id', ''))
+        else:
+            ordering_key = ''
+        try:
+            await webhook_queue.enqueue(target, body, signature, ordering_key)
+            return {"success": True, "message": "Webhook queued"}
+        except Exception as e:
+            logger.error(f"RevenueCat {label} enqueue failed, forwarding directly: {str(e)}")
+    return await _forward_revenuecat_event(upstream, body, signature, label)
+
+
+async def _ingest_revenuecat_event(
+    target: str,
+    upstream: UpstreamService,
+    body: Dict[str, Any],
+    signature: Optional[str],
+    label: str
+) -> Any:
+    """Acknowledge redelivered events locally; accept new ones."""
+    event_id = event_id_of(body)
+    if event_id and await webhook_dedup.mark_seen(event_id):
+        logger.info(f"RevenueCat {label} duplicate ignored: {event_id}")
+        return {"success": True, "message": "Duplicate webhook ignored"}
+    try:
+        return await _enqueue_revenuecat_event(target, upstream, body, signature, label)
+    except BaseException:
+        # Not accepted; let RevenueCat's redelivery through
+        if event_id:
+            await webhook_dedup.forget(event_id)
+        raise
+
+
+async def _read_webhook_body(request: Request, label: str) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except Exception:
+        body = None
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    logger.info(f"RevenueCat webhook received ({label}): {body.get('type', 'unknown')}")
+    return body
+
 # ============ Endpoints ============
 
 @router.post("/webhooks/revenuecat", response_model=WebhookResponse, summary="RevenueCat webhook (v1)")
@@ -43,36 +177,11 @@ async def revenuecat_webhook_v1(
     - Expirations
     
     The webhook is verified using the X-RevenueCat-Signature header.
+    Events are queued durably and acknowledged right away; background
+    workers deliver them upstream in order per app_user_id.
     """
-    try:
-        body = await request.json()
-        logger.info(f"RevenueCat webhook received (v1): {body.get('type', 'unknown')}")
-    except Exception:
-        body = {}
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {}
-            if x_revenuecat_signature:
-                headers["X-RevenueCat-Signature"] = x_revenuecat_signature
-            
-            response = await client.post(
-                f"{EXTERNAL_WEBHOOK_URL}/revenuecat",
-                json=body,
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"RevenueCat webhook failed: {response.status_code}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Webhook processing failed')
-                )
-        except httpx.RequestError as e:
-            logger.error(f"RevenueCat webhook error: {str(e)}")
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    body = await _read_webhook_body(request, "v1")
+    return await _ingest_revenuecat_event("v1", webhook_upstream, body, x_revenuecat_signature, "webhook")
 
 
 @router.post("/webhooks/revenuecat/legacy", response_model=WebhookResponse, summary="RevenueCat webhook (legacy path)")
@@ -86,32 +195,5 @@ async def revenuecat_webhook_legacy(
     This is the legacy webhook endpoint path for backwards compatibility.
     New integrations should use /api/v1/webhooks/revenuecat instead.
     """
-    try:
-        body = await request.json()
-        logger.info(f"RevenueCat webhook received (legacy): {body.get('type', 'unknown')}")
-    except Exception:
-        body = {}
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {}
-            if x_revenuecat_signature:
-                headers["X-RevenueCat-Signature"] = x_revenuecat_signature
-            
-            response = await client.post(
-                f"{EXTERNAL_LEGACY_WEBHOOK_URL}/revenuecat",
-                json=body,
-                headers=headers,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"RevenueCat legacy webhook failed: {response.status_code}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json().get('detail', 'Webhook processing failed')
-                )
-        except httpx.RequestError as e:
-            logger.error(f"RevenueCat legacy webhook error: {str(e)}")
-            raise HTTPException(status_code=503, detail=f"External service unavailable: {str(e)}")
+    body = await _read_webhook_body(request, "legacy")
+    return await _ingest_revenuecat_event("legacy", legacy_webhook_upstream, body, x_revenuecat_signature, "legacy webhook")
@@ -0,0 +1,135 @@
+# ============================================================
+# StyleAdvisor AI - Buffered Mongo Writer
+# ============================================================
+# Write-behind buffer turning many single-document inserts into
+# insert_many batches, flushed when a batch fills up or after a
+# short interval. The buffer is bounded: when it is full,
+# writers wait for the next flush instead of growing memory.
+# Callers that need an acknowledgement can wait for their
+# document's batch to be written.
+# ============================================================
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from routers.config import (
+    STATUS_WRITE_BATCH_SIZE,
+    STATUS_WRITE_FLUSH_INTERVAL,
+    STATUS_WRITE_MAX_PENDING,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """Batches inserts into one collection."""
+
+    def __init__(
+        self,
+        batch_size: int = STATUS_WRITE_BATCH_SIZE,
+        flush_interval: float = STATUS_WRITE_FLUSH_INTERVAL,
+        max_pending: int = STATUS_WRITE_MAX_PENDING,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.collection = None
+        self._pending: List[Tuple[Dict[str, Any], Optional[asyncio.Future]]] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, collection) -> None:
+        self.collection = collection
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush loop and write everything still buffered. The loop
+        is asked to exit rather than cancelled, so a batch being written
+        is never interrupted halfway.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while self._pending:
+            await self.flush()
+
+    async def insert(self, document: Dict[str, Any], wait: bool = False) -> None:
+        """
+        Buffer a document. With wait=True, return only once its batch has
+        been written, raising if that write failed.
+        """
+        while len(self._pending) >= self.max_pending:
+            # Bounded memory: wait for the flush loop to drain the buffer
+            self._wakeup.set()
+            flushed = self._flushed
+            await flushed.wait()
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((document, future))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def flush(self) -> None:
+        async with self._lock:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            if not batch:
+                return
+            try:
+                await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Buffered insert of {len(batch)} documents failed: {str(e)}")
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+            else:
+                self.written += len(batch)
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_result(None)
+            finally:
+                self.batches += 1
+                flushed, self._flushed = self._flushed, asyncio.Event()
+                flushed.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending and not self._stopping:
+                await self.flush()
+                if len(self._pending) < self.batch_size:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
@@ -1,47 +1,78 @@
-from fastapi import FastAPI, APIRouter
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, HTTPException, Query
+from starlette.responses import PlainTextResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
-from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Dict, List, Optional
+import base64
+import importlib
+import json
 import uuid
 from datetime import datetime
 
-# Import all routers
-from routers.auth import router as auth_router
+# Import the routers; pdf_read, delete_account and webhooks are mounted
+# below, on first use when LAZY_ROUTERS_ENABLED
+from routers.auth import router as auth_router, auth_upstream
 from routers.email_otp import router as email_otp_router
 from routers.google_auth import router as google_auth_router
 from routers.apple_auth import router as apple_auth_router
 from routers.password_reset import router as password_reset_router
-from routers.pdf_read import router as pdf_read_router
-from routers.notifications import router as notifications_router
-from routers.delete_account import router as delete_account_router
-from routers.premium import router as premium_router
-from routers.webhooks import router as webhooks_router
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+from routers.notifications import router as notifications_router, bulk_notification_jobs, notifications_upstream
+from routers.premium import router as premium_router, premium_upstream
+from routers.webhook_dedup import webhook_dedup
+from routers.upstream import startup_upstream_client, shutdown_upstream_client, pool_stats
+from routers.cache import user_cache, user_cache_sync
+from routers.singleflight import upstream_flights
+from routers.circuit_breaker import circuit_breakers
+from routers.policies import retry_budget
+from routers.metrics import MetricsMiddleware, render_metrics, render_stats
+from routers.tracing import TracingMiddleware, instrument_routes, span_exporter
+from routers.write_buffer import BufferedWriter
+from routers.database import create_mongo_client, mongo_warmup
+from routers.readiness import dependency_prober, mongo_probe, upstream_probe
+from routers.rate_limit import rate_limiter
+from routers.state import MemoryStateBackend, create_state_backend
+from routers.lazy import LazyRouters, LazyRouterMiddleware, loaded
+from routers.serialization import FastJSONResponse, FastJSONRoute, dumps
+from routers.compression import CompressionMiddleware, compression_stats
+from routers.config import (
+    WEBHOOK_QUEUE_ENABLED,
+    STATE_BACKEND,
+    WEBHOOK_DEDUP_BACKEND,
+    STATUS_PAGE_MAX_LIMIT,
+    STATUS_STREAM_BATCH_SIZE,
+    STATUS_WRITE_BUFFER_ENABLED,
+    LAZY_ROUTERS_ENABLED,
+)
 
-# MongoDB connection
+# MongoDB connection (routers.config has already loaded .env)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = create_mongo_client(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Rate limits, webhook dedup and cache invalidations shared by all workers
+state_backend = create_state_backend(STATE_BACKEND, db)
+
+# Used by webhook dedup only while state_backend is per worker
+webhook_dedup_store = create_state_backend(WEBHOOK_DEDUP_BACKEND, db)
+
+# Batches POST /api/status inserts when STATUS_WRITE_BUFFER_ENABLED
+status_writer = BufferedWriter()
+
 # Create the main app
 app = FastAPI(
     title="StyleAdvisor AI API",
     description="Backend API for StyleAdvisor AI mobile application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=FastJSONRoute)
 
 # Create versioned API router
-api_v1_router = APIRouter(prefix="/api/v1")
+api_v1_router = APIRouter(prefix="/api/v1", route_class=FastJSONRoute)
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -52,26 +83,169 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckFields(BaseModel):
+    """A listed status check; only the fields selected with ?fields= are present."""
+    id: Optional[str] = None
+    client_name: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "StyleAdvisor AI Backend API"}
 
+@api_router.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe, answered from the background prober's latest results.
+    503 until MongoDB is warmed up and answering pings; upstream problems,
+    open circuits and a saturated pool only mark the status 'degraded'.
+    """
+    snapshot = dependency_prober.snapshot()
+    snapshot["ready"] = snapshot["ready"] and mongo_warmup.ready
+    snapshot["mongo_warmup"] = mongo_warmup.stats()
+    if not snapshot["ready"]:
+        return FastJSONResponse(snapshot, status_code=503)
+    return snapshot
+
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "StyleAdvisor AI"}
+    degraded = circuit_breakers.any_open() or dependency_prober.snapshot()["status"] != "ok"
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "StyleAdvisor AI",
+        "cache": {**user_cache.stats(), "sync": user_cache_sync.stats()},
+        "state": state_backend.stats(),
+        "coalescing": upstream_flights.stats(),
+        "circuits": circuit_breakers.snapshot(),
+        "retries": retry_budget.stats(),
+        "webhook_queue": _lazy_stats("webhooks", "webhook_queue"),
+        "webhook_dedup": webhook_dedup.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "tracing": span_exporter.stats(),
+        "compression": compression_stats.to_dict(),
+        "status_writer": status_writer.stats(),
+        "jobs": {
+            "bulk_notification": bulk_notification_jobs.stats(),
+            "data_export": _lazy_stats("delete_account", "export_jobs"),
+        },
+        "lazy_routers": lazy_routers.stats(),
+    }
+
+@api_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, upstream and component metrics."""
+    circuits = [
+        ({"circuit": name}, {**snapshot, "open": snapshot["state"] != "closed"})
+        for name, snapshot in circuit_breakers.snapshot().items()
+    ]
+    jobs = [
+        ({"kind": "bulk_notification"}, bulk_notification_jobs.stats()),
+        ({"kind": "data_export"}, _lazy_stats("delete_account", "export_jobs")),
+    ]
+    body = render_metrics([
+        render_stats('styleadvisor_upstream_pool', 'Upstream connection pool utilization.', [({}, pool_stats())]),
+        render_stats('styleadvisor_user_cache', 'Per-user response cache.', [({}, user_cache.stats())]),
+        render_stats('styleadvisor_user_cache_sync', 'Cross-worker cache invalidation.', [({}, user_cache_sync.stats())]),
+        render_stats('styleadvisor_state', 'Shared state backend.', [({}, state_backend.stats())]),
+        render_stats('styleadvisor_coalescing', 'Coalesced upstream reads.', [({}, upstream_flights.stats())]),
+        render_stats('styleadvisor_circuit', 'Upstream circuit breakers.', circuits),
+        render_stats('styleadvisor_retry_budget', 'Upstream retry budget.', [({}, retry_budget.stats())]),
+        render_stats('styleadvisor_webhook_queue', 'RevenueCat webhook queue.', [({}, _lazy_stats("webhooks", "webhook_queue"))]),
+        render_stats('styleadvisor_webhook_dedup', 'RevenueCat webhook deduplication.', [({}, webhook_dedup.stats())]),
+        render_stats('styleadvisor_rate_limit', 'Auth endpoint rate limiting.', [({}, rate_limiter.stats())]),
+        render_stats('styleadvisor_jobs', 'Background jobs.', jobs),
+        render_stats('styleadvisor_compression', 'Response compression.', [({}, compression_stats.to_dict())]),
+    ])
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(input: StatusCheckCreate, durable: bool = Query(False)):
+    """
+    Record a status check. With the write buffer enabled it is batched
+    into insert_many and acknowledged before it is written, unless
+    **durable** is set, which waits until its batch is stored.
+    """
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    if status_writer.running:
+        try:
+            await status_writer.insert(status_obj.dict(), wait=durable)
+        except Exception as e:
+            logger.error(f"Status check write failed: {str(e)}")
+            raise HTTPException(status_code=503, detail="Failed to save status check")
+    else:
+        _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+STATUS_CHECK_FIELDS = ('id', 'client_name', 'timestamp')
+
+def _encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc['timestamp'].isoformat(), doc['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor: str) -> dict:
+    """Mongo filter for status checks after the cursor in (timestamp, id) order."""
+    try:
+        timestamp, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": last_id}},
+    ]}
+
+def _status_check_json(doc: dict, fields: tuple) -> dict:
+    return {
+        field: doc[field].isoformat() if field == 'timestamp' else doc.get(field)
+        for field in fields
+    }
+
+@api_router.get(
+    "/status",
+    response_model=List[StatusCheckFields],
+    responses={200: {"content": {"application/x-ndjson": {"schema": {"$ref": "#/components/schemas/StatusCheckFields"}}}}},
+)
+async def get_status_checks(
+    limit: int = Query(STATUS_PAGE_MAX_LIMIT, ge=1, le=STATUS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    List status checks oldest first, in (timestamp, id) order.
+
+    - **limit**: Page size; the next page's cursor is returned in the
+      X-Next-Cursor header
+    - **cursor**: Continue after a previous page
+    - **fields**: Comma-separated subset of id, client_name, timestamp
+    - **format**: 'ndjson' streams every check after the cursor as
+      newline-delimited JSON, without paging or holding them in memory
+    """
+    selected = STATUS_CHECK_FIELDS
+    if fields:
+        requested = {name.strip() for name in fields.split(',')}
+        selected = tuple(f for f in STATUS_CHECK_FIELDS if f in requested)
+        if not selected:
+            raise HTTPException(status_code=400, detail=f"fields must be among {', '.join(STATUS_CHECK_FIELDS)}")
+    # id and timestamp are always read, for the cursor
+    projection = {"_id": 0, "id": 1, "timestamp": 1, **{f: 1 for f in selected}}
+    query = _decode_cursor(cursor) if cursor else {}
+    find = db.status_checks.find(query, projection).sort([("timestamp", 1), ("id", 1)])
+
+    if format == "ndjson":
+        async def stream():
+            async for doc in find.batch_size(STATUS_STREAM_BATCH_SIZE):
+                yield dumps(_status_check_json(doc, selected)) + "\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    docs = await find.limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(docs[-1])
+    return FastJSONResponse([_status_check_json(doc, selected) for doc in docs], headers=headers)
 
 # Include all routers in the versioned API router
 api_v1_router.include_router(auth_router)
@@ -79,16 +253,47 @@ api_v1_router.include_router(email_otp_router)
 api_v1_router.include_router(google_auth_router)
 api_v1_router.include_router(apple_auth_router)
 api_v1_router.include_router(password_reset_router)
-api_v1_router.include_router(pdf_read_router)
 api_v1_router.include_router(notifications_router)
-api_v1_router.include_router(delete_account_router)
 api_v1_router.include_router(premium_router)
-api_v1_router.include_router(webhooks_router)
 
 # Include all routers in the main app
 app.include_router(api_router)
 app.include_router(api_v1_router)
 
+# Parse/validate, endpoint and serialization spans for every route
+instrument_routes(app.routes)
+
+# Rarely used routers by path prefix; imported only once a request needs them
+LAZY_ROUTER_PREFIXES = {
+    "pdf_read": "/api/v1/pdfread",
+    "delete_account": "/api/v1/delete-account",
+    "webhooks": "/api/v1/webhooks",
+}
+
+def _mount_router(module) -> None:
+    app.include_router(module.router, prefix="/api/v1")
+    instrument_routes(app.routes)
+    # Regenerated with the new routes on the next /openapi.json
+    app.openapi_schema = None
+
+lazy_routers = LazyRouters(_mount_router)
+for _module, _prefix in LAZY_ROUTER_PREFIXES.items():
+    if LAZY_ROUTERS_ENABLED:
+        lazy_routers.add(_module, _prefix)
+    else:
+        lazy_routers.load(_module)
+
+def _lazy_stats(module: str, component: str) -> Dict[str, Any]:
+    """stats() of a lazily mounted router's component; empty until it is loaded."""
+    imported = loaded(module)
+    return getattr(imported, component).stats() if imported else {}
+
+async def _pdfread_probe():
+    # Imports pdf_read from the background prober rather than at spawn
+    return await importlib.import_module("routers.pdf_read").pdf_health_probe()
+
+app.add_middleware(LazyRouterMiddleware, routers=lazy_routers, schema_paths=[app.openapi_url])
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -97,6 +302,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresses after CORS headers are set; skips bodies that are already encoded
+app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so it times everything including CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -104,6 +317,100 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_upstream():
+    await startup_upstream_client()
+
+@app.on_event("startup")
+async def startup_mongo_warmup():
+    # Runs in the background; /api/ready reports 503 until it succeeds
+    mongo_warmup.start(db)
+
+@app.on_event("startup")
+async def startup_dependency_prober():
+    dependency_prober.add("mongo", mongo_probe(db), required=True)
+    dependency_prober.add("auth", upstream_probe(auth_upstream))
+    dependency_prober.add("premium", upstream_probe(premium_upstream))
+    dependency_prober.add("notifications", upstream_probe(notifications_upstream))
+    dependency_prober.add("pdfread", _pdfread_probe)
+    dependency_prober.start()
+
+@app.on_event("startup")
+async def startup_status_writer():
+    if STATUS_WRITE_BUFFER_ENABLED:
+        await status_writer.start(db.status_checks)
+
+@app.on_event("startup")
+async def startup_tracing():
+    await span_exporter.start()
+
+@app.on_event("startup")
+async def startup_webhook_queue():
+    if not WEBHOOK_QUEUE_ENABLED:
+        return
+    # Queued events are redelivered from the start, so load the router now;
+    # the queue keeps retrying in the background while Mongo is unreachable
+    lazy_routers.require("webhooks").webhook_queue.start_in_background(db.webhook_events)
+
+@app.on_event("startup")
+async def startup_state_backend():
+    global state_backend
+    try:
+        await state_backend.start()
+    except Exception as e:
+        # Each worker keeps its own state until restarted with the store available
+        logger.error(f"{state_backend.name} state backend not started, using memory: {str(e)}")
+        state_backend = MemoryStateBackend()
+    rate_limiter.use_backend(state_backend)
+    await start_webhook_dedup()
+    await user_cache_sync.start(state_backend)
+
+async def start_webhook_dedup():
+    """Share accepted event ids through state_backend, or through webhook_dedup_store while that is per worker."""
+    store = state_backend if state_backend.shared else webhook_dedup_store
+    if not store.shared:
+        # Duplicates within one worker are caught by the in-memory front anyway
+        return
+    if store is not state_backend:
+        try:
+            await store.start()
+        except Exception as e:
+            logger.error(f"Webhook dedup store not started, deduplicating per worker: {str(e)}")
+            return
+    webhook_dedup.use_backend(store)
+
+@app.on_event("shutdown")
+async def shutdown_webhook_queue():
+    webhooks = loaded("webhooks")
+    if webhooks is not None:
+        await webhooks.webhook_queue.stop()
+
+@app.on_event("shutdown")
+async def shutdown_jobs():
+    await bulk_notification_jobs.stop()
+    delete_account = loaded("delete_account")
+    if delete_account is not None:
+        await delete_account.export_jobs.stop()
+
+@app.on_event("shutdown")
+async def shutdown_dependency_prober():
+    await dependency_prober.stop()
+
+@app.on_event("shutdown")
+async def shutdown_tracing():
+    await span_exporter.stop()
+
+@app.on_event("shutdown")
+async def shutdown_state_sync():
+    await user_cache_sync.stop()
+
+@app.on_event("shutdown")
+async def shutdown_upstream():
+    await shutdown_upstream_client()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await mongo_warmup.stop()
+    # Write out buffered status checks before the connection goes away
+    await status_writer.stop()
     client.close()
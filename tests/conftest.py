@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py builds its Motor client at import; nothing connects unless a test uses it
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200')
+os.environ.setdefault('DB_NAME', 'styleadvisor_test')
+
+from routers import upstream  # noqa: E402
+from routers.cache import user_cache  # noqa: E402
+from routers.circuit_breaker import circuit_breakers  # noqa: E402
+from routers.policies import RequestPolicy  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """Breakers and the user cache are module singletons; start every test clean."""
+    circuit_breakers._breakers.clear()
+    user_cache.clear()
+    yield
+    circuit_breakers._breakers.clear()
+    user_cache.clear()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(RequestPolicy, 'backoff', lambda self, attempt: 0.0)
+
+
+@pytest.fixture
+def mock_upstream():
+    """
+    Route the shared upstream client to a handler: `mock_upstream(handler)`
+    installs it and returns the list of requests the upstream received.
+    """
+    previous = upstream._client
+
+    def install(handler):
+        calls = []
+
+        async def record(request):
+            calls.append(request)
+            response = handler(request)
+            if hasattr(response, '__await__'):
+                response = await response
+            return response
+
+        upstream._client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        return calls
+
+    yield install
+    upstream._client = previous
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from routers import auth_status
+from routers.auth_status import AuthStatusWatcher
+from routers.proxy import UpstreamService
+
+
+def _watcher():
+    return AuthStatusWatcher(UpstreamService('auth_status_test', '/api/v1/auth/google'), 'Failed to get status')
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+@pytest.fixture
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(auth_status, 'AUTH_STATUS_POLL_INTERVAL', 0.01)
+
+
+def _serve_statuses(mock_upstream, *statuses):
+    """Answer each poll with the next status, repeating the last; returns the upstream calls."""
+    def upstream(request):
+        return httpx.Response(200, json={'status': statuses[min(len(calls), len(statuses)) - 1]})
+
+    calls = mock_upstream(upstream)
+    return calls
+
+
+def _status_of(chunk):
+    data = ''.join(line[len('data: '):] for line in chunk.splitlines() if line.startswith('data: '))
+    return json.loads(data)['status']
+
+
+@pytest.mark.anyio
+async def test_long_poll_waiters_share_one_poller(mock_upstream, fast_polls):
+    calls = _serve_statuses(mock_upstream, 'pending', 'pending', 'completed')
+    watcher = _watcher()
+
+    results = await asyncio.gather(*(watcher.wait('a1', timeout=5) for _ in range(10)))
+
+    assert {json.loads(result.body)['status'] for result in results} == {'completed'}
+    assert len(calls) == 3
+    assert watcher.stats()['active_watches'] == 0
+
+
+@pytest.mark.anyio
+async def test_long_poll_returns_the_latest_status_on_timeout(mock_upstream, fast_polls):
+    _serve_statuses(mock_upstream, 'pending')
+    watcher = _watcher()
+
+    result = await watcher.wait('a1', timeout=0.05)
+    assert json.loads(result.body)['status'] == 'pending'
+
+    # The poller stops once nobody is waiting
+    await asyncio.sleep(0.05)
+    assert watcher.stats()['active_watches'] == 0
+
+
+@pytest.mark.anyio
+async def test_long_poll_raises_upstream_rejections(mock_upstream, fast_polls):
+    mock_upstream(lambda request: httpx.Response(404, json={'detail': 'Auth session not found'}))
+
+    with pytest.raises(HTTPException) as raised:
+        await _watcher().wait('missing', timeout=1)
+    assert raised.value.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_sse_sends_each_change_once_and_ends_on_a_terminal_status(mock_upstream, fast_polls):
+    _serve_statuses(mock_upstream, 'pending', 'pending', 'pending', 'completed')
+
+    chunks = await _collect(_watcher().events('a1', timeout=5))
+    assert [_status_of(chunk) for chunk in chunks] == ['pending', 'completed']
+    assert all(chunk.startswith('event: status\n') for chunk in chunks)
+
+
+@pytest.mark.anyio
+async def test_sse_reports_upstream_errors_as_an_event(mock_upstream, fast_polls):
+    mock_upstream(lambda request: httpx.Response(404, json={'detail': 'Auth session not found'}))
+
+    chunks = await _collect(_watcher().events('missing', timeout=5))
+    assert len(chunks) == 1
+    assert chunks[0].startswith('event: error\n')
+
+
+@pytest.mark.anyio
+async def test_sse_frames_a_multiline_body_as_one_event(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(
+        200, content=b'{\n  "status": "completed",\n  "user": "u1"\n}\n',
+        headers={'content-type': 'application/json'},
+    ))
+
+    chunks = await _collect(_watcher().events('a1', timeout=1))
+    assert chunks == [
+        'event: status\n'
+        'data: {\n'
+        'data:   "status": "completed",\n'
+        'data:   "user": "u1"\n'
+        'data: }\n'
+        '\n'
+    ]
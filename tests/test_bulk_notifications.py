@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+from routers import notifications
+from routers.config import NOTIFICATION_BULK_BATCH_SIZE
+from routers.jobs import JobManager, JobQueueFullError
+
+
+def _body(users):
+    return {"user_ids": [f"user-{i}" for i in range(users)], "title": "t", "body": "b"}
+
+
+@pytest.fixture
+async def client():
+    import server
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url='http://test') as c:
+        yield c
+
+
+@pytest.mark.anyio
+async def test_large_campaign_requires_authorization(mock_upstream, client):
+    calls = mock_upstream(lambda request: httpx.Response(200, json={}))
+    response = await client.post('/api/v1/notifications/send/bulk', json=_body(NOTIFICATION_BULK_BATCH_SIZE * 3))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Authorization header required"
+    assert calls == []
+
+
+@pytest.mark.anyio
+async def test_first_batch_rejection_is_returned_without_queueing(mock_upstream, client):
+    calls = mock_upstream(lambda request: httpx.Response(401, json={'detail': 'Invalid token'}))
+    submitted = notifications.bulk_notification_jobs.submitted
+
+    response = await client.post(
+        '/api/v1/notifications/send/bulk',
+        json=_body(NOTIFICATION_BULK_BATCH_SIZE * 3),
+        headers={'Authorization': 'Bearer expired'},
+    )
+    assert response.status_code == 401
+    assert len(calls) == 1
+    assert notifications.bulk_notification_jobs.submitted == submitted
+
+
+@pytest.mark.anyio
+async def test_job_stops_on_upstream_4xx(mock_upstream, client, monkeypatch):
+    monkeypatch.setattr(notifications, 'NOTIFICATION_BULK_CONCURRENCY', 1)
+
+    def upstream(request):
+        # The first batch is accepted, then the token is revoked
+        return httpx.Response(200, json={}) if len(calls) == 1 else httpx.Response(403, json={'detail': 'Forbidden'})
+
+    calls = mock_upstream(upstream)
+    response = await client.post(
+        '/api/v1/notifications/send/bulk',
+        json=_body(NOTIFICATION_BULK_BATCH_SIZE * 10),
+        headers={'Authorization': 'Bearer token'},
+    )
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    job = notifications.bulk_notification_jobs.get(job_id, notifications.hash_token('Bearer token'))
+    for _ in range(100):
+        if job.finished:
+            break
+        await asyncio.sleep(0.01)
+    assert job.status == 'failed'
+    assert job.error == 'Forbidden'
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_full_job_queue_rejects_before_sending(mock_upstream, client, monkeypatch):
+    jobs = notifications.bulk_notification_jobs
+    monkeypatch.setattr(jobs, 'max_pending', 0)
+    calls = mock_upstream(lambda request: httpx.Response(200, json={}))
+    rejected = jobs.rejected
+
+    response = await client.post(
+        '/api/v1/notifications/send/bulk',
+        json=_body(NOTIFICATION_BULK_BATCH_SIZE * 3),
+        headers={'Authorization': 'Bearer token'},
+    )
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '30'
+    assert calls == []
+    assert jobs.rejected == rejected + 1
+
+
+@pytest.mark.anyio
+async def test_pending_jobs_are_bounded():
+    manager = JobManager('test', max_concurrent=1, max_pending=1)
+    gate = asyncio.Event()
+
+    async def run(job):
+        await gate.wait()
+
+    manager.submit(run)
+    await asyncio.sleep(0)
+    # One running, one waiting for the slot: the queue is now full
+    manager.submit(run)
+    with pytest.raises(JobQueueFullError):
+        manager.submit(run)
+
+    gate.set()
+    await manager.stop()
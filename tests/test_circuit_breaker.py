@@ -0,0 +1,98 @@
+import httpx
+import pytest
+
+from routers.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, circuit_breakers
+from routers.policies import WRITE
+from routers.proxy import CircuitOpenError, UpstreamService
+
+
+def _cool_down(breaker: CircuitBreaker) -> None:
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('t', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    assert 1 <= breaker.retry_after() <= 30
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker('t', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker('t', failure_threshold=1, half_open_max_calls=1)
+    breaker.record_failure()
+    _cool_down(breaker)
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker('t', failure_threshold=5, half_open_max_calls=1)
+    for _ in range(5):
+        breaker.record_failure()
+    _cool_down(breaker)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow_request()
+
+
+def test_cancelled_probe_gives_its_slot_back():
+    breaker = CircuitBreaker('t', failure_threshold=1, half_open_max_calls=1)
+    breaker.record_failure()
+    _cool_down(breaker)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+@pytest.mark.anyio
+async def test_open_circuit_fails_fast_without_calling_upstream(mock_upstream):
+    calls = mock_upstream(lambda request: httpx.Response(503))
+    service = UpstreamService('breaker_test', '/api/v1/test')
+    breaker = circuit_breakers.get('breaker_test:POST /send')
+
+    for _ in range(breaker.failure_threshold):
+        response = await service.send('POST', '/send', policy=WRITE)
+        assert response.status_code == 503
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as raised:
+        await service.send('POST', '/send', policy=WRITE)
+    assert raised.value.status_code == 503
+    assert int(raised.value.headers['Retry-After']) >= 1
+    assert len(calls) == breaker.failure_threshold
+
+
+@pytest.mark.anyio
+async def test_4xx_does_not_count_as_a_failure(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(404))
+    service = UpstreamService('breaker_test', '/api/v1/test')
+    breaker = circuit_breakers.get('breaker_test:POST /send')
+
+    for _ in range(breaker.failure_threshold + 1):
+        await service.send('POST', '/send', policy=WRITE)
+    assert breaker.state == CLOSED
@@ -0,0 +1,127 @@
+import gzip
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.responses import Response, StreamingResponse
+
+from routers import compression
+from routers.cache import CachedResponse
+from routers.compression import (
+    SUPPORTED_ENCODINGS,
+    CompressionMiddleware,
+    choose_encoding,
+    compression_stats,
+    parse_accept_encoding,
+)
+from routers.serialization import FastJSONResponse
+
+MIN_SIZE = 100
+LARGE = {"items": [{"id": i, "name": f"item-{i}"} for i in range(50)]}
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(compression, 'COMPRESSION_ENABLED', True)
+    app = FastAPI()
+    cached = CachedResponse(200, FastJSONResponse(LARGE).body, {'content-type': 'application/json'})
+
+    @app.get('/large')
+    async def large():
+        return FastJSONResponse(LARGE)
+
+    @app.get('/small')
+    async def small():
+        return FastJSONResponse({"ok": True})
+
+    @app.get('/events')
+    async def events():
+        return StreamingResponse(iter([b'data: x\n\n' * 50]), media_type='text/event-stream')
+
+    @app.get('/encoded')
+    async def encoded():
+        # e.g. upstream bytes relayed still compressed
+        return Response(gzip.compress(b'x' * 500), media_type='text/plain', headers={'content-encoding': 'gzip'})
+
+    @app.get('/cached')
+    async def replay():
+        return cached.to_response()
+
+    app.add_middleware(CompressionMiddleware, minimum_size=MIN_SIZE)
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as c:
+        yield c
+
+
+def test_accept_encoding_negotiation():
+    assert parse_accept_encoding('gzip, br;q=0') == {'gzip'}
+    assert parse_accept_encoding('identity;q=1, *;q=0.5, gzip;q=0') == {'identity', '*'} | (set(SUPPORTED_ENCODINGS) - {'gzip'})
+    assert choose_encoding(parse_accept_encoding('GZIP;q=0.5, br')) == SUPPORTED_ENCODINGS[0]
+    assert choose_encoding(parse_accept_encoding('deflate')) is None
+
+
+@pytest.mark.anyio
+async def test_large_json_is_gzipped(client):
+    response = await client.get('/large', headers=GZIP)
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert int(response.headers['content-length']) < len(FastJSONResponse(LARGE).body)
+    assert response.json() == LARGE
+
+
+@pytest.mark.anyio
+async def test_responses_are_left_alone_when_not_worth_compressing(client):
+    assert 'content-encoding' not in (await client.get('/large', headers={'Accept-Encoding': 'identity'})).headers
+    assert 'content-encoding' not in (await client.get('/small', headers=GZIP)).headers
+    assert 'content-encoding' not in (await client.get('/events', headers=GZIP)).headers
+
+
+@pytest.mark.anyio
+async def test_already_encoded_bodies_are_not_compressed_twice(client):
+    response = await client.get('/encoded', headers=GZIP)
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.text == 'x' * 500
+
+
+@pytest.mark.anyio
+async def test_streams_are_flushed_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(compression, 'COMPRESSION_ENABLED', True)
+    lines = [f'{{"line":{i},"pad":"{"x" * MIN_SIZE}"}}\n'.encode() for i in range(3)]
+
+    async def ndjson(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")]})
+        for i, line in enumerate(lines):
+            await send({"type": "http.response.body", "body": line, "more_body": i < len(lines) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(ndjson, minimum_size=MIN_SIZE)(scope, None, send)
+
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+    decoder = zlib.decompressobj(31)
+    # Each line decodes as soon as its chunk arrives, not at the end of the stream
+    assert [decoder.decompress(message["body"]) for message in sent[1:]] == lines
+
+
+@pytest.mark.anyio
+async def test_cached_responses_are_compressed_once(client, monkeypatch):
+    monkeypatch.setattr(compression_stats, 'cached_compressions', 0)
+    monkeypatch.setattr(compression_stats, 'cached_reuses', 0)
+
+    for _ in range(3):
+        response = await client.get('/cached', headers=GZIP)
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.json() == LARGE
+    assert compression_stats.cached_compressions == 1
+    assert compression_stats.cached_reuses == 2
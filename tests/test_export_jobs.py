@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+
+EXPORT = '/api/v1/delete-account/export'
+
+
+@pytest.fixture
+async def client():
+    import server
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url='http://test') as c:
+        yield c
+
+
+def _auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+class _GatedExport:
+    """Upstream export that completes once release() is called."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    async def __call__(self, request):
+        await self.gate.wait()
+        return httpx.Response(200, json={
+            'success': True,
+            'message': 'ready',
+            'download_url': 'https://example.com/export.zip',
+            'expires_at': '2030-01-01T00:00:00Z',
+        })
+
+    def release(self):
+        self.gate.set()
+
+
+async def _wait_for(client, job_id, token, status):
+    for _ in range(100):
+        response = await client.get(f'{EXPORT}/jobs/{job_id}', headers=_auth(token))
+        if response.json()['status'] == status:
+            return response.json()
+        await asyncio.sleep(0.01)
+    raise AssertionError(f'job never reached {status}')
+
+
+@pytest.mark.anyio
+async def test_background_export_runs_as_a_job(mock_upstream, client):
+    upstream = _GatedExport()
+    calls = mock_upstream(upstream)
+
+    started = await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))
+    assert started.status_code == 200
+    job_id = started.json()['job_id']
+    assert (await client.get(f'{EXPORT}/jobs/{job_id}', headers=_auth('owner'))).json()['status'] in ('pending', 'running')
+
+    upstream.release()
+    job = await _wait_for(client, job_id, 'owner', 'completed')
+    assert job['download_url'] == 'https://example.com/export.zip'
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_an_export_in_progress_is_reused(mock_upstream, client):
+    upstream = _GatedExport()
+    calls = mock_upstream(upstream)
+
+    first = await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))
+    second = await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))
+    assert first.json()['job_id'] == second.json()['job_id']
+
+    upstream.release()
+    await _wait_for(client, first.json()['job_id'], 'owner', 'completed')
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_other_users_cannot_see_a_job(mock_upstream, client):
+    upstream = _GatedExport()
+    mock_upstream(upstream)
+
+    job_id = (await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))).json()['job_id']
+
+    for path in (f'{EXPORT}/jobs/{job_id}', f'{EXPORT}/jobs/{job_id}/events'):
+        response = await client.get(path, headers=_auth('someone-else'))
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'Export job not found'
+    assert (await client.get(f'{EXPORT}/jobs/{job_id}')).status_code == 401
+
+    upstream.release()
+    await _wait_for(client, job_id, 'owner', 'completed')
+
+
+@pytest.mark.anyio
+async def test_failed_export_reports_the_upstream_error(mock_upstream, client):
+    mock_upstream(lambda request: httpx.Response(403, json={'detail': 'Export not allowed'}))
+
+    job_id = (await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))).json()['job_id']
+    job = await _wait_for(client, job_id, 'owner', 'failed')
+    assert job['error'] == 'Export not allowed'
+
+
+@pytest.mark.anyio
+async def test_events_stream_ends_with_the_result(mock_upstream, client):
+    upstream = _GatedExport()
+    mock_upstream(upstream)
+
+    job_id = (await client.post(EXPORT, params={'background': 'true'}, headers=_auth('owner'))).json()['job_id']
+    upstream.release()
+    response = await client.get(f'{EXPORT}/jobs/{job_id}/events', headers=_auth('owner'))
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = [line for line in response.text.splitlines() if line.startswith('event: ')]
+    assert events[-1] == 'event: completed'
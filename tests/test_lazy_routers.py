@@ -0,0 +1,85 @@
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routers import lazy
+from routers.lazy import LazyRouterMiddleware, LazyRouters, loaded
+
+ROUTER_SOURCE = '''
+from fastapi import APIRouter
+
+router = APIRouter(prefix="/reports")
+
+
+@router.get("/{report_id}")
+async def get_report(report_id: str):
+    return {"id": report_id}
+'''
+
+
+@pytest.fixture
+def package(monkeypatch, tmp_path):
+    """A throwaway router package, so importing it can be observed."""
+    root = tmp_path / 'lazy_test_routers'
+    root.mkdir()
+    (root / '__init__.py').write_text('')
+    (root / 'reports.py').write_text(ROUTER_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(lazy, 'PACKAGE', 'lazy_test_routers')
+    yield
+    for name in [name for name in sys.modules if name.startswith('lazy_test_routers')]:
+        del sys.modules[name]
+
+
+@pytest.fixture
+def app(package):
+    app = FastAPI()
+
+    def mount(module):
+        app.include_router(module.router, prefix="/api/v1")
+        app.openapi_schema = None
+
+    app.state.routers = LazyRouters(mount)
+    app.state.routers.add('reports', '/api/v1/reports')
+    app.add_middleware(LazyRouterMiddleware, routers=app.state.routers, schema_paths=[app.openapi_url])
+    return app
+
+
+async def _get(app, path):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        return await client.get(path)
+
+
+@pytest.mark.anyio
+async def test_router_is_imported_on_its_first_request(app):
+    assert loaded('reports') is None
+    assert (await _get(app, '/api/health')).status_code == 404
+    assert loaded('reports') is None
+
+    response = await _get(app, '/api/v1/reports/r1')
+    assert response.status_code == 200
+    assert response.json() == {'id': 'r1'}
+    assert loaded('reports') is not None
+    assert app.state.routers.stats()['pending'] == []
+    assert 'reports' in app.state.routers.stats()['load_ms']
+
+
+@pytest.mark.anyio
+async def test_only_whole_path_segments_match_the_prefix(app):
+    await _get(app, '/api/v1/reportsarchive')
+    assert loaded('reports') is None
+
+
+@pytest.mark.anyio
+async def test_openapi_schema_loads_every_pending_router(app):
+    schema = (await _get(app, '/openapi.json')).json()
+    assert '/api/v1/reports/{report_id}' in schema['paths']
+
+
+def test_require_mounts_a_pending_router_once(app):
+    routers = app.state.routers
+    module = routers.require('reports')
+    assert routers.require('reports') is module
+    assert sum(getattr(route, 'path', '') == '/api/v1/reports/{report_id}' for route in app.routes) == 1
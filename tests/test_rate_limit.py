@@ -0,0 +1,156 @@
+import types
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from routers import rate_limit, state
+from routers.rate_limit import Limit, RateLimitedError, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive bucket refills in the memory backend without sleeping."""
+    fake = FakeClock()
+    monkeypatch.setattr(state, 'time', types.SimpleNamespace(monotonic=fake.monotonic, time=fake.monotonic))
+    return fake
+
+
+INGRESS = '10.0.0.1'
+
+
+def _raw_request(peer, headers=()):
+    return Request({
+        'type': 'http',
+        'headers': [(name.encode(), value.encode()) for name, value in headers],
+        'client': (peer, 50000),
+    })
+
+
+def _request(ip='203.0.113.7'):
+    """A request from `ip` arriving through the ingress."""
+    return _raw_request(INGRESS, headers=[('x-forwarded-for', ip)])
+
+
+@pytest.mark.anyio
+async def test_bucket_rejects_when_empty_and_refills(monkeypatch, clock):
+    # 2 calls of burst, refilled at one per second
+    monkeypatch.setattr(rate_limit, 'IP_LIMIT', Limit(2, 60))
+    limiter = RateLimiter()
+
+    await limiter.check(_request(), 'login')
+    await limiter.check(_request(), 'login')
+    with pytest.raises(RateLimitedError) as raised:
+        await limiter.check(_request(), 'login')
+    assert raised.value.status_code == 429
+    assert raised.value.headers['Retry-After'] == '1'
+
+    clock.now += 1.0
+    await limiter.check(_request(), 'login')
+    with pytest.raises(RateLimitedError):
+        await limiter.check(_request(), 'login')
+
+    assert limiter.stats()['allowed'] == 3
+    assert limiter.stats()['rejected_by_endpoint'] == {'login': 2}
+
+
+@pytest.mark.anyio
+async def test_buckets_are_per_ip_and_per_endpoint(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, 'IP_LIMIT', Limit(1, 60))
+    limiter = RateLimiter()
+
+    await limiter.check(_request('203.0.113.7'), 'login')
+    await limiter.check(_request('203.0.113.8'), 'login')
+    await limiter.check(_request('203.0.113.7'), 'register')
+    with pytest.raises(RateLimitedError):
+        await limiter.check(_request('203.0.113.7'), 'login')
+
+
+@pytest.mark.anyio
+async def test_email_bucket_limits_one_source(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, 'EMAIL_LIMIT', Limit(2, 1))
+    limiter = RateLimiter()
+
+    for _ in range(2):
+        await limiter.check(_request('203.0.113.1'), 'email_otp_start', email='Ayse@Example.com')
+    with pytest.raises(RateLimitedError) as raised:
+        await limiter.check(_request('203.0.113.1'), 'email_otp_start', email='ayse@example.com ')
+    # One token per minute
+    assert int(raised.value.headers['Retry-After']) == 60
+
+
+@pytest.mark.anyio
+async def test_others_cannot_lock_an_email_out(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, 'EMAIL_LIMIT', Limit(2, 1))
+    limiter = RateLimiter()
+
+    for _ in range(2):
+        await limiter.check(_request('198.51.100.66'), 'login', email='ayse@example.com')
+    with pytest.raises(RateLimitedError):
+        await limiter.check(_request('198.51.100.66'), 'login', email='ayse@example.com')
+    # The owner, from their own address, is unaffected
+    await limiter.check(_request('203.0.113.1'), 'login', email='ayse@example.com')
+
+
+def test_client_ip_is_the_hop_added_by_trusted_proxies(monkeypatch):
+    spoofed = _raw_request(INGRESS, headers=[('x-forwarded-for', '1.2.3.4, 198.51.100.1')])
+
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    assert rate_limit.client_ip(spoofed) == '198.51.100.1'
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', 2)
+    assert rate_limit.client_ip(spoofed) == '1.2.3.4'
+
+
+def test_client_ip_without_forwarded_for_behind_a_proxy_is_unknown(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    assert rate_limit.client_ip(_raw_request(INGRESS)) is None
+
+
+def test_client_ip_without_proxies_is_the_peer(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+    request = _raw_request('198.51.100.1', headers=[('x-forwarded-for', '1.2.3.4')])
+    assert rate_limit.client_ip(request) == '198.51.100.1'
+
+
+@pytest.mark.anyio
+async def test_ip_bucket_is_skipped_when_the_client_ip_is_unknown(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    monkeypatch.setattr(rate_limit, 'IP_LIMIT', Limit(1, 1))
+    limiter = RateLimiter()
+
+    # Every caller would otherwise share the ingress address
+    for _ in range(3):
+        await limiter.check(_raw_request(INGRESS), 'login')
+    assert limiter.stats()['rejected'] == 0
+
+
+@pytest.mark.anyio
+async def test_login_gets_429_before_reaching_upstream(monkeypatch, mock_upstream):
+    import server
+
+    # The routers hold the singleton; give it an empty store of its own
+    fresh = state.MemoryStateBackend()
+    monkeypatch.setattr(rate_limit.rate_limiter, 'local', fresh)
+    monkeypatch.setattr(rate_limit.rate_limiter, 'backend', fresh)
+    monkeypatch.setattr(rate_limit, 'IP_LIMIT', Limit(2, 1))
+    calls = mock_upstream(lambda request: httpx.Response(401, json={'detail': 'Invalid credentials'}))
+
+    transport = httpx.ASGITransport(app=server.app, client=(INGRESS, 50000))
+    headers = {'X-Forwarded-For': '203.0.113.9'}
+    async with httpx.AsyncClient(transport=transport, base_url='http://test', headers=headers) as client:
+        body = {'email': 'ayse@example.com', 'password': 'wrong password'}
+        statuses = [(await client.post('/api/v1/auth/login', json=body)).status_code for _ in range(2)]
+        limited = await client.post('/api/v1/auth/login', json=body)
+
+    assert statuses == [401, 401]
+    assert limited.status_code == 429
+    assert limited.headers['retry-after'] == '60'
+    assert len(calls) == 2
@@ -0,0 +1,70 @@
+import json
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from routers.serialization import FastJSONResponse, FastJSONRoute, dumps, dumps_bytes, loads
+
+PAYLOAD = {
+    "name": "Ayşe",
+    "tags": ["kış", "ceket"],
+    "nested": {"count": 3, "ok": True, "missing": None},
+    7: "non-string key",
+}
+
+
+def test_output_matches_the_standard_library():
+    expected = json.dumps(PAYLOAD, ensure_ascii=False, separators=(',', ':'))
+    assert dumps(PAYLOAD) == expected
+    assert dumps_bytes(PAYLOAD) == expected.encode('utf-8')
+    assert loads(expected) == json.loads(expected)
+    assert loads(expected.encode('utf-8')) == json.loads(expected)
+
+
+def test_response_body_matches_jsonresponse():
+    assert FastJSONResponse(PAYLOAD).body == JSONResponse(PAYLOAD).body
+
+
+def test_invalid_json_raises_the_standard_error():
+    with pytest.raises(json.JSONDecodeError):
+        loads(b'{"unterminated": ')
+
+
+class Item(BaseModel):
+    name: str
+    count: int
+
+
+@pytest.fixture
+async def client():
+    router = APIRouter(route_class=FastJSONRoute)
+
+    @router.post('/items')
+    async def create_item(item: Item):
+        return FastJSONResponse({"name": item.name, "count": item.count})
+
+    @router.post('/raw')
+    async def raw(request: Request):
+        return FastJSONResponse(await request.json())
+
+    app = FastAPI()
+    app.include_router(router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as c:
+        yield c
+
+
+@pytest.mark.anyio
+async def test_request_bodies_are_parsed_for_models_and_request_json(client):
+    body = {"name": "Ayşe", "count": 2}
+    assert (await client.post('/items', json=body)).json() == body
+    assert (await client.post('/raw', json=PAYLOAD)).json() == json.loads(dumps(PAYLOAD))
+
+
+@pytest.mark.anyio
+async def test_malformed_body_is_a_422(client):
+    response = await client.post('/items', content=b'{"name": ', headers={'content-type': 'application/json'})
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['type'] == 'json_invalid'
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from routers.proxy import UpstreamService
+from routers.singleflight import SingleFlight
+
+
+class _Gated:
+    """Calls that wait for release(), counting how many were made."""
+
+    def __init__(self, result='ok'):
+        self.gate = asyncio.Event()
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_with_one_key_share_a_call():
+    flights = SingleFlight()
+    call = _Gated()
+
+    waiters = [asyncio.ensure_future(flights.do('k', call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    call.gate.set()
+
+    assert await asyncio.gather(*waiters) == ['ok'] * 5
+    assert call.calls == 1
+    assert flights.stats()['coalesced'] == 4
+    assert len(flights) == 0
+
+
+@pytest.mark.anyio
+async def test_a_disconnecting_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    call = _Gated()
+
+    leaving = asyncio.ensure_future(flights.do('k', call))
+    staying = asyncio.ensure_future(flights.do('k', call))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await asyncio.sleep(0)
+    call.gate.set()
+
+    assert await staying == 'ok'
+    assert leaving.cancelled()
+    assert call.calls == 1
+
+
+@pytest.mark.anyio
+async def test_errors_reach_every_waiter_and_are_not_kept():
+    flights = SingleFlight()
+    call = _Gated(result=RuntimeError('boom'))
+
+    waiters = [asyncio.ensure_future(flights.do('k', call)) for _ in range(2)]
+    await asyncio.sleep(0)
+    call.gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # The next call after a failure goes upstream again
+    call.result = 'ok'
+    assert await flights.do('k', call) == 'ok'
+    assert call.calls == 2
+
+
+@pytest.mark.anyio
+async def test_fetch_shared_keys_on_route_and_token(mock_upstream):
+    gate = asyncio.Event()
+
+    async def upstream(request):
+        await gate.wait()
+        return httpx.Response(200, json={'token': request.headers['authorization']})
+
+    calls = mock_upstream(upstream)
+    service = UpstreamService('singleflight_test', '/api/v1/auth')
+
+    reads = [
+        asyncio.ensure_future(service.fetch_shared('GET', '/me', authorization=token, error_message='Failed'))
+        for token in ('Bearer A', 'Bearer A', 'Bearer A', 'Bearer B')
+    ]
+    await asyncio.sleep(0.01)
+    gate.set()
+    responses = await asyncio.gather(*reads)
+
+    assert len(calls) == 2
+    assert [r.body for r in responses[:3]] == [responses[0].body] * 3
+    assert responses[3].body != responses[0].body
+
+
+@pytest.mark.anyio
+async def test_fetch_shared_passes_upstream_errors_to_every_caller(mock_upstream):
+    calls = mock_upstream(lambda request: httpx.Response(404, json={'detail': 'Not found'}))
+    service = UpstreamService('singleflight_test', '/api/v1/auth')
+
+    results = await asyncio.gather(*(
+        service.fetch_shared('GET', '/me', authorization='Bearer A', error_message='Failed')
+        for _ in range(3)
+    ), return_exceptions=True)
+    assert all(isinstance(r, HTTPException) and r.status_code == 404 for r in results)
+    assert len(calls) == 1
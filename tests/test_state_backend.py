@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from routers import state
+from routers.state import MongoStateBackend, StateBackend
+
+
+class FakeDatetime:
+    """
+    Stands in for datetime in routers.state so TTLs pass without sleeping.
+    mongomock applies TTL indexes against the real clock, so it starts at
+    the real time and only moves ahead of it.
+    """
+
+    now = datetime.utcnow()
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    FakeDatetime.now = datetime.utcnow()
+    monkeypatch.setattr(state, 'datetime', FakeDatetime)
+    return FakeDatetime
+
+
+def _advance(clock, seconds):
+    clock.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+async def workers():
+    """Two workers' backends sharing one database."""
+    db = AsyncMongoMockClient()["styleadvisor_test"]
+    backends = [MongoStateBackend(db), MongoStateBackend(db)]
+    for backend in backends:
+        await backend.start()
+    return backends
+
+
+def test_backends_must_implement_the_interface():
+    class Partial(StateBackend):
+        async def get(self, namespace, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.anyio
+async def test_values_are_shared_and_expire(clock, workers):
+    a, b = workers
+    await a.set('ns', 'k', {'v': 1}, ttl=10)
+    assert await b.get('ns', 'k') == {'v': 1}
+    assert await b.get('other', 'k') is None
+
+    _advance(clock, 11)
+    # Expired even before the TTL monitor removes the document
+    assert await b.get('ns', 'k') is None
+
+    await a.set('ns', 'k', 2, ttl=10)
+    await b.delete('ns', 'k')
+    assert await a.get('ns', 'k') is None
+
+
+@pytest.mark.anyio
+async def test_add_succeeds_once_until_the_key_expires(clock, workers):
+    a, b = workers
+    assert await a.add('dedup', 'evt-1', ttl=60) is True
+    assert await b.add('dedup', 'evt-1', ttl=60) is False
+
+    _advance(clock, 61)
+    assert await b.add('dedup', 'evt-1', ttl=60) is True
+
+
+@pytest.mark.anyio
+async def test_token_bucket_is_shared_and_refills(clock, workers):
+    a, b = workers
+    # 2 tokens of burst, refilled at one every 2 seconds
+    assert await a.take_token('rl', 'ip', capacity=2, rate=0.5) == 0
+    assert await b.take_token('rl', 'ip', capacity=2, rate=0.5) == 0
+    assert await a.take_token('rl', 'ip', capacity=2, rate=0.5) == pytest.approx(2.0)
+
+    _advance(clock, 1)
+    assert await b.take_token('rl', 'ip', capacity=2, rate=0.5) == pytest.approx(1.0)
+    _advance(clock, 1)
+    assert await b.take_token('rl', 'ip', capacity=2, rate=0.5) == 0
+
+
+@pytest.mark.anyio
+async def test_broadcasts_reach_other_workers_once(clock, workers):
+    a, b = workers
+    # The first poll only starts listening
+    assert await b.poll('cache') == []
+
+    await a.publish('cache', {'tags': ['token:t1']})
+    assert await a.poll('cache') == []
+    assert await b.poll('cache') == [{'tags': ['token:t1']}]
+
+    # Later polls overlap in time but do not repeat the message
+    _advance(clock, 1)
+    assert await b.poll('cache') == []
+    assert b.stats()['received'] == 1
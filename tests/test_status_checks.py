@@ -0,0 +1,89 @@
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+async def status_db(monkeypatch):
+    import server
+
+    db = AsyncMongoMockClient()["styleadvisor_test"]
+    monkeypatch.setattr(server, 'db', db)
+    # Two checks share each timestamp, so pages must break ties on id
+    await db.status_checks.insert_many([
+        {"id": f"check-{i:02d}", "client_name": f"client-{i}", "timestamp": START + timedelta(seconds=i // 2)}
+        for i in reversed(range(7))
+    ])
+    return db
+
+
+@pytest.fixture
+async def client(status_db):
+    import server
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url='http://test') as c:
+        yield c
+
+
+async def _all_pages(client, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = {'limit': limit, **params, **({'cursor': cursor} if cursor else {})}
+        response = await client.get('/api/status', params=query)
+        assert response.status_code == 200
+        ids += [check['id'] for check in response.json()]
+        pages += 1
+        cursor = response.headers.get('x-next-cursor')
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.anyio
+async def test_cursor_pages_through_every_check_once(client):
+    ids, pages = await _all_pages(client, limit=2)
+    assert ids == [f"check-{i:02d}" for i in range(7)]
+    assert pages == 4
+
+
+@pytest.mark.anyio
+async def test_checks_added_behind_the_cursor_do_not_shift_pages(client, status_db):
+    first = await client.get('/api/status', params={'limit': 3})
+    await status_db.status_checks.insert_one({"id": "check-00a", "client_name": "late", "timestamp": START})
+
+    rest = await client.get('/api/status', params={'limit': 10, 'cursor': first.headers['x-next-cursor']})
+    assert [check['id'] for check in rest.json()] == [f"check-{i:02d}" for i in range(3, 7)]
+
+
+@pytest.mark.anyio
+async def test_fields_selects_the_returned_keys(client):
+    response = await client.get('/api/status', params={'limit': 2, 'fields': 'client_name'})
+    assert response.json() == [{"client_name": "client-0"}, {"client_name": "client-1"}]
+    # The cursor still works without id/timestamp in the body
+    rest = await client.get('/api/status', params={'cursor': response.headers['x-next-cursor'], 'fields': 'id'})
+    assert rest.json()[0] == {"id": "check-02"}
+
+
+@pytest.mark.anyio
+async def test_unknown_fields_and_bad_cursors_are_rejected(client):
+    assert (await client.get('/api/status', params={'fields': 'password'})).status_code == 400
+    assert (await client.get('/api/status', params={'cursor': 'not-a-cursor'})).status_code == 400
+
+
+@pytest.mark.anyio
+async def test_ndjson_streams_everything_after_the_cursor(client):
+    first = await client.get('/api/status', params={'limit': 5})
+    response = await client.get('/api/status', params={
+        'format': 'ndjson', 'cursor': first.headers['x-next-cursor'], 'fields': 'id,timestamp',
+    })
+
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        {"id": "check-05", "timestamp": (START + timedelta(seconds=2)).isoformat()},
+        {"id": "check-06", "timestamp": (START + timedelta(seconds=3)).isoformat()},
+    ]
@@ -0,0 +1,108 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routers import tracing
+from routers.proxy import UpstreamService
+from routers.tracing import TracingMiddleware, parse_traceparent
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture
+def traced(monkeypatch, tmp_path):
+    """Tracing on, with spans exported to a file of their own."""
+    monkeypatch.setattr(tracing, 'TRACING_ENABLED', True)
+    monkeypatch.setattr(tracing, 'TRACING_SAMPLE_RATE', 1.0)
+    exporter = tracing.FileSpanExporter(str(tmp_path / 'spans.jsonl'))
+    monkeypatch.setattr(tracing, 'span_exporter', exporter)
+    return exporter
+
+
+@pytest.fixture
+async def client(traced):
+    app = FastAPI()
+    service = UpstreamService('tracing_test', '/api/v1/auth')
+
+    @app.get('/me')
+    async def me():
+        entry = await service.fetch('GET', '/me', error_message='Failed')
+        return entry.to_response()
+
+    app.add_middleware(TracingMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as c:
+        yield c
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01') == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f' 00-{TRACE_ID.upper()}-{PARENT_ID}-00 ') == (TRACE_ID, PARENT_ID, False)
+
+    for invalid in (
+        None,
+        '',
+        f'01-{TRACE_ID}-{PARENT_ID}-01',
+        f'00-{"0" * 32}-{PARENT_ID}-01',
+        f'00-{TRACE_ID}-{"0" * 16}-01',
+        f'00-{TRACE_ID[:-1]}-{PARENT_ID}-01',
+    ):
+        assert parse_traceparent(invalid) is None
+
+
+@pytest.mark.anyio
+async def test_incoming_trace_is_continued_upstream_and_reported_back(mock_upstream, client):
+    calls = mock_upstream(lambda request: httpx.Response(200, json={'id': 'u1'}))
+
+    response = await client.get('/me', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+    assert response.status_code == 200
+
+    root_trace, root_span, sampled = parse_traceparent(response.headers['traceresponse'])
+    assert root_trace == TRACE_ID
+    assert root_span != PARENT_ID
+    assert sampled
+
+    upstream_trace, upstream_parent, _ = parse_traceparent(calls[0].headers['traceparent'])
+    assert upstream_trace == TRACE_ID
+    assert upstream_parent not in (PARENT_ID, root_span)
+
+
+@pytest.mark.anyio
+async def test_invalid_traceparent_starts_a_new_trace(mock_upstream, client):
+    calls = mock_upstream(lambda request: httpx.Response(200, json={'id': 'u1'}))
+
+    response = await client.get('/me', headers={'traceparent': 'not-a-traceparent'})
+
+    trace_id, _, _ = parse_traceparent(response.headers['traceresponse'])
+    assert trace_id != TRACE_ID
+    assert parse_traceparent(calls[0].headers['traceparent'])[0] == trace_id
+
+
+@pytest.mark.anyio
+async def test_sampled_spans_are_exported_as_json_lines(mock_upstream, client, traced):
+    mock_upstream(lambda request: httpx.Response(200, json={'id': 'u1'}))
+
+    await client.get('/me', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+    traced.flush()
+
+    with open(traced.path, encoding='utf-8') as f:
+        spans = [json.loads(line) for line in f]
+    assert {span['trace_id'] for span in spans} == {TRACE_ID}
+    root = next(span for span in spans if span['parent_span_id'] == PARENT_ID)
+    assert root['name'] == 'GET /me'
+    assert root['attributes']['http.status_code'] == 200
+    assert any(span['name'].startswith('upstream tracing_test') for span in spans)
+
+
+@pytest.mark.anyio
+async def test_unsampled_traces_are_propagated_but_not_exported(mock_upstream, client, traced):
+    calls = mock_upstream(lambda request: httpx.Response(200, json={'id': 'u1'}))
+
+    response = await client.get('/me', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-00'})
+    traced.flush()
+
+    assert response.headers['traceresponse'].endswith('-00')
+    assert calls[0].headers['traceparent'].endswith('-00')
+    assert traced.stats()['exported'] == 0
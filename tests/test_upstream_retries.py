@@ -0,0 +1,100 @@
+import httpx
+import pytest
+
+from routers import proxy
+from routers.policies import EXPORT, EXPORT_JOB, POLL, READ, WRITE, RetryBudget
+from routers.proxy import UpstreamService, UpstreamUnavailableError
+
+
+@pytest.fixture
+def service():
+    return UpstreamService('retry_test', '/api/v1/test')
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """A fresh, full retry budget, so earlier tests cannot have drained it."""
+    fresh = RetryBudget(ratio=0.1, min_per_second=1.0)
+    monkeypatch.setattr(proxy, 'retry_budget', fresh)
+    return fresh
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('method, policy', [
+    ('GET', READ),
+    ('GET', POLL),
+    ('POST', WRITE),
+    ('POST', EXPORT),
+    ('POST', EXPORT_JOB),
+])
+async def test_retryable_status_is_retried_up_to_the_policy_limit(
+    mock_upstream, no_backoff, budget, service, method, policy
+):
+    calls = mock_upstream(lambda request: httpx.Response(503))
+    response = await service.send(method, '/resource', policy=policy)
+    assert response.status_code == 503
+    assert len(calls) == 1 + policy.max_retries
+
+
+def test_writes_and_exports_are_never_retried():
+    assert WRITE.max_retries == 0
+    assert EXPORT.max_retries == 0
+    assert EXPORT_JOB.max_retries == 0
+    assert READ.max_retries > 0
+
+
+@pytest.mark.anyio
+async def test_retry_succeeds_on_a_later_attempt(mock_upstream, no_backoff, budget, service):
+    statuses = iter([502, 200])
+    calls = mock_upstream(lambda request: httpx.Response(next(statuses), json={'ok': True}))
+    response = await service.send('GET', '/resource', policy=READ)
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_non_retryable_status_is_returned_at_once(mock_upstream, no_backoff, budget, service):
+    calls = mock_upstream(lambda request: httpx.Response(500))
+    response = await service.send('GET', '/resource', policy=READ)
+    assert response.status_code == 500
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_connection_errors_retry_then_raise_503(mock_upstream, no_backoff, budget, service):
+    def refuse(request):
+        raise httpx.ConnectError('connection refused', request=request)
+
+    calls = mock_upstream(refuse)
+    with pytest.raises(UpstreamUnavailableError) as raised:
+        await service.send('GET', '/resource', policy=READ)
+    assert raised.value.status_code == 503
+    assert len(calls) == 1 + READ.max_retries
+
+
+@pytest.mark.anyio
+async def test_write_connection_error_is_not_retried(mock_upstream, no_backoff, budget, service):
+    def refuse(request):
+        raise httpx.ConnectError('connection refused', request=request)
+
+    calls = mock_upstream(refuse)
+    with pytest.raises(UpstreamUnavailableError):
+        await service.send('POST', '/resource', policy=WRITE)
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_exhausted_budget_stops_retries(mock_upstream, no_backoff, monkeypatch, service):
+    empty = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=0.0)
+    monkeypatch.setattr(proxy, 'retry_budget', empty)
+    calls = mock_upstream(lambda request: httpx.Response(503))
+
+    response = await service.send('GET', '/resource', policy=READ)
+    assert response.status_code == 503
+    assert len(calls) == 1
+    assert empty.exhausted == 1
+
+
+def test_backoff_is_capped():
+    for attempt in range(1, 10):
+        assert 0 <= READ.backoff(attempt) <= READ.backoff_max
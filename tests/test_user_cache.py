@@ -0,0 +1,181 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from routers.cache import (
+    CacheInvalidationSync,
+    TTLCache,
+    hash_token,
+    invalidate_token,
+    invalidate_user,
+    link_user_token,
+    token_tag,
+    user_cache,
+)
+from routers.proxy import UpstreamService
+from routers.state import MongoStateBackend
+
+
+def test_entries_expire_and_evict_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.evictions == 1
+
+    expired = TTLCache(max_entries=2, ttl_seconds=0)
+    expired.set('a', 1)
+    assert expired.get('a') is None
+
+
+def test_invalidate_tag_follows_links():
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    cache.set('me', 1, tags=('token:t1',))
+    cache.set('status', 2, tags=('token:t1',))
+    cache.set('other', 3, tags=('token:t2',))
+    cache.link('user:u1', 'token:t1')
+
+    assert cache.invalidate_tag('user:u1') == 2
+    assert cache.get('me') is None
+    assert cache.get('other') == 3
+
+
+def test_fill_is_dropped_when_its_tag_is_invalidated():
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    fill = cache.begin_fill(('token:t1',))
+    cache.invalidate_tag('token:t1')
+    cache.set('me', 'stale', tags=('token:t1',), fill=fill)
+    assert cache.get('me') is None
+    assert cache._fills == {}
+
+
+def test_fill_survives_unrelated_invalidations():
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    fill = cache.begin_fill(('token:t1',))
+    cache.invalidate_tag('token:t2')
+    cache.invalidate_tag('user:someone-else')
+    cache.set('me', 'fresh', tags=('token:t1',), fill=fill)
+    assert cache.get('me') == 'fresh'
+
+
+def test_clear_voids_fills_in_flight():
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    fill = cache.begin_fill(('token:t1',))
+    cache.clear()
+    cache.set('me', 'stale', tags=('token:t1',), fill=fill)
+    assert cache.get('me') is None
+
+
+class _GatedUpstream:
+    """Upstream whose responses are held until release() is called."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.served = 0
+
+    async def __call__(self, request):
+        await self.gate.wait()
+        self.served += 1
+        return httpx.Response(200, json={'id': 'u1', 'version': self.served})
+
+    def release(self):
+        self.gate.set()
+
+
+async def _read_me(service, authorization):
+    return await service.relay_cached(
+        user_cache, 'GET', '/me',
+        authorization=authorization,
+        error_message='Failed to get user',
+    )
+
+
+@pytest.mark.anyio
+async def test_write_during_an_in_flight_read_keeps_it_out_of_the_cache(mock_upstream):
+    upstream = _GatedUpstream()
+    calls = mock_upstream(upstream)
+    service = UpstreamService('cache_test', '/api/v1/auth')
+
+    read = asyncio.ensure_future(_read_me(service, 'Bearer A'))
+    await asyncio.sleep(0.01)
+    invalidate_token('Bearer A')
+    upstream.release()
+    await read
+
+    assert len(user_cache) == 0
+    await _read_me(service, 'Bearer A')
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_other_users_writes_do_not_void_an_in_flight_read(mock_upstream):
+    upstream = _GatedUpstream()
+    calls = mock_upstream(upstream)
+    service = UpstreamService('cache_test', '/api/v1/auth')
+
+    read = asyncio.ensure_future(_read_me(service, 'Bearer A'))
+    await asyncio.sleep(0.01)
+    invalidate_token('Bearer B')
+    invalidate_user('someone-else')
+    upstream.release()
+    await read
+
+    assert len(user_cache) == 1
+    await _read_me(service, 'Bearer A')
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_user_invalidation_reaches_linked_in_flight_read(mock_upstream):
+    upstream = _GatedUpstream()
+    mock_upstream(upstream)
+    service = UpstreamService('cache_test', '/api/v1/auth')
+    link_user_token('u1', 'Bearer A')
+
+    read = asyncio.ensure_future(_read_me(service, 'Bearer A'))
+    await asyncio.sleep(0.01)
+    invalidate_user('u1')
+    upstream.release()
+    await read
+
+    assert len(user_cache) == 0
+
+
+@pytest.mark.anyio
+async def test_failed_read_releases_its_fill(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(500, json={'detail': 'boom'}))
+    service = UpstreamService('cache_test', '/api/v1/auth')
+
+    with pytest.raises(HTTPException):
+        await _read_me(service, 'Bearer A')
+    assert token_tag(hash_token('Bearer A')) not in user_cache._fills
+
+
+@pytest.mark.anyio
+async def test_links_reach_workers_that_cached_the_token():
+    db = AsyncMongoMockClient()["styleadvisor_test"]
+    linking, caching = TTLCache(10, 60), TTLCache(10, 60)
+    syncs = [CacheInvalidationSync(cache, interval=60) for cache in (linking, caching)]
+    for sync in syncs:
+        await sync.start(MongoStateBackend(db))
+    try:
+        # /premium/customer-info on one worker, GET /premium/status cached on another
+        linking.link('user:u1', 'token:t1')
+        caching.set('status', 1, tags=('token:t1',))
+        for sync in syncs:
+            await sync.sync()
+
+        # A webhook for the user, handled by the first worker
+        linking.invalidate_tag('user:u1')
+        for sync in syncs:
+            await sync.sync()
+        assert caching.get('status') is None
+    finally:
+        for sync in syncs:
+            await sync.stop()
@@ -0,0 +1,36 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from routers.state import MemoryStateBackend, MongoStateBackend
+from routers.webhook_dedup import WebhookDeduplicator, webhook_dedup
+
+
+@pytest.mark.anyio
+async def test_dedup_stays_shared_with_per_worker_state(monkeypatch):
+    import server
+
+    store = MongoStateBackend(AsyncMongoMockClient()["styleadvisor_test"])
+    monkeypatch.setattr(server, 'state_backend', MemoryStateBackend())
+    monkeypatch.setattr(server, 'webhook_dedup_store', store)
+    monkeypatch.setattr(webhook_dedup, 'store', None)
+
+    await server.start_webhook_dedup()
+    assert webhook_dedup.store is store
+
+    # A redelivery reaching another worker is still caught
+    other_worker = WebhookDeduplicator()
+    other_worker.use_backend(store)
+    assert await webhook_dedup.mark_seen('evt-1') is False
+    assert await other_worker.mark_seen('evt-1') is True
+
+
+@pytest.mark.anyio
+async def test_dedup_uses_the_state_backend_when_it_is_shared(monkeypatch):
+    import server
+
+    shared = MongoStateBackend(AsyncMongoMockClient()["styleadvisor_test"])
+    monkeypatch.setattr(server, 'state_backend', shared)
+    monkeypatch.setattr(webhook_dedup, 'store', None)
+
+    await server.start_webhook_dedup()
+    assert webhook_dedup.store is shared
@@ -0,0 +1,220 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from routers import webhook_queue
+from routers.webhook_queue import DELIVERED, DONE, FAILED, PENDING, PROCESSING, REJECTED, RETRY, WebhookQueue
+
+
+class Recorder:
+    """deliver() callback returning scripted outcomes per (user, n)."""
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}
+        self.delivered = []
+
+    async def __call__(self, doc):
+        body = doc["body"]
+        outcome = self.outcomes.get((body["user"], body["n"]), DELIVERED)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == DELIVERED:
+            self.delivered.append((body["user"], body["n"]))
+        return outcome
+
+
+def _queue(deliver, workers=1):
+    queue = WebhookQueue(deliver, workers=workers)
+    queue.collection = AsyncMongoMockClient()["styleadvisor_test"]["webhook_queue"]
+    return queue
+
+
+async def _enqueue(queue, user, n):
+    return await queue.enqueue("revenuecat", {"user": user, "n": n}, None, user)
+
+
+async def _status(queue, doc_id):
+    return await queue.collection.find_one({"_id": doc_id})
+
+
+async def _make_due(queue, doc_id):
+    await queue.collection.update_one({"_id": doc_id}, {"$set": {"available_at": datetime.utcnow()}})
+
+
+@pytest.mark.anyio
+async def test_events_are_delivered_in_order_per_user():
+    deliver = Recorder()
+    queue = _queue(deliver)
+    for n in range(3):
+        await _enqueue(queue, "a", n)
+        await _enqueue(queue, "b", n)
+
+    assert await queue._drain_batch(0) == 6
+    assert [n for user, n in deliver.delivered if user == "a"] == [0, 1, 2]
+    assert [n for user, n in deliver.delivered if user == "b"] == [0, 1, 2]
+    assert await queue.collection.count_documents({"status": DONE}) == 6
+
+
+@pytest.mark.anyio
+async def test_retry_holds_back_only_that_users_later_events():
+    deliver = Recorder({("a", 0): RETRY})
+    queue = _queue(deliver)
+    first = await _enqueue(queue, "a", 0)
+    await _enqueue(queue, "a", 1)
+    for n in range(2):
+        await _enqueue(queue, "b", n)
+
+    assert await queue._drain_batch(0) == 2
+    assert deliver.delivered == [("b", 0), ("b", 1)]
+    doc = await _status(queue, first)
+    assert doc["status"] == PENDING
+    assert doc["attempts"] == 1
+    assert doc["available_at"] > datetime.utcnow()
+
+    # Still backing off: nothing for "a" is delivered, even the later event
+    assert await queue._drain_batch(0) == 0
+
+    deliver.outcomes.clear()
+    await _make_due(queue, first)
+    assert await queue._drain_batch(0) == 2
+    assert deliver.delivered[2:] == [("a", 0), ("a", 1)]
+    assert queue.stats()["retried"] == 1
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(webhook_queue, "WEBHOOK_QUEUE_MAX_ATTEMPTS", 2)
+    deliver = Recorder({("a", 0): RETRY})
+    queue = _queue(deliver)
+    doc_id = await _enqueue(queue, "a", 0)
+
+    await queue._drain_batch(0)
+    await _make_due(queue, doc_id)
+    await queue._drain_batch(0)
+
+    doc = await _status(queue, doc_id)
+    assert doc["status"] == FAILED
+    assert doc["attempts"] == 2
+    assert queue.stats()["failed"] == 1
+
+
+@pytest.mark.anyio
+async def test_rejected_event_fails_at_once_and_unblocks_the_user():
+    deliver = Recorder({("a", 0): REJECTED})
+    queue = _queue(deliver)
+    rejected = await _enqueue(queue, "a", 0)
+    await _enqueue(queue, "a", 1)
+
+    await queue._drain_batch(0)
+    assert (await _status(queue, rejected))["status"] == FAILED
+    assert await queue._drain_batch(0) == 1
+    assert deliver.delivered == [("a", 1)]
+
+
+@pytest.mark.anyio
+async def test_delivery_exception_reschedules_instead_of_sticking():
+    deliver = Recorder({("a", 0): RuntimeError("boom")})
+    queue = _queue(deliver)
+    doc_id = await _enqueue(queue, "a", 0)
+    await _enqueue(queue, "b", 0)
+
+    assert await queue._drain_batch(0) == 1
+    doc = await _status(queue, doc_id)
+    assert doc["status"] == PENDING
+    assert doc["attempts"] == 1
+
+
+@pytest.mark.anyio
+async def test_expired_leases_are_recovered_while_running():
+    deliver = Recorder()
+    queue = _queue(deliver)
+    doc_id = await _enqueue(queue, "a", 0)
+    await queue.collection.update_one({"_id": doc_id}, {"$set": {
+        "status": PROCESSING,
+        "lease_until": datetime.utcnow() - timedelta(seconds=1),
+    }})
+
+    # A leased event blocks its user until the lease is reclaimed
+    assert await queue._drain_batch(0) == 0
+    await queue._maybe_recover_leases()
+    assert await queue._drain_batch(0) == 1
+    assert deliver.delivered == [("a", 0)]
+
+    # At most once per lease period
+    await queue.collection.update_one({"_id": doc_id}, {"$set": {
+        "status": PROCESSING,
+        "lease_until": datetime.utcnow() - timedelta(seconds=1),
+    }})
+    await queue._maybe_recover_leases()
+    assert (await _status(queue, doc_id))["status"] == PROCESSING
+
+
+@pytest.mark.anyio
+async def test_same_user_always_lands_in_the_same_partition():
+    queue = _queue(Recorder(), workers=4)
+    first = await _status(queue, await _enqueue(queue, "a", 0))
+    second = await _status(queue, await _enqueue(queue, "a", 1))
+    assert first["partition"] == second["partition"]
+
+
+@pytest.mark.anyio
+async def test_each_event_is_settled_as_soon_as_it_is_delivered():
+    queue = _queue(None)
+    settled = []
+
+    async def deliver(doc):
+        # Earlier events are already done, not left leased behind the batch
+        settled.append(await queue.collection.count_documents({"status": DONE}))
+        return DELIVERED
+
+    queue.deliver = deliver
+    for n in range(3):
+        await _enqueue(queue, "a", n)
+
+    assert await queue._drain_batch(0) == 3
+    assert settled == [0, 1, 2]
+
+
+class FlakyCollection:
+    """A collection whose index creation fails a few times, like Mongo at startup."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+
+    async def create_index(self, *args, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("mongo unreachable")
+
+
+@pytest.mark.anyio
+async def test_start_is_retried_until_mongo_is_reachable(monkeypatch):
+    monkeypatch.setattr(webhook_queue, "WEBHOOK_QUEUE_START_RETRY_SECONDS", 0.01)
+    queue = WebhookQueue(Recorder(), workers=1)
+    collection = FlakyCollection(failures=2)
+
+    queue.start_in_background(collection)
+    for _ in range(100):
+        if queue.running:
+            break
+        await asyncio.sleep(0.01)
+    try:
+        assert queue.running
+        assert queue.collection is collection
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.anyio
+async def test_stop_cancels_a_pending_start(monkeypatch):
+    monkeypatch.setattr(webhook_queue, "WEBHOOK_QUEUE_START_RETRY_SECONDS", 60)
+    queue = WebhookQueue(Recorder(), workers=1)
+
+    queue.start_in_background(FlakyCollection(failures=1))
+    await asyncio.sleep(0.01)
+    await queue.stop()
+    assert not queue.running
+    assert queue._starter is None
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from routers.write_buffer import BufferedWriter
+
+
+class SlowCollection:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=False):
+        await asyncio.sleep(self.delay)
+        self.documents.extend(documents)
+
+
+@pytest.mark.anyio
+async def test_inserts_are_batched():
+    collection = SlowCollection(delay=0)
+    writer = BufferedWriter(batch_size=3, flush_interval=0.01, max_pending=100)
+    await writer.start(collection)
+    await asyncio.gather(*(writer.insert({"i": i}, wait=True) for i in range(7)))
+    await writer.stop()
+
+    assert len(collection.documents) == 7
+    assert writer.stats()["batches"] == 3
+
+
+@pytest.mark.anyio
+async def test_stop_during_a_flush_loses_nothing():
+    collection = SlowCollection()
+    writer = BufferedWriter(batch_size=2, flush_interval=0.01, max_pending=100)
+    await writer.start(collection)
+    waiters = [asyncio.ensure_future(writer.insert({"i": i}, wait=True)) for i in range(5)]
+
+    # The first batch is mid-insert_many when shutdown starts
+    await asyncio.sleep(0.02)
+    await writer.stop()
+
+    await asyncio.wait_for(asyncio.gather(*waiters), 1)
+    assert sorted(doc["i"] for doc in collection.documents) == [0, 1, 2, 3, 4]
+    assert writer.stats()["pending"] == 0